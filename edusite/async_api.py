@@ -0,0 +1,203 @@
+"""
+Асинхронные (ASGI) вьюхи только для чтения: /api/async/courses/, /api/async/lessons/,
+/api/async/payments/ и их детальные.
+
+Ответ тот же, что у синхронного API: те же фильтры (DEFAULT_FILTER_BACKENDS,
+filterset_class, ordering_fields, search_fields), та же пагинация (?page=N или
+?paginate=keyset / ?cursor=), те же сериализаторы и рендерер.
+Запросы к БД — через async ORM (acount, aiterator, aget): фильтры и пагинация
+только строят queryset, вычисляется он здесь, поэтому в event loop не бывает
+синхронных обращений к БД. Сериализация идёт по уже загруженным строкам
+(select_related / prefetch_related / values()).
+
+Аутентификация, права и лимит — как у APIView.initial: те же DEFAULT_AUTHENTICATION_CLASSES,
+permission_classes и throttle_scope (ведро token bucket общее с синхронной вьюхой). Они и всё,
+что зависит от пользователя (initial подкласса), выполняются в потоке (sync_to_async) до чтения.
+
+Кэш ответов каталога (lms.cache) и запись здесь не поддерживаются — это путь
+для чтения под ASGI, синхронные эндпоинты остаются основными.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from .fastpath import Unsupported, build_plan, fast_selection, fast_values, represent
+from .pagination import KeysetOrPageNumberPagination, KeysetPagination
+from .sparse import SparseFieldsMixin
+
+# строк за один проход курсора aiterator (и одну пачку prefetch_related)
+CHUNK_SIZE = 2000
+
+
+async def afetch(queryset):
+    return [obj async for obj in queryset.aiterator(chunk_size=CHUNK_SIZE)]
+
+
+class AsyncGenericView(View):
+    """
+    Аналог GenericAPIView. Атрибуты — как у DRF-вьюх, поэтому фильтр-бэкенды
+    и пагинаторы принимают её вместо обычной вьюхи.
+    """
+    queryset = None
+    serializer_class = None
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    filter_backends = api_settings.DEFAULT_FILTER_BACKENDS
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = None
+    lookup_url_kwarg = "pk"
+
+    def initial(self):
+        """
+        Синхронная часть запроса (в потоке): пользователь, права, лимит — как APIView.initial.
+        """
+        request = self.request
+        request.user  # аутентификация
+        for permission in (permission() for permission in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, "message", None))
+        waits = []
+        for throttle in (throttle() for throttle in self.throttle_classes):
+            if not throttle.allow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            waits = [wait for wait in waits if wait is not None]
+            raise exceptions.Throttled(max(waits, default=None))
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_serializer_class(self):
+        return self.serializer_class
+
+    def get_serializer_context(self):
+        return {"request": self.request, "view": self, "format": None}
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("context", self.get_serializer_context())
+        return self.get_serializer_class()(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        # бэкенды только достраивают queryset — ни одного запроса к БД
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
+
+
+class AsyncReadOnlyView(SparseFieldsMixin, AsyncGenericView):
+    """
+    GET list/retrieve под ASGI; ?fields= / ?expand= — как у синхронных вьюх (edusite.sparse).
+    """
+    http_method_names = ["get", "head", "options"]
+    # список из values() через edusite.fastpath, как FastListMixin.fast_list
+    fast_list = False
+    renderer = JSONRenderer()
+
+    async def get(self, request, *args, **kwargs):
+        self.request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        self.args, self.kwargs = args, kwargs
+        try:
+            await sync_to_async(self.initial)()
+            if self.lookup_url_kwarg in kwargs:
+                data = await self.retrieve()
+            else:
+                data = await self.list()
+        except Exception as exc:
+            response = exception_handler(exc, {"view": self, "args": args, "kwargs": kwargs, "request": self.request})
+            if response is None:
+                raise
+            headers = {name: value for name, value in response.headers.items() if name.lower() != "content-type"}
+            return self.render(response.data, status=response.status_code, headers=headers)
+        return self.render(data)
+
+    def render(self, data, status=200, headers=None):
+        # headers — Retry-After у 429, WWW-Authenticate у 401
+        return HttpResponse(
+            self.renderer.render(data), status=status, content_type="application/json", headers=headers,
+        )
+
+    # --- чтение ---
+
+    async def retrieve(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            instance = await queryset.aget(pk=self.kwargs[self.lookup_url_kwarg])
+        except queryset.model.DoesNotExist:
+            raise Http404
+        return self.get_serializer(instance).data
+
+    async def list(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        fast, names = False, None
+        if self.fast_list:
+            try:
+                names = fast_selection(self, self.serializer_class)
+                build_plan(self.serializer_class)
+                fast = True
+            except Unsupported:
+                fast = False
+        if fast:
+            queryset = fast_values(queryset, self.serializer_class, names)
+
+        page = await self.apaginate_queryset(queryset)
+        rows = page if page is not None else await afetch(queryset)
+        if fast:
+            data = represent(rows, self.serializer_class, self.request, names)
+        else:
+            data = self.get_serializer(rows, many=True).data
+        if page is None:
+            return data
+        return self.paginator.get_paginated_response(data).data
+
+    # --- пагинация: запрос страницы строит пагинатор, вычисляется он здесь ---
+
+    async def apaginate_queryset(self, queryset):
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if isinstance(paginator, KeysetOrPageNumberPagination):
+            keyset = paginator.is_keyset_requested(self.request)
+            paginator.active = paginator.keyset if keyset else paginator.page_number
+            paginator = paginator.active
+        if isinstance(paginator, KeysetPagination):
+            return paginator.finish_page(await afetch(paginator.page_queryset(queryset, self.request)))
+        if isinstance(paginator, PageNumberPagination):
+            return await self.apaginate_page_number(paginator, queryset)
+        raise ImproperlyConfigured(f"{type(paginator).__name__} не поддерживается в {type(self).__name__}")
+
+    async def apaginate_page_number(self, paginator, queryset):
+        """
+        PageNumberPagination.paginate_queryset, где COUNT — acount(), а страница — aiterator.
+        """
+        request = self.request
+        page_size = paginator.get_page_size(request)
+        if not page_size:
+            return None
+        django_paginator = paginator.django_paginator_class(queryset, page_size)
+        django_paginator.count = await queryset.acount()
+        page_number = paginator.get_page_number(request, django_paginator)
+        try:
+            page = django_paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        page.object_list = await afetch(page.object_list)
+        paginator.page, paginator.request = page, request
+        return page.object_list
@@ -0,0 +1,157 @@
+"""
+Общие помощники для бенчмарков (manage.py bench_*).
+
+Замеры идут во временной БД, как у manage.py test: рабочая db.sqlite3 не трогается.
+"""
+import math
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+
+@contextmanager
+def temporary_database(verbosity=0):
+    old_name = connection.settings_dict["NAME"]
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def measure(fn, repeat=5):
+    """
+    Запускает fn repeat раз, возвращает времена в миллисекундах.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "min": timings[0],
+        "median": statistics.median(timings),
+        "max": timings[-1],
+    }
+
+
+def percentile(values, p):
+    """
+    p-й перцентиль (nearest-rank) списка чисел.
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def catalog_cache_disabled():
+    """
+    Кэш ответов каталога -> DummyCache: повторные запросы в замере не должны быть попаданиями.
+    """
+    caches = dict(settings.CACHES)
+    caches[settings.CATALOG_CACHE_ALIAS] = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    return override_settings(CACHES=caches)
+
+
+def throttling_disabled():
+    """
+    Без лимитов edusite.throttling: замер шлёт сотни запросов от одного клиента.
+    """
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}})
+
+
+def seed_payments(rows, users=1000, courses=100, batch_size=10_000, seed=0):
+    """
+    Быстро наполняет БД платежами через bulk_create пачками.
+    Платежи — за курсы, paid_at равномерно за последние два года.
+    """
+    from lms.models import Course
+    from users.models import Payment, User
+
+    rng = random.Random(seed)
+    offset = User.objects.count()
+    User.objects.bulk_create(
+        [User(email=f"bench{i}@example.com", username=f"bench{i}") for i in range(offset, offset + users)],
+        batch_size=batch_size,
+    )
+    Course.objects.bulk_create([Course(title=f"Курс {i}") for i in range(courses)], batch_size=batch_size)
+    user_ids = list(User.objects.values_list("id", flat=True))
+    course_ids = list(Course.objects.values_list("id", flat=True))
+
+    now = timezone.now()
+    methods = [Payment.Method.CASH, Payment.Method.TRANSFER]
+    for start in range(0, rows, batch_size):
+        Payment.objects.bulk_create([
+            Payment(
+                user_id=rng.choice(user_ids),
+                course_id=rng.choice(course_ids),
+                paid_at=now - timedelta(seconds=rng.randrange(2 * 365 * 24 * 3600)),
+                amount=Decimal(rng.randrange(100, 100_000)) / 100,
+                method=rng.choice(methods),
+            )
+            for _ in range(min(batch_size, rows - start))
+        ])
+
+
+def seed_catalog(courses, lessons, users, payments, batch_size=10_000, seed=0, log=None):
+    """
+    Наполняет БД в масштабе прода: курсы, уроки, пользователи, платежи (за курс или за урок).
+    Всё через bulk_create пачками по batch_size, объекты пачки создаются по ходу —
+    память не растёт с объёмом. Сигналы не шлются: свёртку платежей, счётчики курсов
+    и поисковый индекс после наполнения нужно перестроить (manage.py seed_data делает это сам).
+    Возвращает {таблица: сколько создано}.
+    """
+    from lms.models import Course, Lesson
+    from users.models import Payment, User
+
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+
+    def insert(model, total, make):
+        ids, started = [], time.perf_counter()
+        for start in range(0, total, batch_size):
+            created = model.objects.bulk_create([make(i) for i in range(start, min(total, start + batch_size))])
+            ids.extend(obj.pk for obj in created)
+        log(f"{model._meta.label}: {total} за {time.perf_counter() - started:.1f} с")
+        return ids
+
+    offset = User.objects.count()
+    user_ids = insert(User, users, lambda i: User(
+        email=f"seed{offset + i}@example.com", username=f"seed{offset + i}", city=rng.choice(CITIES),
+    ))
+    course_ids = insert(Course, courses, lambda i: Course(title=f"Курс {i}", description=f"Описание курса {i}"))
+    lesson_ids = insert(Lesson, lessons, lambda i: Lesson(course_id=course_ids[i % len(course_ids)], title=f"Урок {i}"))
+
+    now = timezone.now()
+    methods = [Payment.Method.CASH, Payment.Method.TRANSFER]
+
+    def payment(i):
+        # примерно треть платежей — за отдельные уроки
+        by_lesson = lesson_ids and rng.random() < 0.3
+        return Payment(
+            user_id=rng.choice(user_ids),
+            course_id=None if by_lesson else rng.choice(course_ids),
+            lesson_id=rng.choice(lesson_ids) if by_lesson else None,
+            paid_at=now - timedelta(seconds=rng.randrange(2 * 365 * 24 * 3600)),
+            amount=Decimal(rng.randrange(100, 100_000)) / 100,
+            method=rng.choice(methods),
+        )
+
+    if payments and not (user_ids and course_ids):
+        raise ValueError("Для платежей нужны пользователи и курсы.")
+    insert(Payment, payments, payment)
+    return {"courses": courses, "lessons": lessons, "users": users, "payments": payments}
+
+
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Екатеринбург", "Дербент"]
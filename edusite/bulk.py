@@ -0,0 +1,154 @@
+"""
+Массовое создание и частичное обновление через списки в теле запроса:
+POST   /api/lessons/  [{...}, {...}]           -> bulk_create
+PATCH  /api/lessons/  [{"id": 1, ...}, ...]    -> bulk_update
+
+Валидация — обычными сериализаторами по каждому элементу (ошибки — по индексам элементов),
+связанные объекты (course, lesson, user) проверяются одним запросом на поле,
+запись — одной транзакцией. bulk_create/bulk_update не шлют post_save,
+поэтому после записи отправляются post_bulk_create / post_bulk_update (edusite.signals).
+"""
+import copy
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+
+from edusite.instrumentation import phase
+from edusite.signals import post_bulk_create, post_bulk_update
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Внутри BulkListSerializer берёт объект из заранее загруженного словаря,
+    а не делает get(pk=...) на каждый элемент.
+    """
+
+    def to_internal_value(self, data):
+        loaded = getattr(self.root, "bulk_related", {}).get(self.field_name)
+        if loaded is None or isinstance(data, bool) or not str(data).isdigit():
+            return super().to_internal_value(data)
+        try:
+            return loaded[str(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", settings.BULK_MAX_ITEMS)
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.load_related(data)
+            self.instances_by_pk = {str(obj.pk): obj for obj in self.instance or []}
+            self.matched_instances = []
+            self.seen_ids = set()
+        return super().to_internal_value(data)
+
+    def load_related(self, data):
+        self.bulk_related = {}
+        for name, field in self.child.fields.items():
+            if not isinstance(field, BulkPrimaryKeyRelatedField) or field.read_only:
+                continue
+            ids = {str(item[name]) for item in data if isinstance(item, dict) and str(item.get(name)).isdigit()}
+            objects = field.get_queryset().filter(pk__in=ids) if ids else []
+            self.bulk_related[name] = {str(obj.pk): obj for obj in objects}
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        # обновление: каждому элементу — свой объект по id
+        instance = self.instances_by_pk.get(str(data.get("id"))) if isinstance(data, dict) else None
+        if instance is None:
+            raise serializers.ValidationError({"id": ["Объект с таким id не найден."]})
+        # повтор id применил бы объект дважды: receivers post_bulk_update посчитали бы его два раза
+        if instance.pk in self.seen_ids:
+            raise serializers.ValidationError({"id": ["Этот id уже есть в списке."]})
+        self.seen_ids.add(instance.pk)
+        self.child.instance = instance
+        self.child.initial_data = data
+        validated = super().run_child_validation(data)
+        self.matched_instances.append(instance)
+        return validated
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        with transaction.atomic():
+            model.objects.bulk_create(instances, batch_size=settings.BULK_BATCH_SIZE)
+            post_bulk_create.send(sender=model, instances=instances, using=model.objects.db)
+        return instances
+
+    def update(self, instance, validated_data):
+        model = self.child.Meta.model
+        previous = {obj.pk: copy.copy(obj) for obj in self.matched_instances}
+        fields = set()
+        for obj, attrs in zip(self.matched_instances, validated_data):
+            for name, value in attrs.items():
+                setattr(obj, name, value)
+            fields.update(attrs)
+        if fields:
+            # bulk_update не вызывает pre_save — auto_now (updated_at) проставляем сами
+            now = timezone.now()
+            for field in model._meta.concrete_fields:
+                if getattr(field, "auto_now", False):
+                    for obj in self.matched_instances:
+                        setattr(obj, field.attname, now)
+                    fields.add(field.name)
+        with transaction.atomic():
+            if fields:
+                model.objects.bulk_update(self.matched_instances, sorted(fields), batch_size=settings.BULK_BATCH_SIZE)
+            post_bulk_update.send(
+                sender=model, instances=self.matched_instances, previous=previous,
+                fields=fields, using=model.objects.db,
+            )
+        return self.matched_instances
+
+
+class BulkCreateUpdateMixin:
+    """
+    Для списковых вьюх: POST со списком — массовое создание, PATCH со списком — массовое обновление.
+    Сериализатор должен указывать Meta.list_serializer_class = BulkListSerializer.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        with phase("serialize"):
+            data = serializer.data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": "Ожидается список объектов с id."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        ids = {str(item.get("id")) for item in request.data if isinstance(item, dict)}
+        ids = [pk for pk in ids if pk.isdigit()]
+        instances = list(self.get_queryset().filter(pk__in=ids))
+        serializer = self.get_serializer(instances, data=request.data, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        with phase("serialize"):
+            data = serializer.data
+        return Response(data)
+
+
+class BulkRouter(DefaultRouter):
+    """
+    DefaultRouter, где список дополнительно принимает PATCH -> bulk_update
+    (только у ViewSet, в которых есть bulk_update).
+    """
+    routes = [
+        route._replace(mapping={**route.mapping, "patch": "bulk_update"})
+        if getattr(route, "mapping", None) == {"get": "list", "post": "create"} else route
+        for route in DefaultRouter.routes
+    ]
@@ -0,0 +1,171 @@
+"""
+Single-flight: одновременные одинаковые вычисления выполняются один раз.
+Первый запрос (лидер) считает, остальные с тем же ключом ждут и получают его результат —
+всплеск одинаковых GET /api/courses/ делает один проход по БД, а не N.
+
+- В процессе потоки с одним ключом ждут лидера на threading.Event.
+- Между воркерами (COALESCE_BACKEND) — только лидер процесса:
+  "local" — без координации между процессами;
+  "cache" — блокировка cache.add в COALESCE_CACHE_ALIAS (общий Redis/Memcached),
+            результат кладётся туда же, ожидающие опрашивают кэш;
+  "file"  — fcntl.flock на файле в COALESCE_LOCK_DIR (воркеры одной машины),
+            результат — в файле рядом (pickle).
+- Результат общий только для тех, кто пришёл во время вычисления: запрос после —
+  новое вычисление (это не кэш). Упал или завис лидер (дольше COALESCE_TIMEOUT) —
+  ожидающие считают сами, исключение лидера не размножается.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from edusite import replicas
+
+stats = {"leader": 0, "follower": 0}
+
+
+class Flight:
+    __slots__ = ("done", "ok", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+
+
+_lock = threading.Lock()
+_flights = {}
+
+
+def single_flight(key, compute):
+    """
+    (результат, лидер ли) — compute() вызывается одним из одновременных вызовов с этим key.
+    """
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+        stats["leader" if leader else "follower"] += 1
+    if not leader:
+        if flight.done.wait(settings.COALESCE_TIMEOUT) and flight.ok:
+            return flight.result, False
+        return compute(), True
+    try:
+        flight.result, leader = BACKENDS[settings.COALESCE_BACKEND](key, compute)
+        flight.ok = True
+        return flight.result, leader
+    finally:
+        with _lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def run_local(key, compute):
+    return compute(), True
+
+
+def run_via_cache(key, compute):
+    cache = caches[settings.COALESCE_CACHE_ALIAS]
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    lock_key = f"coalesce:lock:{digest}"
+    timeout = settings.COALESCE_TIMEOUT
+    flight_id = uuid.uuid4().hex
+    if cache.add(lock_key, flight_id, timeout=timeout):
+        try:
+            result = compute()
+            # результат — до снятия блокировки: ожидающий, увидевший её снятой, найдёт и его
+            cache.set(f"coalesce:result:{flight_id}", result, timeout=timeout)
+            return result, True
+        finally:
+            if cache.get(lock_key) == flight_id:
+                cache.delete(lock_key)
+    leader_id = cache.get(lock_key)
+    deadline = time.monotonic() + timeout
+    while leader_id is not None and time.monotonic() < deadline:
+        held = cache.get(lock_key)
+        found = cache.get_many([f"coalesce:result:{leader_id}"])
+        if found:
+            return found.popitem()[1], False
+        if held != leader_id:
+            break  # лидер ушёл без результата
+        time.sleep(settings.COALESCE_POLL_INTERVAL)
+    return compute(), True
+
+
+def run_via_file(key, compute):
+    import fcntl
+
+    os.makedirs(settings.COALESCE_LOCK_DIR, exist_ok=True)
+    path = os.path.join(settings.COALESCE_LOCK_DIR, hashlib.sha1(key.encode()).hexdigest())
+    arrived = time.time()
+    with open(f"{path}.lock", "a+b") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # вычисление идёт в другом процессе: ждём снятия блокировки (без таймаута —
+            # flock снимается и при смерти процесса) и берём его результат
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            try:
+                with open(f"{path}.result", "rb") as fh:
+                    finished, result = pickle.load(fh)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                finished = 0
+            if finished >= arrived:
+                return result, False
+            return compute(), True
+        try:
+            result = compute()
+            with tempfile.NamedTemporaryFile(dir=settings.COALESCE_LOCK_DIR, delete=False) as fh:
+                pickle.dump((time.time(), result), fh)
+            os.replace(fh.name, f"{path}.result")
+            return result, True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+BACKENDS = {"local": run_local, "cache": run_via_cache, "file": run_via_file}
+
+
+class CoalescedListMixin:
+    """
+    Для DRF-вьюх: одновременные одинаковые GET-списки (тот же путь, параметры, формат,
+    пользователь) считаются один раз. Ожидающие получают данные лидера и заголовок
+    X-Coalesced: 1. Троттлинг и права проверяются до этого — у каждого запроса свои.
+    """
+
+    def get_coalesce_key(self):
+        request = self.request
+        params = sorted((k, sorted(request.query_params.getlist(k))) for k in request.query_params)
+        user = request.user.pk if request.user.is_authenticated else None
+        # клиент в окне read-your-writes читает default — его не смешиваем с читающими реплику
+        source = "primary" if replicas.read_alias.get() is None else "replica"
+        return repr((
+            type(self).__module__, type(self).__name__, request.path, params,
+            request.accepted_renderer.format, user, source,
+        ))
+
+    def list(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().list(request, *args, **kwargs)
+        response = None
+
+        def compute():
+            nonlocal response
+            response = super(CoalescedListMixin, self).list(request, *args, **kwargs)
+            return response.status_code, response.data
+
+        (status, data), leader = single_flight(self.get_coalesce_key(), compute)
+        if leader and response is not None:
+            return response
+        response = Response(data, status=status)
+        response["X-Coalesced"] = "1"
+        return response
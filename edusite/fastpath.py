@@ -0,0 +1,185 @@
+"""
+Быстрый путь для списков: строки собираются напрямую из queryset.values(),
+минуя создание моделей и поле-за-полем обход ModelSerializer.
+
+План (какие колонки брать и как их превращать в JSON) строится один раз
+из полей обычного сериализатора, поэтому ответ совпадает с ним байт в байт.
+Сериализаторы с SerializerMethodField, вложенными сериализаторами или many-связями
+не поддерживаются — для них остаётся обычный путь.
+"""
+from functools import lru_cache
+
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .instrumentation import phase
+from .sparse import ordering_columns, selection
+
+
+class Unsupported(Exception):
+    pass
+
+
+def datetime_to_representation(value):
+    # как DRF DateTimeField в формате ISO 8601: в текущей таймзоне, UTC — с «Z»
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def file_url(model_field):
+    storage = model_field.storage
+
+    def to_representation(name, request):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return to_representation
+
+
+@lru_cache(maxsize=None)
+def build_plan(serializer_class):
+    """
+    Кортеж (имя в ответе, путь для values(), преобразование, вид значения).
+    Вид: "plain" — как есть/через convert, "file" — convert(value, request): URL файла
+    или поле с методом fast_to_representation(value, request),
+    "nested" — вложенный источник (course.title): без связанного объекта DRF
+    пропускает поле, а не отдаёт null,
+    "row" — поле с fast_paths и fast_row_representation(row, request): значение из нескольких колонок.
+    """
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if hasattr(field, "fast_row_representation"):
+            plan.append((name, tuple(field.fast_paths), field.fast_row_representation, "row"))
+            continue
+        unsupported = (
+            isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer, ManyRelatedField))
+            or field.source == "*"
+            or (isinstance(field, PrimaryKeyRelatedField) and ("." in field.source or field.pk_field))
+        )
+        if unsupported:
+            raise Unsupported(f"{serializer_class.__name__}.{name}")
+
+        path = field.source.replace(".", "__")
+        kind = "nested" if "." in field.source and not field.required else "plain"
+        if hasattr(field, "fast_to_representation"):
+            convert, kind = field.fast_to_representation, "file"
+        elif isinstance(field, PrimaryKeyRelatedField) or isinstance(field, serializers.ChoiceField):
+            convert = None
+        elif isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+            if output_format is serializers.empty:
+                output_format = api_settings.DATETIME_FORMAT
+            if output_format is None or output_format.lower() != ISO_8601:
+                raise Unsupported(f"{serializer_class.__name__}.{name}")
+            convert = datetime_to_representation
+        elif isinstance(field, serializers.FileField):
+            if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+                raise Unsupported(f"{serializer_class.__name__}.{name}")
+            convert, kind = file_url(model._meta.get_field(field.source)), "file"
+        elif isinstance(field, serializers.IntegerField):
+            convert = int
+        elif isinstance(field, serializers.CharField):
+            convert = str
+        else:
+            convert = field.to_representation
+        plan.append((name, path, convert, kind))
+    return tuple(plan)
+
+
+def select_plan(serializer_class, names=None):
+    plan = build_plan(serializer_class)
+    if names is None:
+        return plan
+    # ?fields= (edusite.sparse): только выбранные поля
+    return tuple(step for step in plan if step[0] in names)
+
+
+def values_paths(serializer_class, names=None):
+    paths = []
+    for _name, path, _convert, kind in select_plan(serializer_class, names):
+        paths += path if kind == "row" else [path]
+    return list(dict.fromkeys(paths))
+
+
+def fast_selection(view, serializer_class):
+    """
+    Имена полей для быстрого пути с учётом ?fields= или Unsupported,
+    если ?expand= разворачивает связь (вложенный объект строит только сериализатор).
+    """
+    fields, expand = selection(view)
+    if any(name in getattr(serializer_class.Meta, "expandable", {}) for name in expand):
+        raise Unsupported("expand")
+    return None if fields is None else [*fields, *expand]
+
+
+def fast_values(queryset, serializer_class, names=None):
+    """
+    queryset.values() под план; при выборе полей — и колонки порядка (их читает курсор keyset).
+    """
+    paths = values_paths(serializer_class, names)
+    if names is not None:
+        paths += [c for c in ordering_columns(queryset) if c not in paths]
+    return queryset.prefetch_related(None).values(*paths)
+
+
+def represent(rows, serializer_class, request=None, names=None):
+    """
+    Строки values() -> список словарей в форме serializer_class(..., many=True).data.
+    """
+    plan = select_plan(serializer_class, names)
+    result = []
+    for row in rows:
+        item = {}
+        for name, path, convert, kind in plan:
+            if kind == "row":
+                item[name] = convert(row, request)
+                continue
+            value = row[path]
+            if value is None:
+                if kind != "nested":
+                    item[name] = None
+            elif kind == "file":
+                item[name] = convert(value, request) if value else None
+            elif convert is None:
+                item[name] = value
+            else:
+                item[name] = convert(value)
+        result.append(item)
+    return result
+
+
+class FastListMixin:
+    """
+    fast_list = True — list() отдаёт строки из values() через edusite.fastpath:
+    тот же JSON, что у serializer_class, но без ModelSerializer на каждую строку.
+    """
+    fast_list = False
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if not self.fast_list:
+            return super().list(request, *args, **kwargs)
+        try:
+            names = fast_selection(self, serializer_class)
+            build_plan(serializer_class)
+        except Unsupported:
+            return super().list(request, *args, **kwargs)
+
+        queryset = fast_values(self.filter_queryset(self.get_queryset()), serializer_class, names)
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        with phase("serialize"):
+            data = represent(rows, serializer_class, request, names)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,337 @@
+"""
+Замеры запросов: сколько SQL и сколько по времени, сериализация, рендер, размер ответа —
+по каждому маршруту (route из urls + метод).
+
+- InstrumentationMiddleware выбирает запросы с вероятностью INSTRUMENTATION_SAMPLE_RATE;
+  невыбранные проходят как есть (одна проверка random + contextvar на каждый SQL).
+- SQL считается обёрткой execute_wrappers, которая ставится на каждое соединение
+  (connection_created) и пишет в замер текущего запроса через contextvar —
+  поэтому работает и для async-вьюх, где ORM идёт в отдельном потоке.
+- Повторы одного и того же SQL (с точностью до параметров) не реже
+  INSTRUMENTATION_N_PLUS_ONE_THRESHOLD раз за запрос помечаются как N+1.
+- Итог — заголовок Server-Timing и гистограммы в формате Prometheus на /metrics
+  (в памяти процесса: у каждого воркера свои, Prometheus суммирует по инстансам);
+  /metrics отдаётся только с токеном METRICS_TOKEN или пользователю is_staff.
+- InstrumentedViewMixin для DRF-вьюх добавляет время сериализации и рендера.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# замер текущего запроса (None — запрос не выбран)
+current = ContextVar("edusite_instrumentation_sample", default=None)
+
+BUCKETS = {
+    "duration_ms": (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    "queries": (1, 2, 3, 5, 10, 20, 50, 100),
+    "bytes": (512, 2048, 8192, 32768, 131072, 524288, 2097152),
+}
+# метрика -> (описание, шкала BUCKETS)
+METRICS = {
+    "request_duration_ms": ("Время обработки запроса, мс", "duration_ms"),
+    "sql_duration_ms": ("Время SQL за запрос, мс", "duration_ms"),
+    "sql_queries": ("SQL-запросов за запрос", "queries"),
+    "serialize_duration_ms": ("Время сериализации, мс", "duration_ms"),
+    "render_duration_ms": ("Время рендера ответа, мс", "duration_ms"),
+    "response_bytes": ("Размер ответа, байт", "bytes"),
+}
+
+IN_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+NUMBER_RE = re.compile(r"\b\d+\b")
+SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """
+    SQL без параметров: IN (%s, %s, ...) -> IN (...), числа (LIMIT 21) -> ?.
+    """
+    sql = IN_LIST_RE.sub("(...)", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+class Sample:
+    __slots__ = ("started", "queries", "sql_time", "timings")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.sql_time = 0.0
+        self.timings = defaultdict(float)
+
+    def duplicates(self, threshold):
+        counts = Counter(normalize_sql(sql) for sql in self.queries)
+        return {sql: n for sql, n in counts.items() if n >= threshold}
+
+
+def record_query(execute, sql, params, many, context):
+    sample = current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.sql_time += time.perf_counter() - started
+        sample.queries.append(sql)
+
+
+def install(sender, connection, **kwargs):
+    # connection_created: обёртка на каждое новое соединение (без дублей при переподключении)
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_all():
+    # соединения, открытые до подключения сигнала (в этом потоке)
+    for connection in connections.all(initialized_only=True):
+        install(None, connection)
+
+
+connection_created.connect(install, dispatch_uid="edusite-instrumentation")
+
+
+@contextmanager
+def measure_phase(sample, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.timings[name] += time.perf_counter() - started
+
+
+def phase(name):
+    """
+    with phase("serialize"): ... — время попадёт в замер, если запрос выбран.
+    """
+    sample = current.get()
+    return nullcontext() if sample is None else measure_phase(sample, name)
+
+
+# --- гистограммы ---
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # (метрика, route, method) -> [счётчики по корзинам..., +Inf, сумма]
+        self.histograms = {}
+        self.n_plus_one = Counter()
+
+    def observe(self, metric, labels, value):
+        buckets = BUCKETS[METRICS[metric][1]]
+        key = (metric, *labels)
+        with self.lock:
+            row = self.histograms.get(key)
+            if row is None:
+                row = self.histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def flag(self, labels, count=1):
+        with self.lock:
+            self.n_plus_one[labels] += count
+
+    def exposition(self):
+        """
+        Текстовый формат Prometheus 0.0.4.
+        """
+        lines = []
+        with self.lock:
+            histograms = {key: list(row) for key, row in self.histograms.items()}
+            n_plus_one = dict(self.n_plus_one)
+        for metric, (description, scale) in METRICS.items():
+            name = f"edusite_{metric}"
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+            for (key_metric, route, method), row in sorted(histograms.items()):
+                if key_metric != metric:
+                    continue
+                labels = f'route="{escape(route)}",method="{method}"'
+                for bound, count in zip(BUCKETS[scale], row):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {row[-2]}')
+                lines.append(f"{name}_sum{{{labels}}} {round(row[-1], 3)}")
+                lines.append(f"{name}_count{{{labels}}} {row[-2]}")
+        name = "edusite_n_plus_one_total"
+        lines += [f"# HELP {name} Запросов с повторяющимся SQL (N+1)", f"# TYPE {name} counter"]
+        for (route, method), count in sorted(n_plus_one.items()):
+            lines.append(f'{name}{{route="{escape(route)}",method="{method}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+def metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+def metrics_view(request):
+    # задержки, число SQL и маршруты — не для посторонних
+    if not metrics_allowed(request):
+        return HttpResponseForbidden("metrics: нужен токен METRICS_TOKEN или is_staff\n")
+    return HttpResponse(registry.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# --- middleware ---
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        install_all()
+        sample = Sample()
+        token = current.set(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(sample, request, response)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        # ORM async-вьюх работает в потоке sync_to_async — ставим обёртку и там
+        await sync_to_async(install_all)()
+        sample = Sample()
+        token = current.set(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(sample, request, response)
+
+    def finish(self, sample, request, response):
+        total = (time.perf_counter() - sample.started) * 1000
+        match = getattr(request, "resolver_match", None)
+        # route из urls; у маршрутов router это regex — якоря ^/$ в метке не нужны
+        route = match.route.replace("^", "").replace("$", "") if match is not None else "unmatched"
+        labels = (route, request.method)
+        sql = sample.sql_time * 1000
+        serialize = sample.timings["serialize"] * 1000
+        render = sample.timings["render"] * 1000
+
+        registry.observe("request_duration_ms", labels, total)
+        registry.observe("sql_duration_ms", labels, sql)
+        registry.observe("sql_queries", labels, len(sample.queries))
+        if "serialize" in sample.timings:
+            registry.observe("serialize_duration_ms", labels, serialize)
+        if "render" in sample.timings:
+            registry.observe("render_duration_ms", labels, render)
+        if not response.streaming:
+            registry.observe("response_bytes", labels, len(response.content))
+
+        timing = [
+            f'db;dur={sql:.1f};desc="{len(sample.queries)} queries"',
+            f"serialize;dur={serialize:.1f}",
+            f"render;dur={render:.1f}",
+            f"total;dur={total:.1f}",
+        ]
+        duplicates = sample.duplicates(settings.INSTRUMENTATION_N_PLUS_ONE_THRESHOLD)
+        if duplicates:
+            registry.flag(labels)
+            worst = max(duplicates.values())
+            timing.append(f'nplusone;desc="{len(duplicates)} repeated statements, up to {worst}x"')
+            for sql_text, count in duplicates.items():
+                logger.warning("N+1 on %s %s: %sx %s", labels[1], labels[0], count, sql_text)
+        response["Server-Timing"] = ", ".join(timing)
+        return response
+
+
+class InstrumentedViewMixin:
+    """
+    Для DRF-вьюх: время сериализации (serializer.data) и рендера в замере запроса.
+    Без выбранного замера ничего не делает.
+
+    list/retrieve/create/update — как в rest_framework.mixins, но serializer.data — в phase("serialize").
+    Ставится в базах последним перед классом DRF: кэш, coalesce, fastpath и bulk-миксины
+    доходят до этих методов через super().
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page if page is not None else queryset, many=True)
+        with phase("serialize"):
+            data = serializer.data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        with phase("serialize"):
+            data = serializer.data
+        return Response(data)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        with phase("serialize"):
+            data = serializer.data
+        return Response(data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(data))
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop("partial", False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        if getattr(instance, "_prefetched_objects_cache", None):
+            # как UpdateModelMixin: prefetch до правки устарел
+            instance._prefetched_objects_cache = {}
+        with phase("serialize"):
+            data = serializer.data
+        return Response(data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        with phase("render"):
+            response = super().finalize_response(request, response, *args, **kwargs)
+            if current.get() is not None and hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        return response
@@ -0,0 +1,236 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация: страница выбирается условием WHERE (paid_at, id) < (...),
+    без COUNT(*) и OFFSET, поэтому N-я страница стоит столько же, сколько первая.
+
+    Порядок берётся из queryset (после OrderingFilter) или Meta.ordering модели,
+    к нему всегда дописывается id — так ключ курсора уникален.
+    Курсор привязан к порядку: при смене ?ordering= старый курсор отклоняется.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    def page_queryset(self, queryset, request):
+        """
+        Запрос страницы (page_size + 1 строк — чтобы понять, есть ли ещё).
+        Вычисляется снаружи: list() здесь или async for в edusite.async_api.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+
+        position, reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+        self.reverse = reverse
+
+        order_by = [self.flip(f) if reverse else f for f in self.ordering]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        # в прямом направлении «ещё» — это следующая страница, в обратном — предыдущая
+        if self.reverse:
+            self.has_next, self.has_previous = self.has_cursor, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            "name": self.cursor_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Курсор keyset-пагинации.",
+            "schema": {"type": "string"},
+        }]
+
+    # --- порядок ---
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        ordering = [f for f in ordering if isinstance(f, str)]
+        pk_name = queryset.model._meta.pk.name
+        names = {f.lstrip("-") for f in ordering}
+        if not names & {"pk", pk_name}:
+            # тай-брейкер в том же направлении, что и последнее поле
+            descending = bool(ordering) and ordering[-1].startswith("-")
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        self.model = queryset.model
+        return ordering
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def get_field(self, name):
+        name = name.lstrip("-")
+        opts = self.model._meta
+        return opts.pk if name == "pk" else opts.get_field(name)
+
+    def after(self, position, reverse):
+        """
+        (a, b) после (x, y) — это a > x OR (a = x AND b > y), с учётом направления.
+        """
+        conditions = []
+        for i, field in enumerate(self.ordering):
+            descending = field.startswith("-") != reverse
+            name = field.lstrip("-")
+            lookup = {f"{name}__{'lt' if descending else 'gt'}": position[i]}
+            equal = {f.lstrip("-"): position[j] for j, f in enumerate(self.ordering[:i])}
+            conditions.append(Q(**equal, **lookup))
+        return reduce(or_, conditions)
+
+    # --- курсоры ---
+
+    def position_of(self, obj):
+        fields = [self.get_field(f) for f in self.ordering]
+        if isinstance(obj, dict):
+            # строки values() (быстрый путь edusite.fastpath)
+            return [obj[f.attname] if f.attname in obj else obj[f.name] for f in fields]
+        return [getattr(obj, f.attname) for f in fields]
+
+    def encode_cursor(self, obj, reverse=False):
+        values = []
+        for value in self.position_of(obj):
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            values.append(value)
+        payload = json.dumps({"o": self.ordering, "v": values, "r": int(reverse)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if payload["o"] != self.ordering or len(payload["v"]) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.get_field(f).to_python(v) for f, v in zip(self.ordering, payload["v"])
+            ]
+            return position, bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self.page[0], reverse=True)
+        )
+
+
+class KeysetOrPageNumberPagination(BasePagination):
+    """
+    По умолчанию — обычная PageNumberPagination (?page=N, есть count).
+    Keyset включается явно: ?paginate=keyset для первой страницы,
+    дальше ссылки next/previous несут ?cursor=...
+    """
+    mode_query_param = "paginate"
+    keyset_mode = "keyset"
+
+    def __init__(self):
+        self.page_number = PageNumberPagination()
+        self.keyset = KeysetPagination()
+        self.active = self.page_number
+
+    def is_keyset_requested(self, request):
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == self.keyset_mode
+            or self.keyset.cursor_query_param in params
+        )
+
+    @property
+    def display_page_controls(self):
+        return self.active.display_page_controls
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.active = self.keyset if self.is_keyset_requested(request) else self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def get_results(self, data):
+        return self.active.get_results(data)
+
+    def to_html(self):
+        return self.active.to_html()
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            self.page_number.get_schema_operation_parameters(view)
+            + self.keyset.get_schema_operation_parameters(view)
+            + [{
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "keyset — включить keyset-пагинацию без COUNT/OFFSET.",
+                "schema": {"type": "string", "enum": [self.keyset_mode]},
+            }]
+        )
@@ -0,0 +1,117 @@
+"""
+Чтение с реплик и запись в основную БД (default).
+
+- ReplicaMiddleware выбирает для GET/HEAD одну реплику из settings.DATABASE_REPLICAS
+  (случайную, на весь запрос — ответ собирается из одного снимка данных).
+  Запросы с записью (POST/PUT/PATCH/DELETE) идут только в default.
+- Read-your-writes: после успешной записи ответ несёт cookie и заголовок
+  X-Read-Primary-Until (unix-время); пока оно не прошло, чтение этого клиента идёт
+  в default, и отставание реплики не «откатывает» только что сделанную запись.
+  Клиенты без cookie могут вернуть заголовок как есть.
+- ReplicaRouter (DATABASE_ROUTERS) читает из выбранной реплики, пишет в default.
+  Вне запроса (команды, shell, воркеры) и внутри транзакции на default
+  чтение идёт в default. Миграции на реплики не применяются — их схему приносит репликация.
+
+Без DATABASE_REPLICAS всё работает с одной БД, как раньше.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# алиас реплики для чтения в текущем запросе (None — default)
+read_alias = ContextVar("edusite_read_alias", default=None)
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплика — копия default: объекты из них можно связывать
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def read_primary_until(request):
+    # cookie от браузера или заголовок от API-клиента — берём более поздний срок
+    values = [request.COOKIES.get(READ_PRIMARY_COOKIE), request.headers.get(READ_PRIMARY_HEADER)]
+    until = 0.0
+    for value in values:
+        try:
+            until = max(until, float(value))
+        except (TypeError, ValueError):
+            continue
+    return until
+
+
+def is_pinned(request):
+    """
+    Клиент в окне read-your-writes: читает из default.
+    """
+    return bool(settings.DATABASE_REPLICAS) and read_primary_until(request) > time.time()
+
+
+def choose_alias(request):
+    if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS or is_pinned(request):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = read_alias.set(choose_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        # contextvar доходит и до потоков sync_to_async, где работает ORM async-вьюх
+        token = read_alias.set(choose_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not settings.DATABASE_REPLICAS:
+            return response
+        window = settings.READ_AFTER_WRITE_SECONDS
+        until = f"{time.time() + window:.3f}"
+        response.set_cookie(READ_PRIMARY_COOKIE, until, max_age=window, httponly=True, samesite="Lax")
+        response[READ_PRIMARY_HEADER] = until
+        return response
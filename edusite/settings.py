@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -17,10 +19,14 @@ INSTALLED_APPS = [
     "django_filters",
     "users",
     "lms",
+    "search",
+    "thumbnails",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "edusite.instrumentation.InstrumentationMiddleware",
+    "edusite.replicas.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -53,8 +59,39 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # постоянные соединения: одно на поток воркера, живёт до минуты, перед повторным
+        # использованием проверяется; на PostgreSQL — ещё и пул: "OPTIONS": {"pool": True}
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
+# реплики только для чтения (edusite.replicas): алиасы из DATABASES, например
+# DATABASES["replica1"] = {**DATABASES["default"], "HOST": "replica1.internal"}
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ["edusite.replicas.ReplicaRouter"]
+# после записи клиент столько секунд читает из default (должно быть больше отставания реплик)
+READ_AFTER_WRITE_SECONDS = 5
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # кэш ответов /api/courses/ и /api/lessons/ (lms.cache): LocMemCache вытесняет по LRU,
+    # для нескольких воркеров — заменить на общий (Redis/Memcached)
+    "catalog": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "catalog",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    # вёдра edusite.throttling: для нескольких воркеров — общий кэш, иначе лимит на каждый воркер
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+        "OPTIONS": {"MAX_ENTRIES": 100_000},
+    },
+}
+CATALOG_CACHE_ALIAS = "catalog"
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -67,6 +104,16 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # холодный архив платежей (users.archive); в продакшене — объектное хранилище (S3 и т. п.)
+    "payment_archive": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": BASE_DIR / "archive"},
+    },
+}
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # наш кастомный юзер
@@ -80,8 +127,111 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
         "rest_framework.filters.OrderingFilter",
-        "rest_framework.filters.SearchFilter",
+        "search.filters.FullTextSearchFilter",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
-}
\ No newline at end of file
+    # ошибки массовых запросов — {индекс элемента: ошибки}
+    "LIST_SERIALIZER_ERRORS_AS_DICT": True,
+    # token bucket на клиента и throttle_scope вьюхи (edusite.throttling); None — без ограничения
+    "DEFAULT_THROTTLE_CLASSES": ["edusite.throttling.TokenBucketThrottle"],
+    "DEFAULT_THROTTLE_RATES": {
+        "courses": "600/min",
+        "lessons": "600/min",
+        "users": "300/min",
+        "payments": "300/min",
+        "changes": "300/min",
+    },
+}
+
+# ёмкость ведра по scope (сколько запросов подряд); по умолчанию — число из скорости
+THROTTLE_BURST = {"payments": 60}
+THROTTLE_CACHE_ALIAS = "throttle"
+
+# одновременные одинаковые GET-списки считаются один раз (edusite.coalesce):
+# "local" — потоки одного процесса, "file" — ещё и воркеры одной машины (flock),
+# "cache" — воркеры на разных машинах через общий кэш COALESCE_CACHE_ALIAS
+COALESCE_BACKEND = "local"
+COALESCE_CACHE_ALIAS = "default"
+COALESCE_LOCK_DIR = Path(tempfile.gettempdir()) / "edusite-coalesce"
+COALESCE_TIMEOUT = 30  # секунд: дольше лидера не ждём, считаем сами
+COALESCE_POLL_INTERVAL = 0.02
+
+# сколько последних платежей встраивать в /api/users/ (полная история — /api/users/<id>/payments/)
+USER_RECENT_PAYMENTS = 5
+
+# доступы к урокам (users.entitlements): пользователей в LRU процесса;
+# версии доступов — в общем кэше, чтобы оплата в одном воркере сбрасывала LRU остальных
+ENTITLEMENT_CACHE_SIZE = 10_000
+ENTITLEMENT_CACHE_ALIAS = "default"
+
+# платежи по месяцам (users.partitions, users.archive): секции PostgreSQL создаются на столько
+# месяцев вперёд (manage.py ensure_payment_partitions), закрытые месяцы старше PAYMENT_HOT_MONTHS
+# переносятся в холодное хранилище STORAGES["payment_archive"] (manage.py archive_payments)
+PAYMENT_PARTITIONS_AHEAD = 3
+PAYMENT_HOT_MONTHS = 12
+
+# строк за одну выборку из БД при потоковой выгрузке /api/payments/export/
+PAYMENT_EXPORT_CHUNK_SIZE = 2000
+# архивных строк в памяти при выгрузке в другой сортировке, чем -paid_at (users.archive.external_sort)
+PAYMENT_ARCHIVE_SORT_ROWS = 50_000
+
+# журнал изменений каталога /api/changes/ (lms.changes): записей на страницу (по умолчанию и максимум),
+# через сколько дней compact_changes удаляет надгробия (клиенты со старыми токенами — заново с since=0)
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
+CHANGES_TOMBSTONE_DAYS = 30
+
+# массовые POST/PATCH списком на /api/lessons/ и /api/payments/ (edusite.bulk)
+BULK_MAX_ITEMS = 1000
+BULK_BATCH_SIZE = 500
+
+# уменьшенные копии картинок (приложение thumbnails, воркер: manage.py process_thumbnails)
+THUMBNAIL_SIZES = {"small": (160, 160), "medium": (480, 480)}
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKER_PROCESSES = 2
+THUMBNAIL_MAX_ATTEMPTS = 5
+THUMBNAIL_RETRY_DELAY = 30  # секунд, удваивается с каждой попыткой
+THUMBNAIL_LOCK_TIMEOUT = 600  # секунд: задание «в работе» дольше — воркер умер, берём заново
+
+# замеры запросов (edusite.instrumentation): доля выбранных запросов (0 — выключено),
+# Server-Timing в ответе и гистограммы на /metrics
+INSTRUMENTATION_SAMPLE_RATE = 1.0 if DEBUG else 0.0
+# один и тот же SQL столько раз за запрос — N+1
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 5
+# /metrics: только с заголовком "Authorization: Bearer <METRICS_TOKEN>" (скрейпер Prometheus)
+# или для is_staff; в профиле api маршрута нет, пока не задан EDUSITE_METRICS_TOKEN
+METRICS_TOKEN = os.environ.get("EDUSITE_METRICS_TOKEN", "")
+METRICS_ENABLED = True
+
+# профиль развёртывания (переменная окружения EDUSITE_PROFILE):
+# "full" — всё, как при разработке; "api" — воркеры только с API: без админки, сессий,
+# сообщений, раздачи статики/медиа и браузерного API DRF — меньше импортов на холодном старте.
+# Замер: python manage.py bench_startup (edusite.startup), бюджет — STARTUP_BUDGET_SECONDS
+DEPLOYMENT_PROFILE = os.environ.get("EDUSITE_PROFILE", "full")
+SERVE_MEDIA = DEBUG
+STARTUP_BUDGET_SECONDS = 1.5  # импорт edusite.wsgi.application + первый запрос, профиль api (bench_startup)
+
+if DEPLOYMENT_PROFILE == "api":
+    API_SKIPPED_APPS = [
+        "django.contrib.admin",
+        "django.contrib.sessions",
+        "django.contrib.messages",
+        "django.contrib.staticfiles",
+    ]
+    API_SKIPPED_MIDDLEWARE = [
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "django.contrib.messages.middleware.MessageMiddleware",
+    ]
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_SKIPPED_APPS]
+    MIDDLEWARE = [m for m in MIDDLEWARE if m not in API_SKIPPED_MIDDLEWARE]
+    TEMPLATES[0]["OPTIONS"]["context_processors"] = [
+        p for p in TEMPLATES[0]["OPTIONS"]["context_processors"] if not p.startswith("django.contrib.messages")
+    ]
+    SERVE_MEDIA = False
+    METRICS_ENABLED = bool(METRICS_TOKEN)
+    # без сессий клиент входит по Basic; ответы — только JSON (шаблоны браузерного API не грузятся)
+    REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"] = ["rest_framework.authentication.BasicAuthentication"]
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = ["rest_framework.renderers.JSONRenderer"]
@@ -0,0 +1,10 @@
+"""
+Сигналы массовой записи (edusite.bulk). Отдельно от bulk, чтобы приложения подключали
+приёмники в ready() без импорта DRF: воркеры и команды не платят за него на старте.
+"""
+from django.dispatch import Signal
+
+# sender — модель; instances — сохранённые объекты; using — алиас БД
+post_bulk_create = Signal()
+# то же + previous: {pk: копия объекта до изменения}, fields: изменённые поля
+post_bulk_update = Signal()
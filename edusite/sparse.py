@@ -0,0 +1,192 @@
+"""
+Выборочные поля ответа для GET list/retrieve:
+
+    /api/courses/?fields=id,title                 -> [{"id": 1, "title": "..."}]
+    /api/courses/?fields=id,title&expand=lessons  -> + встроенные уроки
+    /api/payments/?expand=course,user             -> course и user — объекты вместо id
+
+- ?fields= — только перечисленные поля верхнего уровня сериализатора;
+- ?expand= — связи из Meta.expandable сериализатора (вместо id — вложенный объект,
+  поля — Meta.expanded_fields связанного сериализатора) и любые поля, которые
+  ?fields= иначе отбросил бы. Неизвестные имена — 400. Без параметров ответ прежний.
+
+Queryset подстраивается под выбор: field_querysets вьюхи (prefetch_related, annotate)
+применяются только для выбранных полей, а при ?fields= — ещё only() по колонкам
+и select_related только по связям, которые читают выбранные поля.
+Так courses?fields=id,title — один SELECT id, title без обращения к урокам.
+Запись (POST/PUT/PATCH) параметры не меняют: вход валидирует полный сериализатор.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+# свои @action строят ответ сами — им queryset под сериализатор не нужен
+SERIALIZER_ACTIONS = (None, "list", "retrieve", "create", "update", "partial_update", "destroy")
+
+
+def parse_names(request, param):
+    raw = request.query_params.get(param)
+    if raw is None:
+        return None
+    return list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+
+
+def resolve(serializer_class):
+    return import_string(serializer_class) if isinstance(serializer_class, str) else serializer_class
+
+
+class SparseFieldsSerializerMixin:
+    """
+    fields=[...] — оставить только эти поля, expand=[...] — развернуть связи Meta.expandable.
+    Передаются в конструктор (вьюхой — SparseFieldsMixin.get_serializer),
+    поэтому до вложенных сериализаторов не доходят.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.sparse_fields = fields
+        self.sparse_expand = expand or ()
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, "expandable", {})
+        for name in self.sparse_expand:
+            if name in expandable:
+                nested = resolve(expandable[name])
+                fields[name] = nested(read_only=True, fields=getattr(nested.Meta, "expanded_fields", None))
+        if self.sparse_fields is None:
+            return fields
+        selected = {*self.sparse_fields, *self.sparse_expand}
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+@lru_cache(maxsize=None)
+def field_sources(serializer_class):
+    # имя поля -> source; сериализатор без данных создаётся один раз на класс
+    return {name: field.source for name, field in serializer_class().fields.items() if not field.write_only}
+
+
+def ordering_columns(queryset):
+    """
+    Колонки модели в порядке queryset (или Meta.ordering): их читает курсор keyset-пагинации.
+    """
+    opts = queryset.model._meta
+    ordering = list(queryset.query.order_by) or list(opts.ordering)
+    columns = []
+    for name in (f.lstrip("-") for f in ordering if isinstance(f, str)):
+        try:
+            field = opts.pk if name == "pk" else opts.get_field(name)
+        except FieldDoesNotExist:
+            continue  # аннотация (например, ранг поиска)
+        if field.concrete:
+            columns.append(field.name)
+    return columns
+
+
+def restrict_columns(queryset, serializer_class, names, expand, field_querysets):
+    """
+    only() по колонкам, которые читают выбранные поля, select_related — по связям из source
+    вида course.title и развёрнутым связям. Если про поле это не понять
+    (нет ни колонки, ни field_querysets) — queryset без only().
+    """
+    model = queryset.model
+    sources = field_sources(serializer_class)
+    expandable = getattr(serializer_class.Meta, "expandable", {})
+    columns, related = [*ordering_columns(queryset)], []
+    for name in names:
+        if name in field_querysets:
+            continue
+        source = sources.get(name)
+        if source is None or source == "*":
+            return queryset
+        head, _, rest = source.partition(".")
+        try:
+            field = model._meta.get_field(head)
+        except FieldDoesNotExist:
+            return queryset
+        if not field.concrete:
+            return queryset
+        if (name in expand and name in expandable) or rest:
+            if not field.is_relation or "." in rest:
+                return queryset
+            related.append(head)
+            # у развёрнутой связи берутся все колонки, у course.title — только title
+            if rest:
+                columns.append(f"{head}__{rest}")
+        columns.append(head)
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*dict.fromkeys(related))
+    return queryset.only(*dict.fromkeys(columns))
+
+
+class SparseFieldsMixin:
+    """
+    Для DRF-вьюх (и edusite.async_api): ?fields= / ?expand= (сериализатор —
+    с SparseFieldsSerializerMixin) и queryset под выбранные поля.
+
+    field_querysets — {поле ответа: функция(queryset) -> queryset}: что нужно полю
+    сверх колонок модели (prefetch_related, annotate). Применяется, только если поле выбрано.
+    """
+    field_querysets = {}
+
+    def get_sparse(self):
+        """
+        (fields или None, expand) из запроса; вне GET list/retrieve — (None, ()).
+        """
+        if not hasattr(self, "_sparse"):
+            self._sparse = (None, ())
+            action = getattr(self, "action", None)
+            if self.request.method in ("GET", "HEAD") and action in (None, "list", "retrieve"):
+                fields = parse_names(self.request, FIELDS_PARAM)
+                expand = parse_names(self.request, EXPAND_PARAM) or []
+                known = self.get_serializer_class().Meta.fields
+                errors = {}
+                for param, names in ((FIELDS_PARAM, fields or []), (EXPAND_PARAM, expand)):
+                    unknown = [name for name in names if name not in known]
+                    if unknown:
+                        errors[param] = f"Неизвестные поля: {', '.join(unknown)}"
+                if errors:
+                    raise ValidationError(errors)
+                self._sparse = (fields, tuple(expand))
+        return self._sparse
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_sparse()
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        if expand:
+            kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, "action", None) not in SERIALIZER_ACTIONS:
+            return queryset
+        return self.sparse_queryset(queryset)
+
+    def sparse_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        fields, expand = self.get_sparse()
+        names = serializer_class.Meta.fields if fields is None else [*fields, *expand]
+        for name in names:
+            if name in self.field_querysets:
+                queryset = self.field_querysets[name](queryset)
+        expandable = getattr(serializer_class.Meta, "expandable", {})
+        if fields is not None:
+            queryset = restrict_columns(queryset, serializer_class, names, expand, self.field_querysets)
+        elif any(name in expandable for name in expand):
+            queryset = queryset.select_related(*(name for name in expand if name in expandable))
+        return queryset
+
+
+def selection(view):
+    """
+    (fields или None, expand) вьюхи; для вьюх без SparseFieldsMixin — (None, ()).
+    """
+    get_sparse = getattr(view, "get_sparse", None)
+    return get_sparse() if get_sparse is not None else (None, ())
@@ -0,0 +1,74 @@
+"""
+Холодный старт воркера: импорт edusite.wsgi.application и первый запрос в свежем интерпретаторе.
+
+- measure(profile) — время импорта и первого запроса (лучший из нескольких запусков)
+  и модули, загруженные к концу первого запроса;
+- importtime(profile) — разбивка python -X importtime по пакетам верхнего уровня.
+
+Замер всегда в отдельном процессе (в текущем всё уже импортировано),
+профиль — EDUSITE_PROFILE (edusite.settings: "full" или "api").
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# первый запрос — корень API: грузит urls, вьюхи и DRF, но не ходит в БД
+SCRIPT = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+from edusite.wsgi import application
+imported = time.perf_counter()
+environ = {"PATH_INFO": "/api/", "HTTP_HOST": "localhost", "HTTP_ACCEPT": "application/json"}
+setup_testing_defaults(environ)
+statuses = []
+b"".join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+finished = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "first_request": finished - imported,
+    "status": statuses[0],
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def run(profile, *args):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "edusite.settings", "EDUSITE_PROFILE": profile}
+    return subprocess.run(
+        [sys.executable, *args, "-c", SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def measure(profile, repeat=3):
+    """
+    {"import": с, "first_request": с, "total": с, "status": ..., "modules": set(...)} — лучший запуск.
+    """
+    runs = [json.loads(run(profile).stdout) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r["import"] + r["first_request"])
+    best["total"] = best["import"] + best["first_request"]
+    best["modules"] = set(best["modules"])
+    return best
+
+
+def importtime(profile):
+    """
+    {пакет верхнего уровня: [собственное время импорта, мкс; модулей]} — по убыванию времени.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for line in run(profile, "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, _cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not own.isdigit():
+            continue  # заголовок
+        package = totals[name.split(".")[0]]
+        package[0] += int(own)
+        package[1] += 1
+    return dict(sorted(totals.items(), key=lambda item: -item[1][0]))
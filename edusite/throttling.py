@@ -0,0 +1,74 @@
+"""
+Ограничение частоты запросов: token bucket на клиента и scope вьюхи.
+
+- Scope — throttle_scope вьюхи (courses, lessons, users, payments), скорость —
+  REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"][scope] в формате DRF ("120/min");
+  вьюхи без scope или со скоростью None не ограничиваются.
+- Ведро вмещает THROTTLE_BURST[scope] запросов (по умолчанию — число из скорости)
+  и пополняется равномерно: 120/min — токен каждые 0.5 с. Пустое ведро — 429 с Retry-After.
+- Клиент — пользователь (если вошёл) или IP (get_ident, с учётом NUM_PROXIES).
+- Состояние ведра — в кэше THROTTLE_CACHE_ALIAS: в процессе обновление под блокировкой,
+  между воркерами — общий кэш (Redis/Memcached), гонка двух воркеров может пропустить
+  лишний запрос, но не заблокировать лишний.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """
+    "120/min" -> (120, 60): как SimpleRateThrottle.parse_rate.
+    """
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    cache_prefix = "throttle"
+    lock = threading.Lock()
+
+    def get_bucket(self, view):
+        """
+        (ёмкость, токенов в секунду) для scope вьюхи или None — без ограничения.
+        """
+        scope = getattr(view, "throttle_scope", None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None:
+            return None
+        num, duration = parse_rate(rate)
+        return settings.THROTTLE_BURST.get(scope, num), num / duration
+
+    def get_client(self, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"user:{user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        bucket = self.get_bucket(view)
+        if bucket is None:
+            return True
+        capacity, refill = bucket
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        key = f"{self.cache_prefix}:{view.throttle_scope}:{self.get_client(request)}"
+        with self.lock:
+            now = time.time()
+            tokens, stamp = cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # ключ живёт, пока ведро не наполнится заново
+            cache.set(key, (tokens, now), timeout=int((capacity - tokens) / refill) + 1)
+        self._wait = None if allowed else (1 - tokens) / refill
+        return allowed
+
+    def wait(self):
+        return getattr(self, "_wait", None)
@@ -1,24 +1,42 @@
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework.routers import DefaultRouter
 from django.views.generic import RedirectView
 
+from edusite.bulk import BulkRouter
+from edusite.instrumentation import metrics_view
+from lms.async_views import AsyncCourseView, AsyncLessonView
 from lms.views import CourseViewSet
+from users.async_views import AsyncPaymentView
 from users.views import UserViewSet, PaymentViewSet
 
-router = DefaultRouter()
+router = BulkRouter()
 router.register(r"courses", CourseViewSet, basename="course")
 router.register(r"users", UserViewSet, basename="user")
 router.register(r"payments", PaymentViewSet, basename="payment")
 
 urlpatterns = [
     path("", RedirectView.as_view(url="/api/", permanent=False)),  # ← вот это
-    path("admin/", admin.site.urls),
     path("api/", include(router.urls)),
     path("api/", include("lms.urls")),
+    # то же чтение через async ORM (под ASGI: edusite.asgi)
+    path("api/async/courses/", AsyncCourseView.as_view(), name="async-course-list"),
+    path("api/async/courses/<int:pk>/", AsyncCourseView.as_view(), name="async-course-detail"),
+    path("api/async/lessons/", AsyncLessonView.as_view(), name="async-lesson-list"),
+    path("api/async/lessons/<int:pk>/", AsyncLessonView.as_view(), name="async-lesson-detail"),
+    path("api/async/payments/", AsyncPaymentView.as_view(), name="async-payment-list"),
+    path("api/async/payments/<int:pk>/", AsyncPaymentView.as_view(), name="async-payment-detail"),
 ]
 
-if settings.DEBUG:
+# метрики — под токеном или is_staff (edusite.instrumentation); в профиле api — только с токеном
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path("metrics", metrics_view, name="metrics"))
+
+# в профиле api (EDUSITE_PROFILE=api) админки нет — и её модули не импортируются
+if "django.contrib.admin" in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
+
+if settings.SERVE_MEDIA:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,13 +1,14 @@
 from django.contrib import admin
+from search.filters import FullTextSearchAdminMixin
 from .models import Course, Lesson
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ("id", "title")
     search_fields = ("title",)
 
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ("id", "title", "course")
     list_filter = ("course",)
     search_fields = ("title",)
\ No newline at end of file
@@ -0,0 +1,36 @@
+from edusite.async_api import AsyncReadOnlyView
+from users import entitlements
+from .views import CourseViewSet, LessonListCreateAPIView
+
+# Те же queryset, фильтры и пагинация, что у синхронных вьюх (lms.views), —
+# ответы совпадают, меняется только способ чтения из БД (edusite.async_api).
+
+
+class AsyncCourseView(AsyncReadOnlyView):
+    queryset = CourseViewSet.queryset
+    field_querysets = CourseViewSet.field_querysets
+    serializer_class = CourseViewSet.serializer_class
+    filterset_class = CourseViewSet.filterset_class
+    ordering_fields = CourseViewSet.ordering_fields
+    search_fields = CourseViewSet.search_fields
+    permission_classes = CourseViewSet.permission_classes
+    throttle_scope = CourseViewSet.throttle_scope
+
+    def initial(self):
+        super().initial()
+        # is_accessible вложенных уроков: доступы читаются здесь, а не в event loop
+        entitlements.for_request(self.request)
+
+
+class AsyncLessonView(AsyncReadOnlyView):
+    queryset = LessonListCreateAPIView.queryset
+    serializer_class = LessonListCreateAPIView.serializer_class
+    pagination_class = LessonListCreateAPIView.pagination_class
+    search_fields = LessonListCreateAPIView.search_fields
+    fast_list = LessonListCreateAPIView.fast_list
+    permission_classes = LessonListCreateAPIView.permission_classes
+    throttle_scope = LessonListCreateAPIView.throttle_scope
+
+    def initial(self):
+        super().initial()
+        entitlements.for_request(self.request)
@@ -0,0 +1,208 @@
+"""
+Кэш ответов каталога (/api/courses/, /api/lessons/) с версионной инвалидацией.
+
+Версии хранятся в том же кэше:
+- course:<id> — растёт при изменении курса или любого его урока;
+- courses / lessons — «состав» списка: растёт при любом изменении курсов / уроков;
+- writes — любая запись в каталог: если она случилась, пока запрос читал БД,
+  ответ не кэшируется (мог прочитать данные до коммита).
+С репликами (edusite.replicas) ответ, прочитанный с реплики в первые
+READ_AFTER_WRITE_SECONDS после записи, не кэшируется (реплика могла ещё не догнать),
+а клиент в окне read-your-writes кэш не читает — только default.
+Запись списка курсов помнит версии курсов на странице: правка урока инвалидирует
+только страницы и детальные ответы его курса, остальные продолжают отдаваться из кэша.
+Уроки в ответе несут is_accessible (users.entitlements), поэтому ответы вошедшего
+пользователя кэшируются отдельно и зависят от версии user:<id> — её меняют его платежи;
+анонимы делят одни записи.
+
+Бэкенд — settings.CACHES[CATALOG_CACHE_ALIAS]: LocMemCache (LRU по MAX_ENTRIES)
+или любой общий кэш (Redis/Memcached) без изменений в коде.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.response import Response
+
+from edusite import replicas
+
+PREFIX = "catalog"
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def version_key(name):
+    return f"{PREFIX}:v:{name}"
+
+
+def get_versions(*names):
+    """
+    Текущие версии; отсутствующие (ещё не было или вытеснены) заводятся от time_ns,
+    чтобы не совпасть с версией, записанной в старых ответах.
+    """
+    cache = get_cache()
+    keys = [version_key(n) for n in names]
+    found = cache.get_many(keys)
+    missing = {k: time.time_ns() for k in keys if k not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {name: found[key] for name, key in zip(names, keys)}
+
+
+def bump(*names):
+    cache = get_cache()
+    for name in (*names, "writes"):
+        try:
+            cache.incr(version_key(name))
+        except ValueError:
+            cache.set(version_key(name), time.time_ns(), timeout=None)
+    cache.set(f"{PREFIX}:written_at", time.time(), timeout=None)
+
+
+def replica_may_lag():
+    """
+    Запрос читает с реплики, а последняя запись в каталог была недавно.
+    """
+    if replicas.read_alias.get() is None:
+        return False
+    written_at = get_cache().get(f"{PREFIX}:written_at", 0)
+    return time.time() - written_at < settings.READ_AFTER_WRITE_SECONDS
+
+
+def record(outcome):
+    cache = get_cache()
+    key = f"{PREFIX}:stats:{outcome}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def stats():
+    """
+    Счётчики попаданий/промахов (общие для всех процессов при общем кэше).
+    """
+    found = get_cache().get_many([f"{PREFIX}:stats:hit", f"{PREFIX}:stats:miss"])
+    return {
+        "hit": found.get(f"{PREFIX}:stats:hit", 0),
+        "miss": found.get(f"{PREFIX}:stats:miss", 0),
+    }
+
+
+class CachedResponseMixin:
+    """
+    Кэширует JSON-ответы GET list/retrieve. Проверки DRF (аутентификация, права, троттлинг)
+    выполняются до обращения к кэшу — кэшируется только сам ответ.
+
+    cache_membership — имя версии «состава» списка;
+    get_cache_dependencies(data) — имена версий, от которых зависит содержимое ответа.
+    """
+    cache_membership = None
+    cache_actions = ("list", "retrieve")
+
+    def get_cache_dependencies(self, data):
+        return []
+
+    def get_cache_key(self):
+        request = self.request
+        params = sorted((k, sorted(request.query_params.getlist(k))) for k in request.query_params)
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        raw = repr((type(self).__name__, self.get_cache_action(), lookup, params, self.get_cache_user()))
+        digest = hashlib.sha1(raw.encode()).hexdigest()
+        membership = ""
+        if self.cache_membership:
+            membership = get_versions(self.cache_membership)[self.cache_membership]
+        return f"{PREFIX}:resp:{digest}:{membership}"
+
+    def get_cache_user(self):
+        user = self.request.user
+        return user.pk if user.is_authenticated else None
+
+    def get_cache_action(self):
+        action = getattr(self, "action", None)
+        if action is None:
+            # generic-вьюхи без router: детальный — если в URL есть pk
+            action = "retrieve" if (self.lookup_url_kwarg or self.lookup_field) in self.kwargs else "list"
+        return action
+
+    def is_cacheable(self):
+        return (
+            self.request.method in ("GET", "HEAD")
+            and self.get_cache_action() in self.cache_actions
+            and self.request.accepted_renderer.format == "json"
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._cache_key = None
+        if self.is_cacheable():
+            self._cache_epoch = get_versions("writes")
+            self._cache_key = self.get_cache_key()
+
+    def get_cached_response(self):
+        entry = get_cache().get(self._cache_key)
+        if entry is None:
+            return None
+        # ответ устарел, если с момента записи сменилась версия хоть одной зависимости
+        if entry["deps"] and get_versions(*entry["deps"]) != entry["deps"]:
+            return None
+        return entry
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_or(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_or(super().retrieve, request, *args, **kwargs)
+
+    def cached_or(self, handler, request, *args, **kwargs):
+        # окно read-your-writes: ответ из кэша мог быть собран до записи этого клиента
+        pinned = replicas.is_pinned(request)
+        entry = self.get_cached_response() if self._cache_key and not pinned else None
+        if entry is None:
+            if self._cache_key:
+                record("miss")
+            return handler(request, *args, **kwargs)
+        record("hit")
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+        response["ETag"] = entry["etag"]
+        response["X-Cache"] = "HIT"
+        return self.not_modified(response) or response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "_cache_key", None) and isinstance(response, Response) and response.status_code == 200:
+            deps = self.get_cache_dependencies(response.data)
+            if self.get_cache_user() is not None:
+                deps = [*deps, f"user:{self.get_cache_user()}"]
+            versions = get_versions(*deps) if deps else {}
+            response.render()
+            etag = f'"{hashlib.sha1(response.content).hexdigest()}"'
+            if get_versions("writes") == self._cache_epoch and not replica_may_lag():
+                get_cache().set(self._cache_key, {
+                    "content": response.content,
+                    "content_type": response["Content-Type"],
+                    "etag": etag,
+                    "deps": versions,
+                })
+            response["ETag"] = etag
+            response["X-Cache"] = "MISS"
+            response = self.not_modified(response) or response
+        if getattr(self, "_cache_key", None):
+            patch_vary_headers(response, ["Accept", "Authorization", "Cookie"])
+        return response
+
+    def not_modified(self, response):
+        if_none_match = self.request.META.get("HTTP_IF_NONE_MATCH", "")
+        etags = {tag.strip() for tag in if_none_match.split(",")}
+        if response["ETag"] in etags or "*" in etags:
+            not_modified = HttpResponseNotModified()
+            not_modified["ETag"] = response["ETag"]
+            return not_modified
+        return None
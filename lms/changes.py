@@ -0,0 +1,159 @@
+"""
+Журнал изменений каталога для инкрементальной синхронизации: /api/changes/?since=<токен>.
+
+- Каждая запись курса или урока (save, delete, массовые POST/PATCH) добавляет CatalogChange
+  в той же транзакции (сигналы lms.signals); удаление — надгробие (deleted=True).
+  Счётчики курса (lms.counters) журнал не трогают: они не часть содержимого каталога.
+- Токен — CatalogChange.seq, а не id: id выдаётся при INSERT, и транзакция с меньшим id может
+  закоммититься позже, чем клиент прочитал больший. seq присваивает sequence() уже закоммиченным
+  записям (on_commit записи) под блокировкой строки CatalogChangeSequence, поэтому запись,
+  закоммиченная позже, получает seq больше всех выданных. Записи без seq (on_commit не выполнился —
+  процесс упал) добирает sequence() следующей записи каталога или compact_changes; до тех пор их не видно.
+- feed(since, limit) — только чтение (годится для реплики, edusite.replicas): изменения после токена
+  по возрастанию seq; на объект — его последняя запись в странице, данные — текущие
+  (курс без уроков и счётчиков, урок без is_accessible).
+- compact(...) — оставляет по одной (последней) записи на объект и удаляет надгробия старше
+  CHANGES_TOMBSTONE_DAYS; токены до удалённых надгробий получают 410 (пересинхронизация с since=0).
+"""
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, Max, Min, OuterRef, Subquery
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import CatalogChange, CatalogChangeCompaction, CatalogChangeSequence, Course, Lesson
+
+KINDS = {Course: CatalogChange.Kind.COURSE, Lesson: CatalogChange.Kind.LESSON}
+MODELS = {kind: model for model, kind in KINDS.items()}
+# поля данных в ленте: без вложенных уроков, счётчиков и полей, зависящих от пользователя
+FIELDS = {
+    CatalogChange.Kind.COURSE: ["id", "title", "preview", "preview_thumbnails", "description", "updated_at"],
+    CatalogChange.Kind.LESSON: [
+        "id", "course", "title", "description", "preview", "preview_thumbnails", "video_url", "updated_at",
+    ],
+}
+
+
+class TokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Токен старше сжатия журнала: начните синхронизацию заново с since=0."
+    default_code = "token_expired"
+
+
+def record(model, ids, deleted=False):
+    """
+    Добавляет записи журнала об объектах model с данными id.
+    """
+    CatalogChange.objects.bulk_create(
+        [CatalogChange(kind=KINDS[model], object_id=pk, deleted=deleted) for pk in ids],
+        batch_size=settings.BULK_BATCH_SIZE,
+    )
+    # ошибку присвоения (например, занятую БД) только логируем: записи доберёт следующий sequence()
+    transaction.on_commit(sequence, robust=True)
+
+
+def sequence():
+    """
+    Присваивает seq закоммиченным записям без него, по порядку id. Возвращает их число.
+    """
+    with transaction.atomic():
+        counter, _ = CatalogChangeSequence.objects.select_for_update().get_or_create(pk=1)
+        pending = CatalogChange.objects.filter(seq__isnull=True)
+        bounds = pending.aggregate(first=Min("id"), last=Max("id"))
+        if bounds["first"] is None:
+            return 0
+        # seq = id + сдвиг: одним UPDATE, уникально и больше counter.last (пропуски не мешают)
+        offset = counter.last + 1 - bounds["first"]
+        numbered = pending.filter(id__range=(bounds["first"], bounds["last"])).update(seq=F("id") + offset)
+        counter.last = bounds["last"] + offset
+        counter.save(update_fields=["last"])
+    return numbered
+
+
+def backfill(batch_size=10_000):
+    """
+    Записи об объектах, которых в журнале нет (загруженных bulk_create без сигналов). Возвращает их число.
+    """
+    total = 0
+    for model, kind in KINDS.items():
+        logged = CatalogChange.objects.filter(kind=kind, object_id=OuterRef("pk"))
+        ids = model.objects.filter(~Exists(logged)).order_by("id").values_list("id", flat=True)
+        ids = ids.iterator(chunk_size=batch_size)
+        while batch := list(islice(ids, batch_size)):
+            record(model, batch)
+            total += len(batch)
+    return total
+
+
+def horizon():
+    """
+    Минимальный действительный токен (0 — надгробия ещё не удалялись).
+    """
+    return CatalogChangeCompaction.objects.aggregate(through=Max("through"))["through"] or 0
+
+
+def feed(since, limit, context=None):
+    """
+    {"results": [...], "next": токен, "has_more": bool}. since=0 — весь каталог.
+    """
+    from .serializers import CourseSerializer, LessonSerializer
+
+    if since and since < horizon():
+        raise TokenExpired()
+    entries = list(CatalogChange.objects.filter(seq__gt=since).order_by("seq")[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # по объекту — последняя запись страницы, порядок — по её seq
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.kind, entry.object_id), None)
+        latest[entry.kind, entry.object_id] = entry
+    serializers = {CatalogChange.Kind.COURSE: CourseSerializer, CatalogChange.Kind.LESSON: LessonSerializer}
+    data = {}
+    for kind, model in MODELS.items():
+        ids = [entry.object_id for (k, _pk), entry in latest.items() if k == kind and not entry.deleted]
+        if ids:
+            objects = model.objects.filter(pk__in=ids).order_by("id")
+            rows = serializers[kind](objects, many=True, fields=FIELDS[kind], context=context or {}).data
+            data.update(((kind, row["id"]), row) for row in rows)
+
+    results = []
+    for key, entry in latest.items():
+        # объекта уже нет, а надгробие — дальше токена: отдаём удаление сейчас
+        row = data.get(key)
+        results.append({
+            "token": entry.seq,
+            "type": entry.kind,
+            "id": entry.object_id,
+            "op": "upsert" if row is not None else "delete",
+            "data": row,
+        })
+    return {"results": results, "next": entries[-1].seq if entries else since, "has_more": has_more}
+
+
+def compact(tombstone_days=None):
+    """
+    Сжимает журнал. Возвращает (удалено перекрытых записей, удалено надгробий).
+    """
+    if tombstone_days is None:
+        tombstone_days = settings.CHANGES_TOMBSTONE_DAYS
+    sequence()
+    # записи одного объекта пишутся под блокировкой его строки: порядок id — порядок seq
+    latest = CatalogChange.objects.filter(kind=OuterRef("kind"), object_id=OuterRef("object_id")).order_by("-id")
+    with transaction.atomic():
+        superseded, _ = CatalogChange.objects.exclude(id=Subquery(latest.values("id")[:1])).delete()
+        tombstones = CatalogChange.objects.filter(
+            deleted=True, changed_at__lt=timezone.now() - timedelta(days=tombstone_days),
+        )
+        through = tombstones.aggregate(last=Max("seq"))["last"]
+        removed = 0
+        if through is not None:
+            removed, _ = tombstones.filter(seq__lte=through).delete()
+            # клиент с токеном < through мог не увидеть удалённое надгробие
+            CatalogChangeCompaction.objects.create(through=through, removed=removed)
+    return superseded, removed
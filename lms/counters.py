@@ -0,0 +1,115 @@
+"""
+Счётчики на Course: lessons_count, payments_count, revenue_total (платежи за сам курс —
+как /api/payments/stats/?group_by=course). Меняются F()-выражениями из сигналов
+уроков и платежей (lms.signals, users.signals), включая bulk-пути и каскадное удаление,
+поэтому список курсов сортируется и фильтруется по ним без JOIN и агрегатов.
+Расхождения находит и чинит manage.py reconcile_course_counters.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, QuerySet, Sum
+
+from .models import COUNTER_FIELDS as FIELDS, Course, Lesson
+
+
+def adjust(course_id, lessons=0, payments=0, revenue=0):
+    adjust_many([(course_id, lessons, payments, revenue)])
+
+
+def adjust_many(changes):
+    """
+    changes — [(course_id, Δуроков, Δплатежей, Δвыручки)]; дельты по курсу суммируются,
+    на курс — один UPDATE.
+    """
+    from .signals import invalidate
+
+    totals = defaultdict(lambda: [0, 0, Decimal("0")])
+    for course_id, lessons, payments, revenue in changes:
+        if course_id is None:
+            continue
+        row = totals[course_id]
+        row[0] += lessons
+        row[1] += payments
+        row[2] += revenue
+    touched = []
+    for course_id, (lessons, payments, revenue) in totals.items():
+        update = {}
+        if lessons:
+            update["lessons_count"] = F("lessons_count") + lessons
+        if payments:
+            update["payments_count"] = F("payments_count") + payments
+        if revenue:
+            update["revenue_total"] = F("revenue_total") + revenue
+        if update:
+            Course.objects.filter(pk=course_id).update(**update)
+            touched.append(course_id)
+    if touched:
+        # счётчики есть в ответах и в сортировке списка курсов
+        invalidate(*(f"course:{course_id}" for course_id in touched), "courses")
+
+
+def deleting_course(origin):
+    """
+    Удаление началось с курса (каскад) — его счётчики обновлять незачем.
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model is Course
+    return isinstance(origin, Course)
+
+
+def actual(course_ids):
+    """
+    Счётчики, посчитанные по урокам и платежам: {course_id: (уроков, платежей, выручка)}.
+    """
+    from users import archive
+    from users.models import Payment
+
+    result = {pk: [0, 0, Decimal("0")] for pk in course_ids}
+    lessons = Lesson.objects.filter(course_id__in=course_ids).values("course_id").annotate(n=Count("id"))
+    for row in lessons.order_by():
+        result[row["course_id"]][0] = row["n"]
+    payments = (
+        Payment.objects.filter(course_id__in=course_ids)
+        .values("course_id").annotate(n=Count("id"), total=Sum("amount"))
+    )
+    for row in payments.order_by():
+        result[row["course_id"]][1] = row["n"]
+        result[row["course_id"]][2] = row["total"] or Decimal("0")
+    # платежи закрытых месяцев перенесены в архив, но в счётчиках остаются
+    for pk, (count, amount) in archive.course_totals(course_ids).items():
+        result[pk][1] += count
+        result[pk][2] += amount
+    return {pk: tuple(values) for pk, values in result.items()}
+
+
+def reconcile(batch_size=1000, fix=True):
+    """
+    Сверяет сохранённые счётчики с фактическими пачками курсов по batch_size.
+    Возвращает [(course_id, сохранено, фактически)] расхождений; fix=True — исправляет.
+    Строки пачки блокируются (select_for_update) до пересчёта: F()-обновление из параллельной
+    записи ждёт и ложится поверх исправленного значения, а не теряется.
+    """
+    from .signals import invalidate
+
+    drift = []
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            stored = Course.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", *FIELDS)
+            if fix:
+                stored = stored.select_for_update()
+            stored = list(stored[:batch_size])
+            if not stored:
+                break
+            last_id = stored[-1][0]
+            expected = actual([row[0] for row in stored])
+            for pk, *values in stored:
+                if tuple(values) != expected[pk]:
+                    drift.append((pk, tuple(values), expected[pk]))
+                    if fix:
+                        Course.objects.filter(pk=pk).update(**dict(zip(FIELDS, expected[pk])))
+    if fix and drift:
+        invalidate(*(f"course:{pk}" for pk, _stored, _expected in drift), "courses")
+    return drift
@@ -0,0 +1,19 @@
+import django_filters
+from .models import Course
+
+class CourseFilter(django_filters.FilterSet):
+    # по денормализованным счётчикам — условия на колонки Course, без JOIN
+    lessons_count__gte = django_filters.NumberFilter(field_name="lessons_count", lookup_expr="gte")
+    lessons_count__lte = django_filters.NumberFilter(field_name="lessons_count", lookup_expr="lte")
+    payments_count__gte = django_filters.NumberFilter(field_name="payments_count", lookup_expr="gte")
+    payments_count__lte = django_filters.NumberFilter(field_name="payments_count", lookup_expr="lte")
+    revenue_total__gte = django_filters.NumberFilter(field_name="revenue_total", lookup_expr="gte")
+    revenue_total__lte = django_filters.NumberFilter(field_name="revenue_total", lookup_expr="lte")
+
+    class Meta:
+        model = Course
+        fields = [
+            "lessons_count__gte", "lessons_count__lte",
+            "payments_count__gte", "payments_count__lte",
+            "revenue_total__gte", "revenue_total__lte",
+        ]
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lms import changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Нумерует записи журнала изменений каталога, оставшиеся без seq, и сжимает журнал (/api/changes/): "
+        "по одной последней записи на объект, "
+        "надгробия старше --tombstone-days удаляются (клиенты с токенами до них получат 410). "
+        "--backfill — сначала дописать объекты, загруженные в обход сигналов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tombstone-days", type=int, default=settings.CHANGES_TOMBSTONE_DAYS)
+        parser.add_argument("--backfill", action="store_true", help="дописать в журнал объекты без записей")
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            self.stdout.write(f"Дописано в журнал: {changes.backfill()}")
+        superseded, removed = changes.compact(tombstone_days=options["tombstone_days"])
+        self.stdout.write(self.style.SUCCESS(f"Удалено перекрытых записей: {superseded}, надгробий: {removed}"))
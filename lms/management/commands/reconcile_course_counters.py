@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from lms.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет счётчики курсов (lessons_count, payments_count, revenue_total) с уроками и платежами "
+        "и исправляет расхождения (после bulk-загрузок и правок в обход ORM)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="курсов за проход")
+        parser.add_argument("--dry-run", action="store_true", help="только показать расхождения")
+
+    def handle(self, *args, **options):
+        drift = reconcile(batch_size=options["batch_size"], fix=not options["dry_run"])
+        for pk, stored, expected in drift:
+            self.stdout.write(f"course {pk}: {stored} -> {expected}")
+        verb = "найдено" if options["dry_run"] else "исправлено"
+        self.stdout.write(self.style.SUCCESS(f"Расхождений {verb}: {len(drift)}"))
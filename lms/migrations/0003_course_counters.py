@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:24
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    # один UPDATE с подзапросами; дальше счётчики ведут сигналы (lms.counters)
+    Course = apps.get_model('lms', 'Course')
+    Lesson = apps.get_model('lms', 'Lesson')
+    Payment = apps.get_model('users', 'Payment')
+    lessons = Lesson.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(n=Count('id')).values('n')
+    payments = Payment.objects.filter(course=OuterRef('pk')).order_by().values('course')
+    Course.objects.update(
+        lessons_count=Coalesce(Subquery(lessons), 0),
+        payments_count=Coalesce(Subquery(payments.annotate(n=Count('id')).values('n')), 0),
+        revenue_total=Coalesce(
+            Subquery(payments.annotate(total=Sum('amount')).values('total')),
+            Value(Decimal('0')), output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0002_preview_thumbnails'),
+        ('users', '0005_user_avatar_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='payments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='revenue_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['lessons_count', 'id'], name='course_lessons_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['payments_count', 'id'], name='course_payments_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['revenue_total', 'id'], name='course_revenue_total_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:47
+
+from itertools import islice
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_changes(apps, schema_editor):
+    # весь текущий каталог — в журнал: /api/changes/?since=0 отдаёт его целиком
+    CatalogChange = apps.get_model('lms', 'CatalogChange')
+    for kind, model in (('course', 'Course'), ('lesson', 'Lesson')):
+        ids = apps.get_model('lms', model).objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=10_000)
+        while batch := list(islice(ids, 10_000)):
+            CatalogChange.objects.bulk_create([CatalogChange(kind=kind, object_id=pk) for pk in batch])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0003_course_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChangeCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('through', models.BigIntegerField()),
+                ('removed', models.PositiveIntegerField(default=0)),
+                ('compacted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('course', 'Курс'), ('lesson', 'Урок')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id', 'id'], name='catalog_change_object_idx'), models.Index(fields=['deleted', 'changed_at'], name='catalog_change_tombstone_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing(apps, schema_editor):
+    # прежние токены — id записей: seq = id, выданные клиентам токены остаются действительными
+    CatalogChange = apps.get_model('lms', 'CatalogChange')
+    CatalogChange.objects.update(seq=F('id'))
+    last = CatalogChange.objects.aggregate(last=Max('id'))['last'] or 0
+    apps.get_model('lms', 'CatalogChangeSequence').objects.create(pk=1, last=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0004_catalog_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='catalogchange',
+            name='seq',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing, migrations.RunPython.noop),
+    ]
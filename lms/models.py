@@ -1,9 +1,45 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+
+# ведутся F()-выражениями из сигналов (lms.counters), обычный save их не пишет
+COUNTER_FIELDS = ("lessons_count", "payments_count", "revenue_total")
+
+def with_updated_at(update_fields):
+    # save(update_fields=[...]) без updated_at не записал бы время правки
+    if update_fields is None:
+        return None
+    return {*update_fields, "updated_at"}
 
 class Course(models.Model):
     title = models.CharField(max_length=255)
     preview = models.ImageField(upload_to="courses/", blank=True, null=True)
+    # уменьшенные копии preview (делает воркер thumbnails)
+    preview_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True)
+    # денормализованные счётчики (lms.counters): уроки, платежи за курс и их сумма
+    lessons_count = models.PositiveIntegerField(default=0, editable=False)
+    payments_count = models.PositiveIntegerField(default=0, editable=False)
+    revenue_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    # время последней правки (счётчики его не меняют — в журнал изменений они не попадают)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["lessons_count", "id"], name="course_lessons_count_idx"),
+            models.Index(fields=["payments_count", "id"], name="course_payments_count_idx"),
+            models.Index(fields=["revenue_total", "id"], name="course_revenue_total_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # иначе save() объекта, загруженного до нового урока/платежа, вернул бы старые счётчики
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name not in COUNTER_FIELDS
+            ]
+        kwargs["update_fields"] = with_updated_at(kwargs.get("update_fields"))
+        # курс и запись журнала изменений (lms.changes) — одной транзакцией
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -13,7 +49,63 @@ class Lesson(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     preview = models.ImageField(upload_to="lessons/", blank=True, null=True)
+    preview_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     video_url = models.URLField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def save(self, *args, **kwargs):
+        kwargs["update_fields"] = with_updated_at(kwargs.get("update_fields"))
+        # урок, счётчики курса и журнал изменений (сигналы lms.signals) — одной транзакцией
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.title} ({self.course.title})"
+
+class CatalogChange(models.Model):
+    """
+    Журнал изменений каталога для /api/changes/ (lms.changes): seq — токен, присваивается
+    после коммита в порядке коммитов (None — ещё не присвоен), deleted — надгробие
+    удалённого объекта. Сжимается командой compact_changes.
+    """
+    class Kind(models.TextChoices):
+        COURSE = "course", "Курс"
+        LESSON = "lesson", "Урок"
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+    seq = models.BigIntegerField(null=True, unique=True)
+
+    class Meta:
+        indexes = [
+            # сжатие: последняя запись каждого объекта
+            models.Index(fields=["kind", "object_id", "id"], name="catalog_change_object_idx"),
+            models.Index(fields=["deleted", "changed_at"], name="catalog_change_tombstone_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.seq}: {self.kind} {self.object_id}{' удалён' if self.deleted else ''}"
+
+class CatalogChangeSequence(models.Model):
+    """
+    Одна строка: последний присвоенный CatalogChange.seq. Её блокировка упорядочивает
+    присвоение (lms.changes.sequence).
+    """
+    last = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.last)
+
+class CatalogChangeCompaction(models.Model):
+    """
+    Сжатие журнала с удалением надгробий: токены меньше through больше не годятся
+    (клиенту — полная пересинхронизация с since=0).
+    """
+    through = models.BigIntegerField()
+    removed = models.PositiveIntegerField(default=0)
+    compacted_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.title} ({self.course.title})"
\ No newline at end of file
+        return f"до {self.through}: {self.removed} записей"
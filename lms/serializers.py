@@ -1,21 +1,41 @@
 from rest_framework import serializers
+from edusite.bulk import BulkListSerializer, BulkPrimaryKeyRelatedField
+from edusite.sparse import SparseFieldsSerializerMixin
+from thumbnails.fields import ThumbnailsField
+from users.entitlements import IsAccessibleField
 from .models import Course, Lesson
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    # course при массовой загрузке проверяется одним запросом на весь список
+    serializer_related_field = BulkPrimaryKeyRelatedField
+    preview_thumbnails = ThumbnailsField("preview")
+    # оплачен ли урок или его курс пользователем запроса (users.entitlements, без запроса на урок)
+    is_accessible = IsAccessibleField()
+
     class Meta:
         model = Lesson
-        fields = ["id", "course", "title", "description", "preview", "video_url"]
+        fields = [
+            "id", "course", "title", "description", "preview", "preview_thumbnails", "video_url", "updated_at",
+            "is_accessible",
+        ]
+        list_serializer_class = BulkListSerializer
+        # ?expand=course — объект курса вместо id (edusite.sparse)
+        expandable = {"course": "lms.serializers.CourseSerializer"}
 
-class CourseSerializer(serializers.ModelSerializer):
-    # Задание 1: количество уроков через SerializerMethodField
-    lessons_count = serializers.SerializerMethodField(read_only=True)
+class CourseSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     # Задание 3: вложенный вывод уроков
     lessons = LessonSerializer(many=True, read_only=True)
+    preview_thumbnails = ThumbnailsField("preview")
 
     class Meta:
         model = Course
-        fields = ["id", "title", "preview", "description", "lessons_count", "lessons"]
-
-    def get_lessons_count(self, obj) -> int:
-        # избегаем лишних запросов при annotate; сейчас просто считаем
-        return obj.lessons.count()
\ No newline at end of file
+        # lessons_count, payments_count, revenue_total — денормализованные счётчики (lms.counters)
+        fields = [
+            "id", "title", "preview", "preview_thumbnails", "description", "updated_at",
+            "lessons_count", "payments_count", "revenue_total", "lessons",
+        ]
+        # курс, развёрнутый в чужом ответе (?expand=course), — без уроков
+        expanded_fields = [
+            "id", "title", "preview", "preview_thumbnails", "description", "updated_at",
+            "lessons_count", "payments_count", "revenue_total",
+        ]
\ No newline at end of file
@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from edusite.signals import post_bulk_create, post_bulk_update
+from . import cache, changes, counters
+from .models import Course, Lesson
+
+
+def invalidate(*names):
+    # сразу и ещё раз после коммита: ответ, собранный из данных до коммита, не переживёт его
+    cache.bump(*names)
+    transaction.on_commit(lambda: cache.bump(*names))
+
+
+@receiver(post_save, sender=Course, dispatch_uid="catalog-cache-course-save")
+@receiver(post_delete, sender=Course, dispatch_uid="catalog-cache-course-delete")
+def invalidate_course(sender, instance, **kwargs):
+    invalidate(f"course:{instance.pk}", "courses")
+
+
+@receiver(pre_save, sender=Lesson, dispatch_uid="catalog-cache-lesson-pre-save")
+def remember_lesson_course(sender, instance, **kwargs):
+    # урок могут перенести в другой курс — тогда инвалидируем оба и переносим счётчик
+    instance._old_course_id = None
+    if instance.pk and not instance._state.adding:
+        instance._old_course_id = (
+            Lesson.objects.filter(pk=instance.pk).values_list("course_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Lesson, dispatch_uid="catalog-cache-lesson-save")
+@receiver(post_delete, sender=Lesson, dispatch_uid="catalog-cache-lesson-delete")
+def invalidate_lesson(sender, instance, **kwargs):
+    course_ids = {instance.course_id, getattr(instance, "_old_course_id", None)} - {None}
+    invalidate(*(f"course:{course_id}" for course_id in course_ids), "lessons")
+
+
+@receiver(post_save, sender=Lesson, dispatch_uid="course-counters-lesson-save")
+def count_saved_lesson(sender, instance, created, **kwargs):
+    old_course_id = getattr(instance, "_old_course_id", None)
+    if created:
+        counters.adjust(instance.course_id, lessons=1)
+    elif old_course_id is not None and old_course_id != instance.course_id:
+        counters.adjust_many([(old_course_id, -1, 0, 0), (instance.course_id, 1, 0, 0)])
+
+
+@receiver(post_delete, sender=Lesson, dispatch_uid="course-counters-lesson-delete")
+def count_deleted_lesson(sender, instance, origin=None, **kwargs):
+    # каскад от удаления курса: курса уже нет
+    if not counters.deleting_course(origin):
+        counters.adjust(instance.course_id, lessons=-1)
+
+
+@receiver(post_bulk_create, sender=Lesson, dispatch_uid="catalog-cache-lesson-bulk-create")
+@receiver(post_bulk_update, sender=Lesson, dispatch_uid="catalog-cache-lesson-bulk-update")
+def invalidate_lessons_bulk(sender, instances, previous=None, **kwargs):
+    course_ids = {lesson.course_id for lesson in instances}
+    course_ids |= {lesson.course_id for lesson in (previous or {}).values()}
+    invalidate(*(f"course:{course_id}" for course_id in course_ids), "lessons")
+
+
+@receiver(post_bulk_create, sender=Lesson, dispatch_uid="course-counters-lesson-bulk-create")
+def count_lessons_bulk(sender, instances, **kwargs):
+    counters.adjust_many([(lesson.course_id, 1, 0, 0) for lesson in instances])
+
+
+@receiver(post_bulk_update, sender=Lesson, dispatch_uid="course-counters-lesson-bulk-update")
+def move_lessons_bulk(sender, instances, previous, fields=None, **kwargs):
+    if fields is not None and "course" not in fields:
+        return
+    changes = []
+    for lesson in instances:
+        old = previous.get(lesson.pk)
+        if old is not None and old.course_id != lesson.course_id:
+            changes += [(old.course_id, -1, 0, 0), (lesson.course_id, 1, 0, 0)]
+    counters.adjust_many(changes)
+
+
+@receiver(post_save, sender=Course, dispatch_uid="catalog-changes-course-save")
+@receiver(post_save, sender=Lesson, dispatch_uid="catalog-changes-lesson-save")
+def record_saved(sender, instance, **kwargs):
+    changes.record(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Course, dispatch_uid="catalog-changes-course-delete")
+@receiver(post_delete, sender=Lesson, dispatch_uid="catalog-changes-lesson-delete")
+def record_deleted(sender, instance, **kwargs):
+    changes.record(sender, [instance.pk], deleted=True)
+
+
+@receiver(post_bulk_create, sender=Lesson, dispatch_uid="catalog-changes-lesson-bulk-create")
+@receiver(post_bulk_update, sender=Lesson, dispatch_uid="catalog-changes-lesson-bulk-update")
+def record_lessons_bulk(sender, instances, **kwargs):
+    changes.record(sender, [lesson.pk for lesson in instances])
@@ -1,3 +1,683 @@
-from django.test import TestCase
+import copy
+import os
+import sqlite3
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+
+from edusite import instrumentation, replicas
+from users import entitlements
+from users.models import Payment, User
+from . import cache, changes, counters
+from .models import CatalogChange, Course, Lesson
+from .serializers import CourseSerializer
+from .views import CourseViewSet, LessonListCreateAPIView
+
+
+class CatalogTestCase(APITestCase):
+    def setUp(self):
+        # кэш ответов и вёдра троттлинга живут вне транзакции теста — чистим
+        cache.get_cache().clear()
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+
+
+class CourseQueryBudgetTests(CatalogTestCase):
+    """
+    Бюджет SQL-запросов: число запросов не должно расти вместе с размером страницы.
+    """
+
+    def make_courses(self, n, lessons_per_course=3):
+        for i in range(n):
+            course = Course.objects.create(title=f"Курс {i}")
+            for j in range(lessons_per_course):
+                Lesson.objects.create(course=course, title=f"Урок {i}.{j}")
+
+    def test_course_list_constant_queries(self):
+        self.make_courses(2)
+        # COUNT для пагинации + курсы (счётчики — колонки) + prefetch уроков
+        with self.assertNumQueries(3):
+            small = self.client.get("/api/courses/")
+        self.make_courses(8)
+        with self.assertNumQueries(3):
+            big = self.client.get("/api/courses/")
+        self.assertEqual(len(big.data["results"]), 10)
+        self.assertEqual(small.data["results"][0]["lessons_count"], 3)
+        self.assertEqual(len(small.data["results"][0]["lessons"]), 3)
+
+    def test_course_detail_constant_queries(self):
+        self.make_courses(1, lessons_per_course=20)
+        course = Course.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/courses/{course.id}/")
+        self.assertEqual(response.data["lessons_count"], 20)
+
+    def test_course_create_returns_zero_lessons(self):
+        response = self.client.post("/api/courses/", {"title": "Новый"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["lessons_count"], 0)
+
+
+class LessonQueryBudgetTests(CatalogTestCase):
+    def test_lesson_list_constant_queries(self):
+        course = Course.objects.create(title="Курс")
+        for i in range(10):
+            Lesson.objects.create(course=course, title=f"Урок {i}")
+        # COUNT + страница уроков
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/lessons/")
+        self.assertEqual(len(response.data["results"]), 10)
+
+
+class CatalogCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.python = Course.objects.create(title="Python")
+        self.go = Course.objects.create(title="Go")
+        self.lesson = Lesson.objects.create(course=self.python, title="Переменные")
+        Lesson.objects.create(course=self.go, title="Горутины")
+
+    def test_second_request_served_without_queries(self):
+        first = self.client.get("/api/courses/")
+        self.assertEqual(first["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/courses/")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_query_params_are_normalized(self):
+        self.client.get("/api/courses/?search=python&ordering=id")
+        with self.assertNumQueries(0):
+            self.client.get("/api/courses/?ordering=id&search=python")
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get("/api/courses/")["ETag"]
+        response = self.client.get("/api/courses/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_lesson_edit_evicts_only_its_course(self):
+        self.client.get(f"/api/courses/{self.python.id}/")
+        self.client.get(f"/api/courses/{self.go.id}/")
+        self.lesson.title = "Типы"
+        self.lesson.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(f"/api/courses/{self.go.id}/")
+        response = self.client.get(f"/api/courses/{self.python.id}/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["lessons"][0]["title"], "Типы")
+
+        lessons = self.client.get("/api/lessons/")
+        self.assertEqual(lessons["X-Cache"], "MISS")
+
+    def test_list_page_invalidated_by_lesson_of_listed_course(self):
+        self.client.get("/api/courses/")
+        Lesson.objects.create(course=self.go, title="Каналы")
+        response = self.client.get("/api/courses/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][1]["lessons_count"], 2)
+
+    def test_moving_lesson_invalidates_both_courses(self):
+        self.client.get(f"/api/courses/{self.go.id}/")
+        self.lesson.course = self.go
+        self.lesson.save()
+        response = self.client.get(f"/api/courses/{self.go.id}/")
+        self.assertEqual(response.data["lessons_count"], 2)
+
+    def test_counters(self):
+        before = cache.stats()
+        self.client.get("/api/lessons/")
+        self.client.get("/api/lessons/")
+        after = cache.stats()
+        self.assertEqual(after["miss"] - before["miss"], 1)
+        self.assertEqual(after["hit"] - before["hit"], 1)
+
+
+class LessonBulkTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.python = Course.objects.create(title="Python")
+        self.go = Course.objects.create(title="Go")
+
+    def test_bulk_create_in_constant_queries(self):
+        payload = [{"course": self.python.id, "title": f"Урок {i}"} for i in range(200)]
+        # course одним запросом, INSERT пачками, индекс поиска — executemany,
+        # журнал изменений — INSERT пачками (лимит переменных SQLite)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/lessons/", payload, format="json")
+        self.assertLessEqual(len(queries), 10)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 200)
+        self.assertEqual(self.python.lessons.count(), 200)
+        self.assertEqual(len(self.client.get("/api/lessons/?search=урок").json()["results"]), 10)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        payload = [
+            {"course": self.python.id, "title": "ok"},
+            {"course": 999, "title": "нет курса"},
+            {"course": self.go.id},
+        ]
+        response = self.client.post("/api/lessons/", payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {1, 2})
+        self.assertIn("course", response.data[1])
+        self.assertIn("title", response.data[2])
+        self.assertFalse(Lesson.objects.exists())
+
+    def test_bulk_partial_update(self):
+        lessons = [Lesson.objects.create(course=self.python, title=f"Урок {i}") for i in range(3)]
+        self.client.get(f"/api/courses/{self.go.id}/")
+        payload = [
+            {"id": lessons[0].id, "title": "Новое"},
+            {"id": lessons[1].id, "course": self.go.id},
+        ]
+        response = self.client.patch("/api/lessons/", payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        lessons[0].refresh_from_db()
+        lessons[1].refresh_from_db()
+        self.assertEqual(lessons[0].title, "Новое")
+        self.assertEqual(lessons[1].course, self.go)
+        # перенос урока сбросил кэш курса, в который он переехал
+        self.assertEqual(self.client.get(f"/api/courses/{self.go.id}/").data["lessons_count"], 1)
+
+    def test_bulk_update_unknown_id(self):
+        response = self.client.patch("/api/lessons/", [{"id": 12345, "title": "x"}], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("id", response.data[0])
+
+
+class CourseCounterTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.python = Course.objects.create(title="Python")
+        self.go = Course.objects.create(title="Go")
+        self.user = User.objects.create(email="c@example.com", username="c")
+
+    def counters(self, course):
+        return Course.objects.values_list(*counters.FIELDS).get(pk=course.pk)
+
+    def pay(self, course, amount, **kwargs):
+        return Payment.objects.create(user=self.user, course=course, amount=Decimal(amount), **kwargs)
+
+    def test_lessons_created_moved_deleted(self):
+        lessons = [Lesson.objects.create(course=self.python, title=f"Урок {i}") for i in range(3)]
+        lessons[0].course = self.go
+        lessons[0].save()
+        lessons[1].delete()
+        self.assertEqual(self.counters(self.python)[0], 1)
+        self.assertEqual(self.counters(self.go)[0], 1)
+
+    def test_payments_created_moved_deleted(self):
+        first = self.pay(self.python, "100.50")
+        self.pay(self.python, "20")
+        first.course, first.amount = self.go, Decimal("30")
+        first.save()
+        self.assertEqual(self.counters(self.python), (0, 1, Decimal("20")))
+        self.assertEqual(self.counters(self.go), (0, 1, Decimal("30")))
+        # платёж за урок в счётчики курса не входит (как stats?group_by=course)
+        Payment.objects.create(user=self.user, lesson=Lesson.objects.create(course=self.go, title="x"), amount=5)
+        self.user.delete()
+        self.assertEqual(self.counters(self.python), (0, 0, Decimal("0")))
+        self.assertEqual(self.counters(self.go), (1, 0, Decimal("0")))
+
+    def test_bulk_api(self):
+        response = self.client.post("/api/lessons/", [{"course": self.python.id, "title": f"У{i}"} for i in range(4)], format="json")
+        self.client.patch("/api/lessons/", [{"id": response.data[0]["id"], "course": self.go.id}], format="json")
+        payments = [
+            {"user": self.user.id, "course": self.python.id, "amount": "10.00", "method": "cash"},
+            {"user": self.user.id, "course": self.go.id, "amount": "5.00", "method": "cash"},
+        ]
+        created = self.client.post("/api/payments/", payments, format="json")
+        self.assertEqual(created.status_code, 201)
+        self.client.patch("/api/payments/", [{"id": created.data[1]["id"], "course": self.python.id}], format="json")
+        self.assertEqual(self.counters(self.python), (3, 2, Decimal("15")))
+        self.assertEqual(self.counters(self.go), (1, 0, Decimal("0")))
+
+    def test_course_cascade_and_stale_save(self):
+        stale = Course.objects.get(pk=self.python.pk)
+        Lesson.objects.create(course=self.python, title="Урок")
+        self.pay(self.python, "10")
+        # save() объекта, загруженного раньше, не затирает счётчики
+        stale.title = "Python 3"
+        stale.save()
+        self.assertEqual(self.counters(self.python), (1, 1, Decimal("10")))
+        with CaptureQueriesContext(connection) as queries:
+            self.python.delete()
+        self.assertFalse(any('UPDATE "lms_course"' in q["sql"] for q in queries))
+
+    def test_reconcile_repairs_drift(self):
+        Lesson.objects.bulk_create([Lesson(course=self.python, title="без сигнала")])
+        self.pay(self.go, "7")
+        Course.objects.filter(pk=self.go.pk).update(revenue_total=0)
+        self.assertEqual(len(counters.reconcile(fix=False)), 2)
+        out = StringIO()
+        call_command("reconcile_course_counters", stdout=out)
+        self.assertIn("Расхождений исправлено: 2", out.getvalue())
+        self.assertEqual(self.counters(self.python), (1, 0, Decimal("0")))
+        self.assertEqual(self.counters(self.go), (0, 1, Decimal("7")))
+        self.assertEqual(counters.reconcile(), [])
+
+    def test_order_and_filter_without_join(self):
+        Lesson.objects.create(course=self.go, title="Урок")
+        self.pay(self.go, "50")
+        self.pay(self.python, "10")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/courses/?ordering=-revenue_total&lessons_count__gte=0&payments_count__gte=1")
+        self.assertEqual([row["title"] for row in response.data["results"]], ["Go", "Python"])
+        self.assertEqual(response.data["results"][0]["revenue_total"], "50.00")
+        course_sql = [q["sql"] for q in queries if 'FROM "lms_course"' in q["sql"]]
+        self.assertFalse(any("JOIN" in sql or "GROUP BY" in sql for sql in course_sql))
+        response = self.client.get("/api/courses/?revenue_total__lte=20")
+        self.assertEqual([row["title"] for row in response.data["results"]], ["Python"])
+
+
+class SparseFieldsTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            course = Course.objects.create(title=f"Курс {i}", description="длинное описание")
+            Lesson.objects.create(course=course, title=f"Урок {i}")
+
+    def test_course_fields_do_not_touch_lessons(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/courses/?fields=id,title")
+        self.assertEqual(response.data["results"][0], {"id": 1, "title": "Курс 0"})
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any("lms_lesson" in q["sql"] for q in queries))
+        self.assertNotIn("description", queries[1]["sql"])
+
+    def test_course_expand_lessons(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/courses/?fields=title&expand=lessons")
+        self.assertEqual(set(response.data["results"][0]), {"title", "lessons"})
+        self.assertEqual(response.data["results"][0]["lessons"][0]["title"], "Урок 0")
+
+    def test_sparse_response_cached_separately(self):
+        self.client.get("/api/courses/?fields=title&expand=lessons")
+        lesson = Lesson.objects.get(title="Урок 0")
+        lesson.title = "Новое"
+        lesson.save()
+        response = self.client.get("/api/courses/?fields=title&expand=lessons")
+        self.assertEqual(response.data["results"][0]["lessons"][0]["title"], "Новое")
+        self.assertNotIn("lessons", self.client.get("/api/courses/1/?fields=id").data)
+
+    def test_lesson_fast_path_and_expand(self):
+        response = self.client.get("/api/lessons/?fields=id,title&paginate=keyset")
+        self.assertEqual(response.json()["results"][0], {"id": 1, "title": "Урок 0"})
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/lessons/?fields=id,course&expand=course")
+        course = response.json()["results"][0]["course"]
+        self.assertEqual((course["title"], course["description"]), ("Курс 0", "длинное описание"))
+        self.assertNotIn("lessons", course)
+        self.assertEqual(self.client.get("/api/lessons/1/?fields=title").data, {"title": "Урок 0"})
+
+    def test_unknown_field(self):
+        response = self.client.get("/api/courses/?fields=id,nope")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("nope", str(response.data["fields"]))
+
+
+class LessonFastListParityTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        course = Course.objects.create(title="Курс")
+        for i in range(12):
+            Lesson.objects.create(
+                course=course, title=f"Урок {i}", description="описание" if i % 2 else "",
+                preview=f"lessons/preview{i}.png" if i % 3 else "", video_url="https://youtu.be/x" if i % 4 else "",
+            )
+
+    def test_byte_identical_output(self):
+        for url in ["/api/lessons/", "/api/lessons/?page=2", "/api/lessons/?paginate=keyset", "/api/lessons/?search=урок"]:
+            with self.subTest(url=url):
+                fast = self.client.get(url)
+                cache.get_cache().clear()
+                with mock.patch.object(LessonListCreateAPIView, "fast_list", False):
+                    slow = self.client.get(url)
+                cache.get_cache().clear()
+                self.assertEqual(fast.content, slow.content)
+
+
+class AsyncCatalogApiTests(CatalogTestCase):
+    """
+    /api/async/courses/ и /api/async/lessons/ (async ORM) отдают то же, что синхронные эндпоинты.
+    """
+    urls = [
+        "courses/", "courses/?page=2", "courses/?search=курс", "courses/?ordering=-title",
+        "lessons/", "lessons/?page=2", "lessons/?paginate=keyset", "lessons/?search=урок", "lessons/?page=0",
+        "courses/?fields=id,title", "lessons/?fields=id,title&expand=course",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            course = Course.objects.create(title=f"Курс {i}", preview=f"courses/p{i}.png" if i % 2 else "")
+            Lesson.objects.create(course=course, title=f"Урок {i}", preview=f"lessons/p{i}.png" if i % 3 else "")
+
+    async def test_same_responses_as_sync_api(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                sync = await self.async_client.get(f"/api/{url}", HTTP_ACCEPT="application/json")
+                response = await self.async_client.get(f"/api/async/{url}")
+                self.assertEqual(response.status_code, sync.status_code)
+                self.assertEqual(response.content.replace(b"/api/async/", b"/api/"), sync.content)
+
+    async def test_detail(self):
+        course = await Course.objects.afirst()
+        lesson = await Lesson.objects.afirst()
+        for url in [f"courses/{course.pk}/", f"lessons/{lesson.pk}/"]:
+            with self.subTest(url=url):
+                sync = await self.async_client.get(f"/api/{url}", HTTP_ACCEPT="application/json")
+                response = await self.async_client.get(f"/api/async/{url}")
+                self.assertEqual(response.content, sync.content)
+        self.assertEqual((await self.async_client.get("/api/async/courses/999999/")).status_code, 404)
+
+    def test_course_list_queries(self):
+        # COUNT + курсы + prefetch уроков — как у CourseViewSet
+        with self.assertNumQueries(3):
+            self.client.get("/api/async/courses/")
+
+    @override_settings(THROTTLE_BURST={"lessons": 2})
+    def test_user_and_throttle_as_sync_api(self):
+        entitlements.lru.clear()
+        lesson = Lesson.objects.first()
+        user = User.objects.create(email="a@example.com", username="a")
+        Payment.objects.create(user=user, course=lesson.course, amount=Decimal("10.00"))
+        self.client.force_login(user)
+        rows = self.client.get("/api/async/lessons/?fields=id,is_accessible").json()["results"]
+        self.assertEqual([row["id"] for row in rows if row["is_accessible"]], [lesson.id])
+        course = self.client.get(f"/api/async/courses/{lesson.course_id}/").json()
+        self.assertEqual([row["is_accessible"] for row in course["lessons"]], [True])
+
+        # ведро scope "lessons" (2 запроса) общее с /api/lessons/
+        self.assertEqual(self.client.get("/api/lessons/").status_code, 200)
+        response = self.client.get("/api/async/lessons/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0, INSTRUMENTATION_N_PLUS_ONE_THRESHOLD=5)
+class InstrumentationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.registry.reset()
+        for i in range(6):
+            course = Course.objects.create(title=f"Курс {i}")
+            Lesson.objects.create(course=course, title=f"Урок {i}")
+
+    @override_settings(METRICS_TOKEN="secret")
+    def metrics(self):
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_require_token_or_staff(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.client.force_login(User.objects.create(email="s@example.com", username="s", is_staff=True))
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    def timings(self, response):
+        return dict(
+            part.strip().split(";", 1) for part in response["Server-Timing"].split(",")
+        )
+
+    def test_server_timing(self):
+        response = self.client.get("/api/courses/")
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {"db", "serialize", "render", "total"})
+        self.assertIn('desc="3 queries"', timings["db"])
+        self.assertNotIn("nplusone", response["Server-Timing"])
+
+    def test_serialization_timed_without_replacing_serializer_class(self):
+        course, seen = Course.objects.first(), []
+        to_representation = CourseSerializer.to_representation
+
+        def spy(serializer, instance):
+            seen.append(type(serializer))
+            return to_representation(serializer, instance)
+
+        with mock.patch.object(CourseSerializer, "to_representation", spy):
+            self.client.get(f"/api/courses/{course.id}/")
+        self.assertEqual(seen, [CourseSerializer])
+        self.client.post("/api/courses/", {"title": "Новый"}, format="json")
+        self.client.patch(f"/api/courses/{course.id}/", {"title": "Правка"}, format="json")
+        counted = [line for line in self.metrics().splitlines() if line.startswith("edusite_serialize_duration_ms_count")]
+        self.assertEqual(sorted(line.split("method=")[1] for line in counted), ['"GET"} 1', '"PATCH"} 1', '"POST"} 1'])
+
+    def test_async_view_queries_are_counted(self):
+        response = self.client.get("/api/async/courses/")
+        self.assertIn('desc="3 queries"', self.timings(response)["db"])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        response = self.client.get("/api/courses/")
+        self.assertFalse(response.has_header("Server-Timing"))
+        self.assertEqual(instrumentation.registry.histograms, {})
+
+    def test_n_plus_one_flagged(self):
+        # без prefetch каждый курс тянет свои уроки — повторяющийся SQL
+        with mock.patch.object(CourseViewSet, "field_querysets", {}):
+            with self.assertLogs("edusite.instrumentation", "WARNING") as logs:
+                response = self.client.get("/api/courses/")
+        self.assertIn('nplusone;desc="1 repeated statements, up to 6x"', response["Server-Timing"])
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('edusite_n_plus_one_total{route="api/courses/",method="GET"} 1', self.metrics())
+
+    def test_prometheus_histograms(self):
+        self.client.get("/api/courses/")
+        self.client.get("/api/lessons/")
+        text = self.metrics()
+        self.assertIn("# TYPE edusite_sql_queries histogram", text)
+        self.assertIn('edusite_sql_queries_bucket{route="api/courses/",method="GET",le="3"} 1', text)
+        self.assertIn('edusite_sql_queries_bucket{route="api/courses/",method="GET",le="2"} 0', text)
+        self.assertIn('edusite_response_bytes_count{route="api/lessons/",method="GET"} 1', text)
+        self.assertIn('edusite_serialize_duration_ms_count{route="api/lessons/",method="GET"} 1', text)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            instrumentation.normalize_sql('SELECT "x" FROM t WHERE id IN (%s, %s,  %s) LIMIT 21'),
+            'SELECT "x" FROM t WHERE id IN (...) LIMIT ?',
+        )
+
+
+class ChangeFeedTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = Course.objects.create(title="Python")
+        self.lessons = [Lesson.objects.create(course=self.course, title=f"Урок {i}") for i in range(3)]
+
+    def sync(self, since=0, **params):
+        # в TestCase on_commit не выполняется — seq присваиваем, как после коммита записи
+        changes.sequence()
+        response = self.client.get("/api/changes/", {"since": since, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_feed_returns_changes_and_tombstones_in_order(self):
+        page = self.sync()
+        self.assertEqual(
+            [(r["type"], r["id"], r["op"]) for r in page["results"]],
+            [("course", self.course.id, "upsert"), *[("lesson", lesson.id, "upsert") for lesson in self.lessons]],
+        )
+        self.assertNotIn("lessons", page["results"][0]["data"])
+        self.assertNotIn("is_accessible", page["results"][1]["data"])
+        token = page["next"]
+        self.assertEqual(self.sync(token)["results"], [])
+
+        # правка счётчиков (платёж) — не изменение каталога
+        Payment.objects.create(user=User.objects.create(email="c@example.com", username="c"),
+                               course=self.course, amount=Decimal("1.00"))
+        self.assertEqual(self.sync(token)["results"], [])
+
+        before = Lesson.objects.get(pk=self.lessons[0].pk).updated_at
+        self.client.patch(f"/api/lessons/{self.lessons[0].id}/", {"title": "Новое"}, format="json")
+        self.client.patch("/api/lessons/", [{"id": self.lessons[0].id, "title": "Ещё новее"}], format="json")
+        deleted_id = self.lessons[1].id
+        self.lessons[1].delete()
+        page = self.sync(token)
+        # урок правили дважды — в странице одна запись с текущими данными
+        self.assertEqual([(r["id"], r["op"]) for r in page["results"]],
+                         [(self.lessons[0].id, "upsert"), (deleted_id, "delete")])
+        self.assertEqual(page["results"][0]["data"]["title"], "Ещё новее")
+        self.assertGreater(Lesson.objects.get(pk=self.lessons[0].pk).updated_at, before)
+
+        self.course.delete()
+        page = self.sync(page["next"], limit=2)
+        self.assertEqual([r["op"] for r in page["results"]], ["delete", "delete"])
+        self.assertTrue(page["has_more"])
+        self.assertEqual(len(self.sync(page["next"])["results"]), 1)
+
+    def test_late_commit_with_lower_id_is_not_skipped(self):
+        # транзакция получила id при INSERT, а закоммитилась после того, как клиент прочитал больший
+        late = Lesson.objects.create(course=self.course, title="Поздний")
+        reserved = CatalogChange.objects.get(kind="lesson", object_id=late.id).id
+        CatalogChange.objects.filter(id=reserved).delete()
+        early = Lesson.objects.create(course=self.course, title="Ранний")
+        self.assertGreater(CatalogChange.objects.get(kind="lesson", object_id=early.id).id, reserved)
+        token = self.sync()["next"]
+
+        CatalogChange.objects.create(id=reserved, kind="lesson", object_id=late.id)
+        page = self.sync(token)
+        self.assertEqual([(r["id"], r["op"]) for r in page["results"]], [(late.id, "upsert")])
+        self.assertGreater(page["next"], token)
+
+    def test_feed_is_read_only(self):
+        token = self.sync()["next"]
+        Lesson.objects.create(course=self.course, title="Без seq")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/changes/", {"since": token})
+        # запись без seq не видна, пока её не пронумерует запись каталога или compact_changes
+        self.assertEqual(response.json()["results"], [])
+        self.assertFalse([q for q in queries if not q["sql"].lstrip().upper().startswith("SELECT")])
+        call_command("compact_changes", stdout=StringIO())
+        self.assertEqual(len(self.client.get("/api/changes/", {"since": token}).json()["results"]), 1)
+
+    def test_sequence_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.create(course=self.course, title="Новый")
+        self.assertFalse(CatalogChange.objects.filter(seq__isnull=True).exists())
+        seqs = list(CatalogChange.objects.order_by("id").values_list("seq", flat=True))
+        self.assertEqual(seqs, sorted(seqs))
+
+    def test_compaction_and_expired_tokens(self):
+        old_token = self.sync()["next"]
+        for i in range(3):
+            self.course.title = f"Python {i}"
+            self.course.save()
+        self.lessons[2].delete()
+        out = StringIO()
+        call_command("compact_changes", "--tombstone-days", "0", stdout=out)
+        # три прежние версии курса и создание удалённого урока; его надгробие — старше 0 дней
+        self.assertIn("перекрытых записей: 4, надгробий: 1", out.getvalue())
+        self.assertEqual(CatalogChange.objects.filter(kind="course").count(), 1)
+
+        self.assertEqual(self.client.get("/api/changes/", {"since": old_token}).status_code, 410)
+        # с нуля — актуальный каталог без удалённого урока
+        page = self.sync()
+        self.assertEqual(len(page["results"]), 3)
+        self.assertEqual(page["results"][-1]["data"]["title"], "Python 2")
+        self.assertEqual(self.client.get("/api/changes/?since=abc").status_code, 400)
+
+    def test_backfill_records_bulk_loaded_objects(self):
+        Lesson.objects.bulk_create([Lesson(course=self.course, title="Без сигналов")])
+        call_command("compact_changes", "--backfill", stdout=StringIO())
+        self.assertEqual(len(self.sync()["results"]), 5)
+
+
+class ReplicaRoutingTests(APITransactionTestCase):
+    """
+    Реплики — отдельные SQLite-файлы во временном каталоге: sync() копирует в них
+    default (backup API), между синхронизациями реплика «отстаёт».
+    Транзакционный тест: внутри транзакции на default роутер читает только из default.
+    """
+    aliases = ["replica1", "replica2"]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # алиасов нет в settings.DATABASES — заводим их после проверок раннера и разрешаем тесту
+        cls.tmp = tempfile.TemporaryDirectory()
+        for alias in cls.aliases:
+            settings_dict = copy.deepcopy(connections.settings["default"])
+            settings_dict["NAME"] = os.path.join(cls.tmp.name, f"{alias}.sqlite3")
+            connections.settings[alias] = settings_dict
+        cls.databases = frozenset({*cls.databases, *cls.aliases})
+        cls.addClassCleanup(cls.drop_replicas)
+
+    @classmethod
+    def drop_replicas(cls):
+        for alias in cls.aliases:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        cache.get_cache().clear()
+        override = override_settings(DATABASE_REPLICAS=self.aliases)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.sync()
+
+    def sync(self):
+        connection.ensure_connection()
+        for alias in self.aliases:
+            connections[alias].close()
+            target = sqlite3.connect(connections.settings[alias]["NAME"])
+            connection.connection.backup(target)
+            target.close()
+
+    def titles(self, client, url="/api/courses/", **headers):
+        return [row["title"] for row in client.get(url, **headers).json()["results"]]
+
+    def test_reads_go_to_a_replica(self):
+        Course.objects.create(title="Python")
+        with CaptureQueriesContext(connection) as primary:
+            self.assertEqual(self.titles(self.client), [])
+        self.assertEqual(len(primary), 0)
+        self.sync()
+        self.assertEqual(self.titles(self.client, "/api/courses/?fields=title"), ["Python"])
+        self.assertEqual(self.titles(self.client, "/api/async/courses/?fields=title"), ["Python"])
+        # вне запроса — default
+        self.assertEqual(Course.objects.count(), 1)
+
+    def test_read_your_writes_after_post(self):
+        response = self.client.post("/api/courses/", {"title": "Go"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        until = float(response[replicas.READ_PRIMARY_HEADER])
+        self.assertIn(replicas.READ_PRIMARY_COOKIE, response.cookies)
+        # другой клиент ещё не видит запись (реплика отстаёт), тот же (cookie) — видит
+        self.assertEqual(self.titles(APIClient()), [])
+        self.assertEqual(self.titles(self.client), ["Go"])
+        # клиент без cookie возвращает заголовок (кэш он не читает — ответ из default)
+        header = {"HTTP_X_READ_PRIMARY_UNTIL": str(until)}
+        self.assertEqual(self.titles(APIClient(), **header), ["Go"])
+        # окно истекло — снова реплика (кэш чистим: в нём уже свежий ответ из default)
+        cache.get_cache().clear()
+        with mock.patch("time.time", return_value=until + 1):
+            self.assertEqual(self.titles(APIClient(), **header), [])
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post("/api/courses/", {}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header(replicas.READ_PRIMARY_HEADER))
+
+    def test_lagging_replica_response_is_not_cached(self):
+        self.client.get("/api/courses/")
+        self.client.post("/api/courses/", {"title": "Rust"}, format="json")
+        self.assertEqual(self.titles(APIClient()), [])
+        self.sync()
+        self.assertEqual(self.titles(APIClient()), ["Rust"])
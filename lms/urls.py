@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import LessonListCreateAPIView, LessonRetrieveUpdateDestroyAPIView
+from .views import ChangeFeedAPIView, LessonListCreateAPIView, LessonRetrieveUpdateDestroyAPIView
 
 urlpatterns = [
     path("lessons/", LessonListCreateAPIView.as_view(), name="lesson-list-create"),
     path("lessons/<int:pk>/", LessonRetrieveUpdateDestroyAPIView.as_view(), name="lesson-detail"),
+    path("changes/", ChangeFeedAPIView.as_view(), name="change-feed"),
 ]
\ No newline at end of file
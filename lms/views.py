@@ -1,17 +1,87 @@
+from django.conf import settings
+from django.db.models import Prefetch
 from rest_framework import viewsets, generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from edusite.bulk import BulkCreateUpdateMixin
+from edusite.coalesce import CoalescedListMixin
+from edusite.fastpath import FastListMixin
+from edusite.instrumentation import InstrumentedViewMixin
+from edusite.pagination import KeysetOrPageNumberPagination
+from edusite.sparse import SparseFieldsMixin
+from . import changes
+from .cache import CachedResponseMixin
+from .filters import CourseFilter
 from .models import Course, Lesson
 from .serializers import CourseSerializer, LessonSerializer
 
+def with_lessons(queryset):
+    return queryset.prefetch_related(Prefetch("lessons", queryset=Lesson.objects.order_by("id")))
+
 # --- КУРСЫ: ViewSet (CRUD) ---
-class CourseViewSet(viewsets.ModelViewSet):
-    queryset = Course.objects.all().order_by("id")
+class CourseViewSet(
+    CachedResponseMixin, CoalescedListMixin, SparseFieldsMixin, InstrumentedViewMixin, viewsets.ModelViewSet,
+):
+    # счётчики — колонки Course (lms.counters), уроки подтягиваются одним запросом на страницу,
+    # и только если поле lessons есть в ответе (?fields=id,title уроки не читает);
+    # сортировка и фильтры по счётчикам идут по индексам без JOIN и GROUP BY
+    queryset = Course.objects.order_by("id")
+    field_querysets = {"lessons": with_lessons}
     serializer_class = CourseSerializer
+    filterset_class = CourseFilter
+    ordering_fields = ["id", "title", "lessons_count", "payments_count", "revenue_total"]
+    search_fields = ["title"]
+    # ответы кэшируются (lms.cache); правка урока сбрасывает только записи его курса;
+    # одновременные промахи по одному списку считаются один раз (edusite.coalesce)
+    cache_membership = "courses"
+    throttle_scope = "courses"
+
+    def get_cache_dependencies(self, data):
+        rows = data.get("results", [data]) if isinstance(data, dict) else data
+        deps = [f"course:{row['id']}" for row in rows if "id" in row]
+        if any("id" not in row and "lessons" in row for row in rows):
+            # ?fields= без id: курсы страницы неизвестны — зависим от любого урока
+            deps.append("lessons")
+        return deps
 
 # --- УРОКИ: Generic (CRUD) ---
-class LessonListCreateAPIView(generics.ListCreateAPIView):
+class LessonListCreateAPIView(
+    CachedResponseMixin, CoalescedListMixin, SparseFieldsMixin, FastListMixin, BulkCreateUpdateMixin,
+    InstrumentedViewMixin, generics.ListCreateAPIView,
+):
+    # POST списком — массовое создание, PATCH списком [{"id": ..., ...}] — массовое обновление;
+    # список собирается из values() (edusite.fastpath), JSON тот же, что у LessonSerializer
     queryset = Lesson.objects.all().order_by("id")
     serializer_class = LessonSerializer
+    pagination_class = KeysetOrPageNumberPagination
+    search_fields = ["title"]
+    cache_membership = "lessons"
+    throttle_scope = "lessons"
+    fast_list = True
+
+    def patch(self, request, *args, **kwargs):
+        return self.bulk_update(request, *args, **kwargs)
 
-class LessonRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class LessonRetrieveUpdateDestroyAPIView(SparseFieldsMixin, InstrumentedViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Lesson.objects.all()
-    serializer_class = LessonSerializer
\ No newline at end of file
+    serializer_class = LessonSerializer
+    throttle_scope = "lessons"
+
+# --- ЖУРНАЛ ИЗМЕНЕНИЙ: инкрементальная синхронизация каталога ---
+class ChangeFeedAPIView(InstrumentedViewMixin, APIView):
+    """
+    /api/changes/?since=<токен>&limit=N — изменённые и удалённые курсы и уроки после токена,
+    по возрастанию (lms.changes). Первый раз — since=0 (весь каталог), дальше — since=<next>
+    из прошлого ответа, пока has_more. 410 — токен старше сжатия журнала, начать с since=0.
+    """
+    throttle_scope = "changes"
+
+    def get(self, request):
+        since, limit = request.query_params.get("since", "0"), request.query_params.get("limit")
+        if not since.isdigit():
+            raise ValidationError({"since": "Ожидается токен из поля next прошлого ответа (или 0)."})
+        if limit is not None and not (limit.isdigit() and 0 < int(limit) <= settings.CHANGES_MAX_PAGE_SIZE):
+            raise ValidationError({"limit": f"От 1 до {settings.CHANGES_MAX_PAGE_SIZE}."})
+        limit = int(limit) if limit else settings.CHANGES_PAGE_SIZE
+        return Response(changes.feed(int(since), limit, context={"request": request}))
@@ -0,0 +1,110 @@
+"""
+Хранилища полнотекстового индекса: FTS5 для SQLite (dev/тесты) и tsvector + GIN для PostgreSQL.
+Для каждого вида индекса — своя таблица search_<kind>, ключ — pk исходной модели.
+"""
+
+
+class SQLiteFTSBackend:
+    higher_rank_is_better = False  # bm25 в FTS5: чем меньше, тем релевантнее
+
+    def table(self, kind):
+        return f"search_{kind}"
+
+    def create(self, cursor, kind):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table(kind)} "
+            f"USING fts5(body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def drop(self, cursor, kind):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table(kind)}")
+
+    def index(self, cursor, kind, pk, body):
+        self.remove(cursor, kind, pk)
+        cursor.execute(f"INSERT INTO {self.table(kind)} (rowid, body) VALUES (%s, %s)", [pk, body])
+
+    def index_many(self, cursor, kind, rows):
+        """
+        rows — [(pk, body)]; для массовых загрузок.
+        """
+        cursor.executemany(f"DELETE FROM {self.table(kind)} WHERE rowid = %s", [(pk,) for pk, _body in rows])
+        cursor.executemany(f"INSERT INTO {self.table(kind)} (rowid, body) VALUES (%s, %s)", rows)
+
+    def remove(self, cursor, kind, pk):
+        cursor.execute(f"DELETE FROM {self.table(kind)} WHERE rowid = %s", [pk])
+
+    def query(self, tokens):
+        return " ".join(f'"{t}"*' for t in tokens)
+
+    def match_sql(self, kind, tokens):
+        table = self.table(kind)
+        return f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [self.query(tokens)]
+
+    def rank_sql(self, kind, tokens, column):
+        table = self.table(kind)
+        return (
+            f"SELECT rank FROM {table} WHERE {table} MATCH %s AND rowid = {column}",
+            [self.query(tokens)],
+        )
+
+
+class PostgresBackend:
+    higher_rank_is_better = True
+
+    def table(self, kind):
+        return f"search_{kind}"
+
+    def create(self, cursor, kind):
+        table = self.table(kind)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (id bigint PRIMARY KEY, document tsvector NOT NULL)"
+        )
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_document_gin ON {table} USING GIN (document)")
+
+    def drop(self, cursor, kind):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table(kind)}")
+
+    def index(self, cursor, kind, pk, body):
+        cursor.execute(
+            f"INSERT INTO {self.table(kind)} (id, document) VALUES (%s, to_tsvector('simple', %s)) "
+            f"ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document",
+            [pk, body],
+        )
+
+    def index_many(self, cursor, kind, rows):
+        cursor.executemany(
+            f"INSERT INTO {self.table(kind)} (id, document) VALUES (%s, to_tsvector('simple', %s)) "
+            f"ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document",
+            rows,
+        )
+
+    def remove(self, cursor, kind, pk):
+        cursor.execute(f"DELETE FROM {self.table(kind)} WHERE id = %s", [pk])
+
+    def query(self, tokens):
+        return " & ".join(f"{t}:*" for t in tokens)
+
+    def match_sql(self, kind, tokens):
+        return (
+            f"SELECT id FROM {self.table(kind)} WHERE document @@ to_tsquery('simple', %s)",
+            [self.query(tokens)],
+        )
+
+    def rank_sql(self, kind, tokens, column):
+        return (
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {self.table(kind)} WHERE id = {column}",
+            [self.query(tokens)],
+        )
+
+
+BACKENDS = {
+    "sqlite": SQLiteFTSBackend(),
+    "postgresql": PostgresBackend(),
+}
+
+
+def get_backend(connection):
+    """
+    None — для остальных СУБД: поиск остаётся на обычном SearchFilter (LIKE).
+    """
+    return BACKENDS.get(connection.vendor)
@@ -0,0 +1,41 @@
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+from .indexes import search_queryset
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Замена rest_framework.filters.SearchFilter: те же ?search= и search_fields,
+    но поиск идёт по полнотекстовому индексу (FTS5 / tsvector), а не LIKE '%...%'.
+    Без явного ?ordering= (и не в keyset-пагинации) результаты сортируются по релевантности.
+    Поля, которых нет в индексе, и прочие СУБД — как в обычном SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        # keyset-пагинация строит курсор по полям модели — ранг (аннотация) туда не годится
+        paginator = getattr(view, "paginator", None)
+        keyset = getattr(paginator, "is_keyset_requested", lambda request: False)(request)
+        order_by_rank = api_settings.ORDERING_PARAM not in request.query_params and not keyset
+        result = search_queryset(queryset, search_fields, search_terms, order_by_rank=order_by_rank)
+        if result is None:
+            return super().filter_queryset(request, queryset, view)
+        return result
+
+
+class FullTextSearchAdminMixin:
+    """
+    Для ModelAdmin: поиск в админке по тому же индексу, что и в API.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and self.search_fields:
+            result = search_queryset(queryset, self.search_fields, search_term.split())
+            if result is not None:
+                return result, False
+        return super().get_search_results(request, queryset, search_term)
@@ -0,0 +1,95 @@
+"""
+Какие модели и поля попадают в полнотекстовый индекс и как по нему фильтровать.
+"""
+import re
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .backends import get_backend
+
+# вид индекса -> (модель, индексируемые поля); поля совпадают с search_fields вьюх и админки
+INDEXES = {
+    "course": ("lms.Course", ["title"]),
+    "lesson": ("lms.Lesson", ["title"]),
+    "user": ("users.User", ["email", "username", "phone", "city"]),
+}
+
+# одинаковая нарезка на слова для SQLite и PostgreSQL (в т.ч. email: user@mail.ru -> user mail ru)
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def kind_for_model(model):
+    for kind, (label, _fields) in INDEXES.items():
+        if model._meta.concrete_model is apps.get_model(label):
+            return kind
+    return None
+
+
+def document_for(instance):
+    _label, fields = INDEXES[kind_for_model(type(instance))]
+    return " ".join(" ".join(tokenize(getattr(instance, f) or "")) for f in fields)
+
+
+def resolve_targets(model, search_fields):
+    """
+    search_fields вида "user__email", "title" -> {путь_к_модели: вид индекса}.
+    None — если хоть одно поле не покрыто индексом (тогда ищем по-старому, LIKE).
+    """
+    targets = {}
+    for field in search_fields:
+        *path, name = field.lstrip("^=@$").split("__")
+        current = model
+        for part in path:
+            current = current._meta.get_field(part).related_model
+        kind = kind_for_model(current)
+        if kind is None or name not in INDEXES[kind][1]:
+            return None
+        targets["__".join(path)] = kind
+    return targets
+
+
+def search_queryset(queryset, search_fields, terms, order_by_rank=True):
+    """
+    Фильтрует queryset по полнотекстовому индексу вместо icontains.
+
+    Как в SearchFilter, каждое слово должно найтись хотя бы в одном из search_fields — слова
+    запроса могут быть в разных полях (email пользователя и название урока платежа).
+    Отличие от SearchFilter: слово ищется по началу слов (префикс), а не как подстрока —
+    «ython» не найдёт «Python». Если ищем по самой модели вьюхи, результаты сортируются
+    по релевантности. Возвращает None, если индекс для этой БД/полей недоступен.
+    """
+    connection = connections[queryset.db]
+    backend = get_backend(connection)
+    targets = resolve_targets(queryset.model, search_fields)
+    tokens = [t for term in terms for t in tokenize(term)]
+    if backend is None or targets is None:
+        return None
+    if not tokens:
+        return queryset.none()
+
+    # один документ (поля модели в нём уже склеены) — все слова одним MATCH;
+    # несколько — по условию на слово: оно в любом из документов
+    groups = [tokens] if len(targets) == 1 else [[token] for token in tokens]
+    for group in groups:
+        condition = Q()
+        for path, kind in targets.items():
+            sql, params = backend.match_sql(kind, group)
+            condition |= Q(**{f"{path or 'pk'}__in": RawSQL(sql, params)})
+        queryset = queryset.filter(condition)
+
+    if order_by_rank and set(targets) == {""}:
+        kind = targets[""]
+        opts = queryset.model._meta
+        column = f"{connection.ops.quote_name(opts.db_table)}.{connection.ops.quote_name(opts.pk.column)}"
+        sql, params = backend.rank_sql(kind, tokens, column)
+        queryset = queryset.annotate(search_rank=RawSQL(sql, params)).order_by(
+            "-search_rank" if backend.higher_rank_is_better else "search_rank", "pk"
+        )
+    return queryset
@@ -0,0 +1,55 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from rest_framework.filters import SearchFilter
+from rest_framework.test import APIClient
+
+from edusite.benchmark import measure, seed_payments, temporary_database, throttling_disabled
+from lms.views import CourseViewSet
+from search.filters import FullTextSearchFilter
+from users.views import PaymentViewSet, UserViewSet
+
+VIEWS = {
+    "/api/payments/": PaymentViewSet,
+    "/api/users/": UserViewSet,
+    "/api/courses/": CourseViewSet,
+}
+
+
+class Command(BaseCommand):
+    help = "Сравнивает SearchFilter (LIKE) и FullTextSearchFilter на сгенерированных данных (во временной БД)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000, help="платежей")
+        parser.add_argument("--users", type=int, default=20_000)
+        parser.add_argument("--courses", type=int, default=2_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        # сотни запросов от одного клиента — без лимитов edusite.throttling
+        with throttling_disabled(), temporary_database():
+            self.stdout.write("Наполняем данные и индекс...")
+            seed_payments(options["rows"], users=options["users"], courses=options["courses"])
+            call_command("rebuild_search_index", stdout=StringIO())
+            self.run(options)
+
+    def run(self, options):
+        client = APIClient()
+        urls = [
+            "/api/payments/?search=bench1234",
+            "/api/payments/?search=курс 17",
+            "/api/users/?search=bench777",
+            "/api/courses/?search=курс 42",
+        ]
+        self.stdout.write(f"{'запрос':<36} {'LIKE, ms':>10} {'FTS, ms':>10}")
+        for url in urls:
+            view = VIEWS[url.split("?")[0]]
+            timings = []
+            for backend in (SearchFilter, FullTextSearchFilter):
+                backends = [b for b in view.filter_backends if not issubclass(b, SearchFilter)] + [backend]
+                with mock.patch.object(view, "filter_backends", backends):
+                    assert client.get(url).status_code == 200, url
+                    timings.append(measure(lambda: client.get(url), options["repeat"])["median"])
+            self.stdout.write(f"{url:<36} {timings[0]:>10.1f} {timings[1]:>10.1f}")
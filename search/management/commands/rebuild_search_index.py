@@ -0,0 +1,35 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from search.backends import get_backend
+from search.indexes import INDEXES, document_for
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс (после bulk_create/update, которые не шлют сигналы)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kinds", nargs="*", help=f"какие индексы: {', '.join(INDEXES)} (по умолчанию все)")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        backend = get_backend(connection)
+        if backend is None:
+            raise CommandError(f"Для {connection.vendor} полнотекстовый индекс не поддерживается.")
+
+        for kind in options["kinds"] or INDEXES:
+            if kind not in INDEXES:
+                raise CommandError(f"Неизвестный индекс: {kind}")
+            model = apps.get_model(INDEXES[kind][0])
+            total = 0
+            with transaction.atomic(using=options["database"]), connection.cursor() as cursor:
+                backend.drop(cursor, kind)
+                backend.create(cursor, kind)
+                objects = model._default_manager.using(options["database"]).order_by("pk")
+                for instance in objects.iterator(chunk_size=options["batch_size"]):
+                    backend.index(cursor, kind, instance.pk, document_for(instance))
+                    total += 1
+            self.stdout.write(f"{kind}: {total}")
@@ -0,0 +1,52 @@
+import re
+
+from django.db import migrations
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+# вид индекса -> (модель, поля) на момент миграции
+INDEXES = {
+    "course": ("lms", "Course", ["title"]),
+    "lesson": ("lms", "Lesson", ["title"]),
+    "user": ("users", "User", ["email", "username", "phone", "city"]),
+}
+
+
+def create_indexes(apps, schema_editor):
+    from search.backends import get_backend
+
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for kind, (app_label, model_name, fields) in INDEXES.items():
+            backend.create(cursor, kind)
+            model = apps.get_model(app_label, model_name)
+            for row in model.objects.values_list("pk", *fields).iterator(chunk_size=2000):
+                body = " ".join(" ".join(TOKEN_RE.findall((value or "").lower())) for value in row[1:])
+                backend.index(cursor, kind, row[0], body)
+
+
+def drop_indexes(apps, schema_editor):
+    from search.backends import get_backend
+
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for kind in INDEXES:
+            backend.drop(cursor, kind)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('lms', '0001_initial'),
+        ('users', '0003_payment_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
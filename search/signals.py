@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+
+from edusite.signals import post_bulk_create, post_bulk_update
+from .backends import get_backend
+from .indexes import INDEXES, document_for, kind_for_model
+
+
+def update_index(sender, instance, using, **kwargs):
+    backend = get_backend(connections[using])
+    if backend is None:
+        return
+    with connections[using].cursor() as cursor:
+        backend.index(cursor, kind_for_model(sender), instance.pk, document_for(instance))
+
+
+def remove_from_index(sender, instance, using, **kwargs):
+    backend = get_backend(connections[using])
+    if backend is None:
+        return
+    with connections[using].cursor() as cursor:
+        backend.remove(cursor, kind_for_model(sender), instance.pk)
+
+
+def update_index_bulk(sender, instances, using, fields=None, **kwargs):
+    kind = kind_for_model(sender)
+    backend = get_backend(connections[using])
+    if backend is None or (fields is not None and not set(fields) & set(INDEXES[kind][1])):
+        return
+    with connections[using].cursor() as cursor:
+        backend.index_many(cursor, kind, [(instance.pk, document_for(instance)) for instance in instances])
+
+
+def connect():
+    for kind, (label, _fields) in INDEXES.items():
+        model = apps.get_model(label)
+        post_save.connect(update_index, sender=model, dispatch_uid=f"search-index-{kind}")
+        post_delete.connect(remove_from_index, sender=model, dispatch_uid=f"search-remove-{kind}")
+        post_bulk_create.connect(update_index_bulk, sender=model, dispatch_uid=f"search-bulk-create-{kind}")
+        post_bulk_update.connect(update_index_bulk, sender=model, dispatch_uid=f"search-bulk-update-{kind}")
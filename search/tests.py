@@ -0,0 +1,80 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from lms import cache
+from lms.models import Course, Lesson
+from users.models import Payment, User
+
+
+class FullTextSearchTests(APITestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.python = Course.objects.create(title="Python для начинающих")
+        self.django = Course.objects.create(title="Python: python на практике")
+        self.go = Course.objects.create(title="Go")
+        self.lesson = Lesson.objects.create(course=self.go, title="Горутины")
+        self.user = User.objects.create(email="student@example.com", username="student", city="Дербент")
+        self.payment_course = Payment.objects.create(user=self.user, course=self.python, amount=Decimal("10"))
+        self.payment_lesson = Payment.objects.create(user=self.user, lesson=self.lesson, amount=Decimal("5"))
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.json()["results"]]
+
+    def test_prefix_and_case_insensitive(self):
+        self.assertCountEqual(self.ids("/api/courses/?search=PYTH"), [self.python.id, self.django.id])
+        self.assertEqual(self.ids("/api/lessons/?search=горут"), [self.lesson.id])
+        self.assertEqual(self.ids("/api/users/?search=дербент"), [self.user.id])
+
+    def test_ranked_unless_ordering_given(self):
+        # во втором курсе «python» встречается дважды — он релевантнее
+        self.assertEqual(self.ids("/api/courses/?search=python"), [self.django.id, self.python.id])
+        self.assertEqual(self.ids("/api/courses/?search=python&ordering=id"), [self.python.id, self.django.id])
+
+    def test_payment_search_across_relations(self):
+        self.assertEqual(self.ids("/api/payments/?search=горутины"), [self.payment_lesson.id])
+        self.assertCountEqual(
+            self.ids("/api/payments/?search=student@example.com"),
+            [self.payment_course.id, self.payment_lesson.id],
+        )
+
+    def test_words_may_match_different_fields(self):
+        # как SearchFilter: email пользователя и название урока — разные поля
+        self.assertEqual(self.ids("/api/payments/?search=student горут"), [self.payment_lesson.id])
+        self.assertEqual(self.ids("/api/payments/?search=student rust"), [])
+
+    def test_prefix_not_substring(self):
+        # в отличие от SearchFilter (icontains): середина слова не находится
+        self.assertEqual(self.ids("/api/courses/?search=ython"), [])
+        self.assertEqual(self.ids("/api/users/?search=example.com student"), [self.user.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.go.title = "Rust"
+        self.go.save()
+        self.assertEqual(self.ids("/api/courses/?search=rust"), [self.go.id])
+        self.assertEqual(self.ids("/api/courses/?search=go"), [])
+        self.go.delete()
+        self.assertEqual(self.ids("/api/courses/?search=rust"), [])
+
+    def test_rebuild_picks_up_bulk_created_rows(self):
+        Course.objects.bulk_create([Course(title="Kotlin")])
+        self.assertEqual(self.ids("/api/courses/?search=kotlin"), [])
+        call_command("rebuild_search_index", "course", stdout=StringIO())
+        cache.get_cache().clear()  # bulk_create не шлёт сигналы — кэш ответов тоже не знает о записи
+        self.assertEqual(len(self.ids("/api/courses/?search=kotlin")), 1)
+
+    def test_keyset_pagination_with_search(self):
+        Lesson.objects.bulk_create([Lesson(course=self.go, title=f"Python {i}") for i in range(25)])
+        call_command("rebuild_search_index", "lesson", stdout=StringIO())
+        cache.get_cache().clear()
+        url, seen = "/api/lessons/?search=python&paginate=keyset", []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row["id"] for row in response.json()["results"]]
+            url = response.json()["next"]
+        self.assertEqual(seen, sorted(Lesson.objects.filter(title__startswith="Python").values_list("id", flat=True)))
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import ThumbnailJob
+
+
+@admin.register(ThumbnailJob)
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "object_id", "source", "status", "attempts", "available_at", "updated_at")
+    list_filter = ("status", "kind")
+    search_fields = ("source",)
+    readonly_fields = ("created_at", "updated_at")
@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+
+class ThumbnailsField(serializers.Field):
+    """
+    JSON-поле с вариантами картинки -> {"small": URL, "medium": URL} или null, пока их нет.
+    Только читает готовое: картинки уменьшает воркер (manage.py process_thumbnails).
+    """
+
+    def __init__(self, image_field, **kwargs):
+        kwargs["read_only"] = True
+        self.image_field = image_field
+        super().__init__(**kwargs)
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        self.storage = parent.Meta.model._meta.get_field(self.image_field).storage
+
+    def to_representation(self, value):
+        return self.fast_to_representation(value, self.context.get("request"))
+
+    def fast_to_representation(self, value, request):
+        # та же функция — в edusite.fastpath для строк values()
+        sizes = (value or {}).get("sizes")
+        if not sizes:
+            return None
+        urls = {}
+        for size, name in sizes.items():
+            url = self.storage.url(name)
+            urls[size] = request.build_absolute_uri(url) if request is not None else url
+        return urls
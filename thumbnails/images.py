@@ -0,0 +1,26 @@
+"""
+Обработка картинок — без Django и БД, чтобы запускаться в процессах пула воркера.
+"""
+from io import BytesIO
+
+
+def render(data, sizes, image_format="WEBP", quality=80):
+    """
+    Байты оригинала -> {имя размера: байты уменьшенной копии}.
+    sizes — {имя: (ширина, высота)}, пропорции сохраняются, увеличения нет.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        result = {}
+        for name, box in sizes.items():
+            thumbnail = image.copy()
+            thumbnail.thumbnail(tuple(box), Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            thumbnail.save(buffer, image_format, quality=quality)
+            result[name] = buffer.getvalue()
+    return result
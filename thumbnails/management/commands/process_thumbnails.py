@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from thumbnails.queue import claim, enqueue, process
+from thumbnails.sources import SOURCES, get_source, is_stale, source_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер очереди ThumbnailJob: делает уменьшенные копии (WebP) превью курсов/уроков и аватаров. "
+        "Pillow работает в пуле процессов, задания берутся из БД — брокер не нужен."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int, default=settings.THUMBNAIL_WORKER_PROCESSES,
+            help="размер пула процессов (0 — обрабатывать в текущем процессе)",
+        )
+        parser.add_argument("--batch-size", type=int, default=20, help="заданий за один захват")
+        parser.add_argument("--once", action="store_true", help="разобрать очередь и выйти")
+        parser.add_argument("--sleep", type=float, default=2.0, help="пауза при пустой очереди, сек")
+        parser.add_argument(
+            "--backfill", action="store_true",
+            help="сначала поставить в очередь все картинки без актуальных копий (загруженные до воркера)",
+        )
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            self.backfill()
+        executor = ProcessPoolExecutor(options["processes"]) if options["processes"] else None
+        totals = {"done": 0, "retry": 0, "skipped": 0}
+        try:
+            while True:
+                close_old_connections()
+                jobs = claim(options["batch_size"])
+                if jobs:
+                    for status, count in process(jobs, executor).items():
+                        totals[status] += count
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            self.stdout.write(", ".join(f"{status}: {count}" for status, count in totals.items()))
+
+    def backfill(self):
+        for kind in SOURCES:
+            model, field, thumbnails_field = get_source(kind)
+            objects = model._default_manager.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            stale = [
+                (obj.pk, source_name(obj, field))
+                for obj in objects.only("pk", field, thumbnails_field).iterator()
+                if is_stale(obj, field, thumbnails_field)
+            ]
+            enqueue(kind, stale)
+            self.stdout.write(f"{kind}: в очереди {len(stale)}")
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20, verbose_name='вид')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='id объекта')),
+                ('source', models.CharField(max_length=255, verbose_name='оригинал')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'В работе'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='не раньше')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='взято в работу')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='thumbnail_job_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id', 'source'), name='thumbnail_job_key')],
+            },
+        ),
+    ]
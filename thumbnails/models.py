@@ -0,0 +1,39 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ThumbnailJob(models.Model):
+    """
+    Задание на уменьшенные копии картинки (очередь в БД, без брокера).
+    Одно задание на (вид, объект, оригинал): повторная постановка ничего не меняет.
+    """
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "В работе"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    kind = models.CharField(max_length=20, verbose_name="вид")
+    object_id = models.PositiveBigIntegerField(verbose_name="id объекта")
+    source = models.CharField(max_length=255, verbose_name="оригинал")
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name="статус"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="попыток")
+    last_error = models.TextField(blank=True, verbose_name="последняя ошибка")
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="не раньше")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="взято в работу")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id", "source"], name="thumbnail_job_key"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="thumbnail_job_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.source} ({self.status})"
@@ -0,0 +1,144 @@
+"""
+Очередь заданий ThumbnailJob: постановка, захват воркером, завершение и повторы.
+
+Постановка идёт в той же транзакции, что и сохранение объекта: задание не теряется
+и становится видно воркеру только после коммита. Захват — условным UPDATE
+(статус и число попыток не изменились), поэтому несколько воркеров не возьмут
+одно задание дважды; зависшие «в работе» дольше THUMBNAIL_LOCK_TIMEOUT берутся заново.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .images import render
+from .models import ThumbnailJob
+from .sources import get_source, source_name, thumbnail_name
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(kind, items):
+    """
+    items — пары (id объекта, имя оригинала).
+    """
+    ThumbnailJob.objects.bulk_create(
+        [ThumbnailJob(kind=kind, object_id=pk, source=name) for pk, name in items if name],
+        ignore_conflicts=True,
+    )
+
+
+def claim(limit):
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.THUMBNAIL_LOCK_TIMEOUT)
+    candidates = (
+        ThumbnailJob.objects
+        .filter(
+            Q(status=ThumbnailJob.Status.PENDING, available_at__lte=now)
+            | Q(status=ThumbnailJob.Status.RUNNING, locked_at__lt=stale)
+        )
+        .order_by("available_at", "id")[:limit]
+    )
+    claimed = []
+    for job in candidates:
+        taken = ThumbnailJob.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+            status=ThumbnailJob.Status.RUNNING, locked_at=now, attempts=F("attempts") + 1,
+        )
+        if taken:
+            job.status, job.locked_at, job.attempts = ThumbnailJob.Status.RUNNING, now, job.attempts + 1
+            claimed.append(job)
+    return claimed
+
+
+def load_source(job):
+    """
+    Байты оригинала или None, если объект удалён или картинку уже заменили.
+    """
+    model, field, _thumbnails_field = get_source(job.kind)
+    instance = model._default_manager.filter(pk=job.object_id).first()
+    if instance is None or source_name(instance, field) != job.source:
+        return None
+    with getattr(instance, field).open("rb") as fh:
+        return fh.read()
+
+
+def store(job, images):
+    """
+    Сохраняет варианты и записывает их в объект — если оригинал всё ещё тот же.
+    Сохранение модели (update_fields) шлёт post_save: кэш каталога и прочие
+    подписчики узнают о новых превью как об обычном изменении.
+    """
+    model, field, thumbnails_field = get_source(job.kind)
+    storage = model._meta.get_field(field).storage
+    sizes = {}
+    for size, data in images.items():
+        name = thumbnail_name(job.kind, job.object_id, job.source, size)
+        if storage.exists(name):
+            storage.delete(name)
+        sizes[size] = storage.save(name, ContentFile(data))
+
+    with transaction.atomic():
+        instance = model._default_manager.select_for_update().filter(pk=job.object_id).first()
+        if instance is not None and source_name(instance, field) == job.source:
+            setattr(instance, thumbnails_field, {"source": job.source, "sizes": sizes})
+            instance.save(update_fields=[thumbnails_field])
+        finish(job)
+
+
+def finish(job):
+    ThumbnailJob.objects.filter(pk=job.pk).update(
+        status=ThumbnailJob.Status.DONE, locked_at=None, last_error="", updated_at=timezone.now(),
+    )
+
+
+def fail(job, error):
+    """
+    Повтор с экспоненциальной задержкой, после THUMBNAIL_MAX_ATTEMPTS — failed.
+    """
+    failed = job.attempts >= settings.THUMBNAIL_MAX_ATTEMPTS
+    delay = settings.THUMBNAIL_RETRY_DELAY * 2 ** (job.attempts - 1)
+    ThumbnailJob.objects.filter(pk=job.pk).update(
+        status=ThumbnailJob.Status.FAILED if failed else ThumbnailJob.Status.PENDING,
+        available_at=timezone.now() + timedelta(seconds=delay),
+        locked_at=None,
+        last_error=error,
+        updated_at=timezone.now(),
+    )
+    logger.warning("thumbnail job %s failed (attempt %s): %s", job.pk, job.attempts, error.splitlines()[-1])
+
+
+def process(jobs, executor=None):
+    """
+    Обрабатывает захваченные задания. Pillow работает в executor (пул процессов),
+    чтение/запись файлов и БД — в текущем процессе. Без executor — всё на месте.
+    Возвращает {статус: количество}.
+    """
+    options = (settings.THUMBNAIL_SIZES, settings.THUMBNAIL_FORMAT, settings.THUMBNAIL_QUALITY)
+    pending, counts = [], {"done": 0, "retry": 0, "skipped": 0}
+    for job in jobs:
+        try:
+            data = load_source(job)
+        except Exception:
+            fail(job, traceback.format_exc())
+            counts["retry"] += 1
+            continue
+        if data is None:
+            finish(job)
+            counts["skipped"] += 1
+            continue
+        pending.append((job, executor.submit(render, data, *options) if executor else None, data))
+
+    for job, future, data in pending:
+        try:
+            images = future.result() if future is not None else render(data, *options)
+            store(job, images)
+            counts["done"] += 1
+        except Exception:
+            fail(job, traceback.format_exc())
+            counts["retry"] += 1
+    return counts
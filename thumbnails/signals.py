@@ -0,0 +1,49 @@
+from django.db.models.signals import post_save, pre_save
+
+from edusite.signals import post_bulk_create, post_bulk_update
+from .queue import enqueue
+from .sources import SOURCES, get_source, is_stale, kind_for_model, source_name
+
+
+def reset_stale(sender, instance, **kwargs):
+    # картинку заменили — варианты от старой больше не отдаём
+    _model, field, thumbnails_field = get_source(kind_for_model(sender))
+    thumbnails = getattr(instance, thumbnails_field) or {}
+    instance._thumbnails_reset = bool(thumbnails) and thumbnails.get("source") != source_name(instance, field)
+    if instance._thumbnails_reset:
+        setattr(instance, thumbnails_field, {})
+
+
+def enqueue_saved(sender, instance, update_fields=None, **kwargs):
+    kind = kind_for_model(sender)
+    model, field, thumbnails_field = get_source(kind)
+    if getattr(instance, "_thumbnails_reset", False) and update_fields is not None and thumbnails_field not in update_fields:
+        # save(update_fields=[...]) без JSON-поля — сброс дописываем сами
+        model._default_manager.filter(pk=instance.pk).update(**{thumbnails_field: {}})
+    if is_stale(instance, field, thumbnails_field):
+        enqueue(kind, [(instance.pk, source_name(instance, field))])
+
+
+def enqueue_bulk(sender, instances, previous=None, fields=None, **kwargs):
+    kind = kind_for_model(sender)
+    model, field, thumbnails_field = get_source(kind)
+    if fields is not None and field not in fields:
+        return
+    stale = [obj for obj in instances if is_stale(obj, field, thumbnails_field)]
+    if previous is not None:
+        # bulk_update пишет только переданные поля — устаревшие варианты сбрасываем отдельно
+        replaced = [obj.pk for obj in stale if (getattr(obj, thumbnails_field) or {})]
+        if replaced:
+            model._default_manager.filter(pk__in=replaced).update(**{thumbnails_field: {}})
+            for obj in stale:
+                setattr(obj, thumbnails_field, {})
+    enqueue(kind, [(obj.pk, source_name(obj, field)) for obj in stale])
+
+
+def connect():
+    for kind in SOURCES:
+        model, _field, _thumbnails_field = get_source(kind)
+        pre_save.connect(reset_stale, sender=model, dispatch_uid=f"thumbnails-reset-{kind}")
+        post_save.connect(enqueue_saved, sender=model, dispatch_uid=f"thumbnails-enqueue-{kind}")
+        post_bulk_create.connect(enqueue_bulk, sender=model, dispatch_uid=f"thumbnails-bulk-create-{kind}")
+        post_bulk_update.connect(enqueue_bulk, sender=model, dispatch_uid=f"thumbnails-bulk-update-{kind}")
@@ -0,0 +1,49 @@
+"""
+Какие картинки уменьшаются: вид -> (модель, поле с оригиналом, JSON-поле с вариантами).
+
+JSON-поле хранит {"source": имя оригинала, "sizes": {"small": имя файла, ...}}.
+По source видно, к какому оригиналу относятся варианты: после замены картинки
+старые варианты сбрасываются, а отдавать их сериализатор может без лишних запросов.
+"""
+import os
+
+from django.apps import apps
+from django.conf import settings
+
+SOURCES = {
+    "course": ("lms.Course", "preview", "preview_thumbnails"),
+    "lesson": ("lms.Lesson", "preview", "preview_thumbnails"),
+    "user": ("users.User", "avatar", "avatar_thumbnails"),
+}
+
+
+def kind_for_model(model):
+    label = model._meta.label_lower
+    for kind, (model_label, _field, _thumbnails_field) in SOURCES.items():
+        if model_label.lower() == label:
+            return kind
+    raise LookupError(label)
+
+
+def get_source(kind):
+    label, field, thumbnails_field = SOURCES[kind]
+    return apps.get_model(label), field, thumbnails_field
+
+
+def source_name(instance, field):
+    return getattr(instance, field).name or ""
+
+
+def is_stale(instance, field, thumbnails_field):
+    """
+    Есть оригинал, а варианты сделаны не из него (или их ещё нет).
+    """
+    name = source_name(instance, field)
+    return bool(name) and (getattr(instance, thumbnails_field) or {}).get("source") != name
+
+
+def thumbnail_name(kind, object_id, source, size):
+    # имя детерминировано: повторная обработка того же оригинала перезаписывает те же файлы
+    stem = os.path.splitext(os.path.basename(source))[0]
+    extension = settings.THUMBNAIL_FORMAT.lower()
+    return f"thumbnails/{kind}/{object_id}/{stem}-{size}.{extension}"
@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from edusite.signals import post_bulk_create, post_bulk_update
+from lms import cache
+from lms.models import Course, Lesson
+from lms.views import LessonListCreateAPIView
+from users.models import User
+from .models import ThumbnailJob
+from .queue import claim, enqueue, process
+
+
+def image_file(name="preview.png", size=(800, 600), color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ThumbnailTestCase(APITestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, THUMBNAIL_RETRY_DELAY=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def run_worker(self, executor=None):
+        return process(claim(100), executor)
+
+
+class ThumbnailQueueTests(ThumbnailTestCase):
+    def test_upload_enqueues_and_worker_builds_webp(self):
+        course = Course.objects.create(title="Курс", preview=image_file())
+        job = ThumbnailJob.objects.get()
+        self.assertEqual((job.kind, job.object_id, job.source), ("course", course.pk, course.preview.name))
+        # запрос не ждёт картинок: пока воркер не отработал, превью нет
+        self.assertIsNone(self.client.get(f"/api/courses/{course.pk}/").data["preview_thumbnails"])
+
+        self.assertEqual(self.run_worker(), {"done": 1, "retry": 0, "skipped": 0})
+        course.refresh_from_db()
+        self.assertEqual(course.preview_thumbnails["source"], course.preview.name)
+        with course.preview.storage.open(course.preview_thumbnails["sizes"]["small"]) as fh, Image.open(fh) as image:
+            self.assertEqual(image.format, "WEBP")
+            self.assertEqual(image.size, (160, 120))
+        self.assertEqual(ThumbnailJob.objects.get().status, ThumbnailJob.Status.DONE)
+
+        data = self.client.get(f"/api/courses/{course.pk}/").data
+        self.assertEqual(set(data["preview_thumbnails"]), {"small", "medium"})
+        self.assertTrue(data["preview_thumbnails"]["small"].startswith("http://testserver/media/thumbnails/course/"))
+
+    def test_idempotent(self):
+        course = Course.objects.create(title="Курс", preview=image_file())
+        enqueue("course", [(course.pk, course.preview.name)])
+        self.assertEqual(ThumbnailJob.objects.count(), 1)
+        self.run_worker()
+        course.refresh_from_db()
+        first = course.preview_thumbnails
+        # готовые копии не ставят новое задание, повторная обработка даёт те же файлы
+        course.title = "Другое название"
+        course.save()
+        self.assertEqual(ThumbnailJob.objects.count(), 1)
+        ThumbnailJob.objects.update(status=ThumbnailJob.Status.PENDING, available_at=timezone.now())
+        self.run_worker()
+        course.refresh_from_db()
+        self.assertEqual(course.preview_thumbnails, first)
+
+    def test_replaced_image_resets_and_old_job_is_skipped(self):
+        course = Course.objects.create(title="Курс", preview=image_file("a.png"))
+        self.run_worker()
+        course.preview = image_file("b.png", color="blue")
+        course.save()
+        self.assertEqual(Course.objects.get(pk=course.pk).preview_thumbnails, {})
+        old = ThumbnailJob.objects.first()
+        ThumbnailJob.objects.filter(pk=old.pk).update(status=ThumbnailJob.Status.PENDING)
+        self.assertEqual(self.run_worker(), {"done": 1, "retry": 0, "skipped": 1})
+        course.refresh_from_db()
+        self.assertEqual(course.preview_thumbnails["source"], course.preview.name)
+
+    @override_settings(THUMBNAIL_MAX_ATTEMPTS=2)
+    def test_failures_are_retried_then_marked_failed(self):
+        user = User.objects.create(
+            email="a@example.com", username="a",
+            avatar=SimpleUploadedFile("broken.png", b"not an image", content_type="image/png"),
+        )
+        with self.assertLogs("thumbnails.queue", "WARNING"):
+            self.assertEqual(self.run_worker()["retry"], 1)
+        job = ThumbnailJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ThumbnailJob.Status.PENDING, 1))
+        self.assertIn("UnidentifiedImageError", job.last_error)
+        with self.assertLogs("thumbnails.queue", "WARNING"):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ThumbnailJob.Status.FAILED, 2))
+        self.assertEqual(self.run_worker(), {"done": 0, "retry": 0, "skipped": 0})
+        self.assertEqual(User.objects.get(pk=user.pk).avatar_thumbnails, {})
+
+    def test_claim_is_exclusive(self):
+        Course.objects.create(title="Курс", preview=image_file())
+        self.assertEqual(len(claim(10)), 1)
+        self.assertEqual(claim(10), [])
+
+    def test_process_pool(self):
+        lesson = Lesson.objects.create(course=Course.objects.create(title="Курс"), title="Урок", preview=image_file())
+        with ProcessPoolExecutor(1) as executor:
+            self.assertEqual(self.run_worker(executor)["done"], 1)
+        lesson.refresh_from_db()
+        self.assertEqual(set(lesson.preview_thumbnails["sizes"]), {"small", "medium"})
+
+    def test_bulk_signals_enqueue(self):
+        # так пишет edusite.bulk: bulk_create/bulk_update + post_bulk_create/post_bulk_update
+        course = Course.objects.create(title="Курс")
+        lessons = Lesson.objects.bulk_create([
+            Lesson(course=course, title="с картинкой", preview="lessons/x.png"),
+            Lesson(course=course, title="без"),
+        ])
+        post_bulk_create.send(sender=Lesson, instances=lessons, using="default")
+        self.assertEqual(list(ThumbnailJob.objects.values_list("source", flat=True)), ["lessons/x.png"])
+
+        lesson = lessons[0]
+        Lesson.objects.filter(pk=lesson.pk).update(preview_thumbnails={"source": "lessons/x.png", "sizes": {"small": "s"}})
+        lesson.refresh_from_db()
+        lesson.preview = "lessons/y.png"
+        Lesson.objects.bulk_update([lesson], ["preview"])
+        post_bulk_update.send(sender=Lesson, instances=[lesson], previous={}, fields={"preview"}, using="default")
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).preview_thumbnails, {})
+        self.assertEqual(ThumbnailJob.objects.count(), 2)
+
+    def test_lesson_fast_list_matches_serializer(self):
+        Lesson.objects.create(course=Course.objects.create(title="Курс"), title="Урок", preview=image_file())
+        self.run_worker()
+        cache.get_cache().clear()
+        fast = self.client.get("/api/lessons/")
+        cache.get_cache().clear()
+        with mock.patch.object(LessonListCreateAPIView, "fast_list", False):
+            slow = self.client.get("/api/lessons/")
+        self.assertEqual(fast.content, slow.content)
+        self.assertIsNotNone(fast.data["results"][0]["preview_thumbnails"])
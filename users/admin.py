@@ -1,10 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from search.filters import FullTextSearchAdminMixin
 from .models import User, Payment
 
 
 @admin.register(User)
-class UserAdmin(DjangoUserAdmin):
+class UserAdmin(FullTextSearchAdminMixin, DjangoUserAdmin):
     fieldsets = (
         (None, {"fields": ("email", "password")}),
         ("Personal info", {"fields": ("username", "first_name", "last_name", "phone", "city", "avatar")}),
@@ -20,7 +21,7 @@ class UserAdmin(DjangoUserAdmin):
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ("id", "user", "paid_at", "course", "lesson", "amount", "method")
     list_filter = ("method", "paid_at", "course", "lesson")
     search_fields = ("user__email", "course__title", "lesson__title")
@@ -0,0 +1,264 @@
+"""
+Холодный архив закрытых месяцев платежей.
+
+- archive_month(month) переносит платежи месяца в STORAGES["payment_archive"]: файл
+  payments/ГГГГ-ММ.ndjson.gz — строки в колонках выгрузки (users.export), новые сверху,
+  запись PaymentArchive и DELETE из горячей таблицы — одной транзакцией, без сигналов:
+  свёртка, счётчики курсов и доступы архивные платежи продолжают учитывать
+  (пересборки — rebuild(...) модулей rollups/entitlements и lms.counters — читают архив).
+  На PostgreSQL пустая после переноса секция месяца удаляется.
+- closed_months(keep) — месяцы с платежами старше keep последних (текущий не закрывается никогда).
+- with_archived(...) — выгрузка /api/payments/export/ вместе с архивом: открываются только файлы
+  месяцев, попавших в paid_at__gte/__lte (отсечение, как у секций), фильтры и поиск — построчно,
+  слияние с горячими строками — в порядке ?ordering=. Память не растёт с архивом: -paid_at — порядок
+  файлов, другие сортировки — внешней сортировкой (куски по PAYMENT_ARCHIVE_SORT_ROWS строк
+  во временных файлах, heapq.merge по ним).
+"""
+import gzip
+import heapq
+import json
+import tempfile
+from collections import Counter, defaultdict
+from decimal import Decimal
+from itertools import chain, islice
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from search.indexes import tokenize
+from . import export, partitions
+from .models import Payment, PaymentArchive
+
+NAMES = [name for name, _field in export.COLUMNS]
+# сортировки, в которых строки уже лежат в файлах (новые сверху, месяцы — от новых к старым)
+FILE_ORDERINGS = {("-paid_at", "-id"), ("-paid_at",)}
+# колонка -> значение для сравнения (сортировки ?ordering= вьюхи и тай-брейкер id)
+# paid_at в файлах — как в выгрузке (export.format_datetime): UTC — с «Z», его datetime.fromisoformat
+# понимает только с Python 3.11, поэтому parse_datetime
+KEYS = {"id": int, "amount": Decimal, "paid_at": lambda value: parse_datetime(value).timestamp()}
+# параметр выгрузки -> колонка архива
+FILTERS = {"course": "course", "lesson": "lesson", "method": "method"}
+# search_fields PaymentViewSet в колонках архива
+SEARCH_COLUMNS = ["user_email", "course_title", "lesson_title"]
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def get_storage():
+    return storages["payment_archive"]
+
+
+def archive_path(month):
+    return f"payments/{month:%Y-%m}.ndjson.gz"
+
+
+def horizon():
+    """
+    Первый день после последнего архивного месяца (None — архива нет).
+    """
+    last = PaymentArchive.objects.aggregate(last=Max("month"))["last"]
+    return partitions.next_month(last) if last else None
+
+
+def closed_months(keep_months):
+    """
+    Ещё не архивные месяцы с платежами старше keep_months последних.
+    """
+    cutoff = timezone.localdate().replace(day=1)
+    for _ in range(keep_months):
+        cutoff = partitions.previous_month(cutoff)
+    start = partitions.month_bounds(cutoff)[0]
+    done = set(PaymentArchive.objects.values_list("month", flat=True))
+    months = Payment.objects.filter(paid_at__lt=start).datetimes("paid_at", "month")
+    return [month.date() for month in months if month.date() not in done]
+
+
+def archive_month(month, chunk_size=2000):
+    """
+    Переносит платежи месяца в архив. Возвращает PaymentArchive или None, если платежей нет.
+    """
+    start, end = partitions.month_bounds(month)
+    storage = get_storage()
+    with transaction.atomic():
+        payments = Payment.objects.filter(paid_at__gte=start, paid_at__lt=end).order_by("-paid_at", "-id")
+        rows, amount, last_id = 0, Decimal("0"), 0
+        courses = defaultdict(lambda: [0, Decimal("0")])
+        with tempfile.TemporaryFile() as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as fh:
+                for row in export.iter_rows(payments, chunk_size):
+                    record = dict(zip(NAMES, row))
+                    fh.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                    rows += 1
+                    amount += Decimal(record["amount"])
+                    last_id = max(last_id, record["id"])
+                    if record["course"] is not None:
+                        courses[record["course"]][0] += 1
+                        courses[record["course"]][1] += Decimal(record["amount"])
+            if not rows:
+                return None
+            raw.seek(0)
+            path = archive_path(month)
+            if storage.exists(path):
+                storage.delete(path)  # файл от прерванного прошлого запуска
+            path = storage.save(path, File(raw))
+
+        try:
+            archive = PaymentArchive.objects.create(
+                month=month, path=path, rows=rows, amount_total=amount,
+                course_totals={str(pk): [n, str(total)] for pk, (n, total) in courses.items()},
+            )
+            table = connection.ops.quote_name(Payment._meta.db_table)
+            with connection.cursor() as cursor:
+                # без сигналов post_delete: платежи не отменены, а перенесены
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE paid_at >= %s AND paid_at < %s AND id <= %s",
+                    [start, end, last_id],
+                )
+                if cursor.rowcount != rows:
+                    raise ArchiveError(f"{month:%Y-%m}: платежи менялись во время переноса, повторите")
+                if partitions.is_partitioned():
+                    cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(partitions.partition_name(month))}")
+        except Exception:
+            storage.delete(path)
+            raise
+    return archive
+
+
+def read(archive):
+    """
+    Записи архивного месяца (словари в колонках выгрузки), новые сверху.
+    """
+    with get_storage().open(archive.path, "rb") as raw, gzip.GzipFile(fileobj=raw) as fh:
+        for line in fh:
+            yield json.loads(line)
+
+
+def course_totals(course_ids):
+    """
+    {course_id: [платежей, сумма]} по архиву — для сверки счётчиков курсов.
+    """
+    wanted = {str(pk) for pk in course_ids}  # ключи JSON — строки
+    result = defaultdict(lambda: [0, Decimal("0")])
+    for totals in PaymentArchive.objects.values_list("course_totals", flat=True):
+        for pk, (count, amount) in totals.items():
+            if pk in wanted:
+                result[int(pk)][0] += count
+                result[int(pk)][1] += Decimal(amount)
+    return result
+
+
+def pair_counts():
+    """
+    Counter {(user_id, course_id, lesson_id): платежей} по архиву — для пересборки доступов.
+    Пары с удалёнными пользователями, курсами и уроками пропускаются.
+    """
+    from lms.models import Course, Lesson
+    from .models import User
+
+    found = Counter()
+    for archive in PaymentArchive.objects.order_by("month"):
+        for record in read(archive):
+            found[record["user"], record["course"], record["lesson"]] += 1
+    users = set(User.objects.filter(pk__in={k[0] for k in found}).values_list("pk", flat=True))
+    courses = set(Course.objects.filter(pk__in={k[1] for k in found}).values_list("pk", flat=True))
+    lessons = set(Lesson.objects.filter(pk__in={k[2] for k in found}).values_list("pk", flat=True))
+    return Counter({
+        (user, course, lesson): n for (user, course, lesson), n in found.items()
+        if user in users and (course is None or course in courses) and (lesson is None or lesson in lessons)
+    })
+
+
+# --- выгрузка ---
+
+def matches(record, criteria, gte, lte):
+    if any(record[column] != value for column, value in criteria.items()):
+        return False
+    if gte is None and lte is None:
+        return True
+    paid_at = parse_datetime(record["paid_at"])
+    return (gte is None or paid_at >= gte) and (lte is None or paid_at <= lte)
+
+
+def sort_key(ordering):
+    """
+    Ключ строки выгрузки для сортировки queryset; None — сортировка не по колонкам (ранг поиска).
+    """
+    parts = []
+    for field in ordering:
+        name = field.lstrip("-")
+        name = "id" if name == "pk" else name
+        if name not in KEYS:
+            return None
+        parts.append((NAMES.index(name), KEYS[name], field.startswith("-")))
+
+    def key(row):
+        return tuple(-convert(row[i]) if descending else convert(row[i]) for i, convert, descending in parts)
+    return key
+
+
+def search_matches(record, tokens):
+    # как полнотекстовый поиск (search.indexes): каждое слово — префикс слова любого из полей
+    words = [word for column in SEARCH_COLUMNS for word in tokenize(record[column] or "")]
+    return all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+def external_sort(rows, key, run_rows):
+    """
+    rows в порядке key; в памяти — не больше run_rows строк: отсортированные куски пишутся
+    во временные файлы и сливаются heapq.merge. Если всё уместилось в один кусок — без файлов.
+    """
+    runs = []
+    try:
+        while run := sorted(islice(rows, run_rows), key=key):
+            if not runs and len(run) < run_rows:
+                yield from run
+                return
+            fh = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+            runs.append(fh)
+            fh.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in run)
+            fh.seek(0)
+        yield from heapq.merge(*(map(json.loads, fh) for fh in runs), key=key)
+    finally:
+        for fh in runs:
+            fh.close()
+
+
+def with_archived(hot_rows, params, ordering):
+    """
+    Строки выгрузки горячей таблицы (hot_rows, в порядке ordering) вместе с архивными месяцами,
+    задетыми paid_at__gte/__lte; params — очищенные параметры PaymentFilter и "search".
+    Остальные месяцы не открываются. Сортировка -paid_at — потоком (файлы уже упорядочены),
+    другая — внешней сортировкой архивных совпадений (external_sort) и слиянием с горячими;
+    ранжированный поиск — архивные строки после горячих, новые сверху.
+    Поиск по архиву — по email и названиям на момент переноса.
+    """
+    gte, lte = params.get("paid_at__gte"), params.get("paid_at__lte")
+    archives = list(PaymentArchive.objects.order_by("-month"))
+    months = set(partitions.touched_months([a.month for a in archives], gte, lte))
+    archives = [a for a in archives if a.month in months]
+    if not archives:
+        return hot_rows
+    criteria = {column: params[name] for name, column in FILTERS.items() if params.get(name) not in (None, "")}
+    tokens = [token for term in (params.get("search") or "").replace(",", " ").split() for token in tokenize(term)]
+
+    def archived():
+        for archive in archives:
+            for record in read(archive):
+                if matches(record, criteria, gte, lte) and (not tokens or search_matches(record, tokens)):
+                    yield [record[name] for name in NAMES]
+
+    key = sort_key(ordering)
+    if key is None:
+        return chain(hot_rows, archived())
+    if tuple(ordering) in FILE_ORDERINGS:
+        cold = archived()
+    else:
+        cold = external_sort(archived(), key, settings.PAYMENT_ARCHIVE_SORT_ROWS)
+    return heapq.merge(hot_rows, cold, key=key)
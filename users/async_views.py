@@ -0,0 +1,17 @@
+from edusite.async_api import AsyncReadOnlyView
+from .views import PaymentViewSet
+
+# Те же queryset, PaymentFilter, сортировка и пагинация, что у PaymentViewSet, —
+# ответы совпадают, меняется только способ чтения из БД (edusite.async_api).
+
+
+class AsyncPaymentView(AsyncReadOnlyView):
+    queryset = PaymentViewSet.queryset
+    serializer_class = PaymentViewSet.serializer_class
+    pagination_class = PaymentViewSet.pagination_class
+    filterset_class = PaymentViewSet.filterset_class
+    ordering_fields = PaymentViewSet.ordering_fields
+    search_fields = PaymentViewSet.search_fields
+    fast_list = PaymentViewSet.fast_list
+    permission_classes = PaymentViewSet.permission_classes
+    throttle_scope = PaymentViewSet.throttle_scope
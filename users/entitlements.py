@@ -0,0 +1,246 @@
+"""
+Доступ к урокам: «оплатил ли пользователь урок или его курс».
+
+- Entitlement — материализованные пары (user, course) / (user, lesson) из платежей;
+  ведутся сигналами Payment (users.signals) и пересобираются командой rebuild_entitlements.
+- Доступы пользователя целиком (множества id курсов и уроков) держит LRU в памяти процесса
+  (ENTITLEMENT_CACHE_SIZE пользователей). Актуальность — по версии пользователя в общем кэше
+  ENTITLEMENT_CACHE_ALIAS: запись платежа в любом воркере меняет версию (сразу и после коммита),
+  и остальные воркеры перечитывают доступы одним запросом.
+- accessible(user, lessons) — доступные уроки списка: максимум один запрос на пользователя;
+  for_request(request) запоминает доступы на время запроса — IsAccessibleField
+  в LessonSerializer (и быстром пути edusite.fastpath) обходится без N+1.
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain, islice
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from rest_framework import serializers
+
+from lms import cache as catalog_cache
+from .models import Entitlement, Payment
+
+PREFIX = "entitlements"
+NOTHING = (frozenset(), frozenset())
+
+
+class LRU:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.ENTITLEMENT_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+lru = LRU()
+
+
+def get_cache():
+    return caches[settings.ENTITLEMENT_CACHE_ALIAS]
+
+
+def version(user_id):
+    """
+    (эпоха, версия пользователя): эпоха меняется при пересборке, версия — при его платежах.
+    Отсутствующие (вытеснены) заводятся от time_ns, чтобы не совпасть со старыми.
+    """
+    cache = get_cache()
+    keys = [f"{PREFIX}:epoch", f"{PREFIX}:v:{user_id}"]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return found[keys[0]], found[keys[1]]
+
+
+def bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*user_ids):
+    """
+    Доступы пользователей изменились: сбросить LRU, версии и их ответы в кэше каталога.
+    Сразу и после коммита — чтобы не закрепить набор, прочитанный до коммита.
+    """
+    user_ids = {uid for uid in user_ids if uid is not None}
+    if not user_ids:
+        return
+
+    def drop():
+        for user_id in user_ids:
+            bump(f"{PREFIX}:v:{user_id}")
+            lru.discard(user_id)
+        catalog_cache.bump(*(f"user:{user_id}" for user_id in user_ids))
+
+    drop()
+    transaction.on_commit(drop)
+
+
+def user_entitlements(user_id):
+    """
+    (frozenset id курсов, frozenset id уроков) — из LRU или одним запросом.
+    """
+    # версия читается до запроса: запись между ними сменит её, и набор перечитается
+    current = version(user_id)
+    entry = lru.get(user_id)
+    if entry is not None and entry[0] == current:
+        return entry[1]
+    courses, lessons = set(), set()
+    for course_id, lesson_id in Entitlement.objects.filter(user_id=user_id).values_list("course_id", "lesson_id"):
+        if lesson_id is not None:
+            lessons.add(lesson_id)
+        elif course_id is not None:
+            courses.add(course_id)
+    found = (frozenset(courses), frozenset(lessons))
+    lru.put(user_id, (current, found))
+    return found
+
+
+def for_user(user):
+    if user is None or not user.is_authenticated:
+        return NOTHING
+    return user_entitlements(user.pk)
+
+
+def for_request(request):
+    """
+    Доступы пользователя запроса; на время запроса запоминаются в нём.
+    """
+    if request is None:
+        return NOTHING
+    found = getattr(request, "_entitlements", None)
+    if found is None:
+        found = request._entitlements = for_user(getattr(request, "user", None))
+    return found
+
+
+def is_accessible(found, lesson_id, course_id):
+    courses, lessons = found
+    return lesson_id in lessons or course_id in courses
+
+
+def accessible(user, lessons):
+    """
+    id доступных пользователю уроков из lessons (объекты Lesson или пары (lesson_id, course_id)).
+    """
+    found = for_user(user)
+    pairs = ((lesson.pk, lesson.course_id) if hasattr(lesson, "pk") else lesson for lesson in lessons)
+    return {lesson_id for lesson_id, course_id in pairs if is_accessible(found, lesson_id, course_id)}
+
+
+# --- ведение Entitlement ---
+
+def key_for(payment):
+    return {"user_id": payment.user_id, "course_id": payment.course_id, "lesson_id": payment.lesson_id}
+
+
+def apply(key, count):
+    """
+    Прибавляет count платежей к паре (F()-выражением); пара без платежей удаляется.
+    """
+    rows = Entitlement.objects.filter(**key)
+    updated = rows.update(payments_count=F("payments_count") + count)
+    if not updated and count <= 0:
+        # строки уже нет (удалена каскадом вместе с курсом/уроком)
+        return
+    if not updated:
+        try:
+            with transaction.atomic():
+                Entitlement.objects.create(**key, payments_count=count)
+        except IntegrityError:
+            rows.update(payments_count=F("payments_count") + count)
+    if count < 0:
+        rows.filter(payments_count__lte=0).delete()
+
+
+def apply_many(changes):
+    """
+    changes — [(ключ, count)]; дельты по одному ключу сначала суммируются.
+    """
+    totals = {}
+    for key, count in changes:
+        frozen = tuple(sorted(key.items()))
+        totals[frozen] = totals.get(frozen, 0) + count
+    for frozen, count in totals.items():
+        if count:
+            apply(dict(frozen), count)
+    invalidate(*(dict(frozen)["user_id"] for frozen, count in totals.items() if count))
+
+
+def rebuild(batch_size=5000):
+    """
+    Пересобирает Entitlement из платежей (горячих и архивных) и сбрасывает доступы во всех воркерах (эпоха).
+    """
+    from . import archive
+
+    with transaction.atomic():
+        Entitlement.objects.all().delete()
+        # платежи закрытых месяцев — из архива: совпавшие ключи сливаются с горячими,
+        # оставшиеся (только в архиве) — после них
+        archived = archive.pair_counts()
+        groups = Payment.objects.order_by().values("user_id", "course_id", "lesson_id").annotate(n=Count("id"))
+        keys = ((g["user_id"], g["course_id"], g["lesson_id"], g["n"]) for g in groups.iterator(chunk_size=batch_size))
+        counts = (((user, course, lesson), n + archived.pop((user, course, lesson), 0)) for user, course, lesson, n in keys)
+        rows = (
+            Entitlement(user_id=user_id, course_id=course_id, lesson_id=lesson_id, payments_count=n)
+            for (user_id, course_id, lesson_id), n in chain(counts, archived.items())
+        )
+        while batch := list(islice(rows, batch_size)):
+            Entitlement.objects.bulk_create(batch)
+
+    def drop():
+        bump(f"{PREFIX}:epoch")
+        lru.clear()
+        catalog_cache.bump("courses", "lessons")
+
+    drop()
+    transaction.on_commit(drop)
+
+
+class IsAccessibleField(serializers.Field):
+    """
+    Доступен ли урок пользователю запроса (оплачен урок или его курс); аноним — false.
+    В edusite.fastpath — по колонкам fast_paths строки values().
+    """
+    fast_paths = ("id", "course_id")
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, lesson):
+        return is_accessible(for_request(self.context.get("request")), lesson.pk, lesson.course_id)
+
+    def fast_row_representation(self, row, request):
+        return is_accessible(for_request(request), row["id"], row["course_id"])
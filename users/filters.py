@@ -1,5 +1,6 @@
 import django_filters
-from .models import Payment
+from django.utils import timezone
+from .models import Payment, PaymentDailyRollup
 
 class PaymentFilter(django_filters.FilterSet):
     # фильтрация по связанным id
@@ -12,4 +13,25 @@ class PaymentFilter(django_filters.FilterSet):
 
     class Meta:
         model = Payment
-        fields = ["course", "lesson", "method", "paid_at__gte", "paid_at__lte"]
\ No newline at end of file
+        fields = ["course", "lesson", "method", "paid_at__gte", "paid_at__lte"]
+
+class PaymentRollupFilter(django_filters.FilterSet):
+    """
+    Те же параметры, что у PaymentFilter, но по дневной свёртке:
+    границы paid_at__gte/paid_at__lte округляются до дня (в TIME_ZONE проекта).
+    """
+    course = django_filters.NumberFilter(field_name="course_id", lookup_expr="exact")
+    lesson = django_filters.NumberFilter(field_name="lesson_id", lookup_expr="exact")
+    method = django_filters.CharFilter(field_name="method", lookup_expr="exact")
+    paid_at__gte = django_filters.IsoDateTimeFilter(field_name="day", method="filter_day_from")
+    paid_at__lte = django_filters.IsoDateTimeFilter(field_name="day", method="filter_day_to")
+
+    class Meta:
+        model = PaymentDailyRollup
+        fields = ["course", "lesson", "method", "paid_at__gte", "paid_at__lte"]
+
+    def filter_day_from(self, queryset, name, value):
+        return queryset.filter(day__gte=timezone.localdate(value))
+
+    def filter_day_to(self, queryset, name, value):
+        return queryset.filter(day__lte=timezone.localdate(value))
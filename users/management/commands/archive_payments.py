@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит закрытые месяцы платежей (старше --keep-months последних) в холодный архив "
+        "STORAGES['payment_archive']; свёртка, счётчики курсов и доступы не меняются. "
+        "Выгрузка /api/payments/export/ читает архивные месяцы сама."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months", type=int, default=settings.PAYMENT_HOT_MONTHS,
+            help="сколько последних месяцев оставить в горячей таблице",
+        )
+        parser.add_argument("--chunk-size", type=int, default=settings.PAYMENT_EXPORT_CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="только показать месяцы")
+
+    def handle(self, *args, **options):
+        months = archive.closed_months(options["keep_months"])
+        if not months:
+            self.stdout.write("Закрытых месяцев для переноса нет")
+            return
+        for month in months:
+            if options["dry_run"]:
+                self.stdout.write(f"{month:%Y-%m}")
+                continue
+            result = archive.archive_month(month, chunk_size=options["chunk_size"])
+            self.stdout.write(str(result) if result else f"{month:%Y-%m}: платежей нет")
+        self.stdout.write(self.style.SUCCESS("Готово"))
@@ -0,0 +1,245 @@
+import json
+import statistics
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from edusite.benchmark import (
+    catalog_cache_disabled, percentile, seed_catalog, temporary_database, throttling_disabled,
+)
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк API: прогоняет эндпоинты из postman_collection.json, все маршруты router "
+        "(список и детальный) и, по желанию, записанную смесь запросов (JSONL). "
+        "По каждому — p50/p90/p99, SQL-запросов на запрос, запросов/с; "
+        "--save сохраняет результат, --baseline сравнивает с сохранённым."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="замеров на эндпоинт")
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--collection", default=str(settings.BASE_DIR / "postman_collection.json"),
+            help="коллекция Postman (пустая строка — не использовать)",
+        )
+        parser.add_argument(
+            "--mix", help="JSONL с запросами: {\"path\": \"/api/...\", \"method\": \"GET\", \"body\": {...}}",
+        )
+        parser.add_argument(
+            "--writes", action="store_true",
+            help="прогонять и POST/PATCH/PUT/DELETE (каждый — в откатываемой транзакции)",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="мерить на временной БД с N платежами (и пропорционально курсами/уроками/пользователями)",
+        )
+        parser.add_argument("--with-cache", action="store_true", help="не отключать кэш ответов каталога")
+        parser.add_argument("--save", help="записать результат в JSON (будущий baseline)")
+        parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост латентности (0.2 = 20%%)")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        with nullcontext() if options["with_cache"] else catalog_cache_disabled(), throttling_disabled():
+            if options["seed"]:
+                with temporary_database():
+                    rows = options["seed"]
+                    seed_catalog(
+                        courses=max(1, rows // 1000), lessons=max(1, rows // 20),
+                        users=max(1, rows // 10), payments=rows,
+                    )
+                    results = self.run(options)
+            else:
+                # тестовый клиент ходит с Host: testserver
+                with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                    results = self.run(options)
+
+        if options["save"]:
+            with open(options["save"], "w", encoding="utf-8") as fh:
+                json.dump(results, fh, ensure_ascii=False, indent=2)
+        if options["baseline"]:
+            regressions = self.compare(results, self.load(options["baseline"]), options["tolerance"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"Регрессии: {len(regressions)}")
+
+    # --- какие запросы ---
+
+    def endpoints(self, options):
+        endpoints = []
+        if options["collection"]:
+            endpoints += self.from_collection(options["collection"])
+        endpoints += self.from_urls()
+        if options["mix"]:
+            endpoints += self.from_mix(options["mix"])
+        if not options["writes"]:
+            endpoints = [e for e in endpoints if e["method"] in SAFE_METHODS]
+        seen, unique = set(), []
+        for endpoint in endpoints:
+            key = (endpoint["method"], endpoint["path"])
+            if key not in seen:
+                seen.add(key)
+                unique.append(endpoint)
+        return unique
+
+    def from_collection(self, path):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                collection = json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать {path}: {exc}")
+
+        def walk(items):
+            for item in items:
+                if "item" in item:
+                    yield from walk(item["item"])
+                    continue
+                request = item["request"]
+                url = request["url"] if isinstance(request["url"], str) else request["url"].get("raw", "")
+                parts = urlsplit(url)
+                body = (request.get("body") or {}).get("raw")
+                yield {
+                    "method": request["method"].upper(),
+                    "path": parts.path + (f"?{parts.query}" if parts.query else ""),
+                    "body": json.loads(body) if body else None,
+                }
+        return list(walk(collection.get("item", [])))
+
+    def from_urls(self):
+        """
+        Список и детальный для каждого маршрута router и уроков (edusite/urls.py, lms/urls.py).
+        Детальный — по первому объекту модели, если он есть.
+        """
+        from edusite.urls import router
+        from lms.urls import urlpatterns as lms_patterns
+
+        endpoints = []
+        for prefix, viewset, _basename in router.registry:
+            model = viewset.serializer_class.Meta.model
+            endpoints.append({"method": "GET", "path": f"/api/{prefix}/", "body": None})
+            pk = model._default_manager.order_by("pk").values_list("pk", flat=True).first()
+            if pk is not None:
+                endpoints.append({"method": "GET", "path": f"/api/{prefix}/{pk}/", "body": None})
+        for pattern in lms_patterns:
+            route = str(pattern.pattern)
+            if "<int:pk>" in route:
+                model = pattern.callback.view_class.serializer_class.Meta.model
+                pk = model._default_manager.order_by("pk").values_list("pk", flat=True).first()
+                if pk is None:
+                    continue
+                route = route.replace("<int:pk>", str(pk))
+            endpoints.append({"method": "GET", "path": f"/api/{route}", "body": None})
+        return endpoints
+
+    def from_mix(self, path):
+        endpoints = []
+        try:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    # строки без path (например, описания задач) пропускаем
+                    if isinstance(record, dict) and str(record.get("path", "")).startswith("/"):
+                        endpoints.append({
+                            "method": str(record.get("method", "GET")).upper(),
+                            "path": record["path"],
+                            "body": record.get("body"),
+                        })
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать {path}: {exc}")
+        return endpoints
+
+    # --- замеры ---
+
+    def run(self, options):
+        client = Client()
+        results = {}
+        for endpoint in self.endpoints(options):
+            for _ in range(options["warmup"]):
+                self.call(client, endpoint)
+            timings, queries, statuses = [], [], set()
+            for _ in range(options["requests"]):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    status = self.call(client, endpoint)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries.append(len(captured))
+                statuses.add(status)
+            key = f"{endpoint['method']} {endpoint['path']}"
+            results[key] = {
+                "p50": round(percentile(timings, 50), 3),
+                "p90": round(percentile(timings, 90), 3),
+                "p99": round(percentile(timings, 99), 3),
+                "queries": round(statistics.mean(queries), 1),
+                "rps": round(len(timings) / (sum(timings) / 1000), 1),
+                "status": sorted(statuses),
+            }
+            row = results[key]
+            self.stdout.write(
+                f"{key:<45} p50 {row['p50']:7.2f}  p90 {row['p90']:7.2f}  p99 {row['p99']:7.2f} мс  "
+                f"SQL {row['queries']:5}  {row['rps']:8.1f} req/s  {','.join(map(str, row['status']))}"
+            )
+        return results
+
+    def call(self, client, endpoint):
+        method = endpoint["method"].lower()
+        kwargs = {"HTTP_ACCEPT": "application/json"}
+        if endpoint["body"] is not None:
+            kwargs.update(data=json.dumps(endpoint["body"]), content_type="application/json")
+        if endpoint["method"] in SAFE_METHODS:
+            return getattr(client, method)(endpoint["path"], **kwargs).status_code
+        # запись меряем, но не оставляем: откат после ответа
+        try:
+            with transaction.atomic():
+                status = getattr(client, method)(endpoint["path"], **kwargs).status_code
+                raise Rollback
+        except Rollback:
+            return status
+
+    # --- сравнение с baseline ---
+
+    def load(self, path):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать {path}: {exc}")
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        self.stdout.write("")
+        self.stdout.write(f"Сравнение с baseline (допуск {tolerance:.0%}):")
+        for key, row in results.items():
+            base = baseline.get(key)
+            if base is None:
+                self.stdout.write(f"{key:<45} нет в baseline")
+                continue
+            problems = [
+                f"{metric} {base[metric]:.2f} -> {row[metric]:.2f} мс"
+                for metric in ("p50", "p99")
+                if row[metric] > base[metric] * (1 + tolerance)
+            ]
+            if row["queries"] > base["queries"]:
+                problems.append(f"SQL {base['queries']} -> {row['queries']}")
+            if problems:
+                regressions.append(key)
+                self.stdout.write(self.style.ERROR(f"{key:<45} РЕГРЕССИЯ: {'; '.join(problems)}"))
+            else:
+                change = (row["p50"] / base["p50"] - 1) if base["p50"] else 0
+                self.stdout.write(self.style.SUCCESS(f"{key:<45} ok (p50 {change:+.0%})"))
+        return regressions
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+
+from edusite.benchmark import (
+    catalog_cache_disabled, percentile, seed_payments, temporary_database, throttling_disabled,
+)
+from lms.models import Lesson
+from users.models import Payment
+
+# синхронный эндпоинт (WSGI) -> его async-двойник (ASGI, edusite.async_api)
+DEFAULT_PATHS = [
+    "/api/courses/",
+    "/api/lessons/",
+    "/api/payments/",
+    "/api/payments/?paginate=keyset&ordering=-paid_at",
+    "/api/payments/?method=cash&ordering=amount",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон чтения: синхронные эндпоинты через WSGI-обработчик в пуле потоков "
+        "против /api/async/... через ASGI-обработчик в одном event loop. "
+        "Печатает запросы/с, p50 и p99 для каждой конкурентности. "
+        "Обработчики вызываются в процессе (тестовые клиенты Django, без сети), "
+        "так что сравнивается именно стек Django/DRF + БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20_000, help="сколько платежей сгенерировать")
+        parser.add_argument("--requests", type=int, default=300, help="запросов на каждый замер")
+        parser.add_argument("--concurrency", default="1,8,32", help="уровни конкурентности через запятую")
+        parser.add_argument("--path", action="append", dest="paths", help="синхронный путь (можно несколько)")
+        parser.add_argument(
+            "--with-cache", action="store_true",
+            help="не отключать кэш ответов каталога (у async-вьюх его нет, сравнение будет неравным)",
+        )
+
+    def handle(self, *args, **options):
+        levels = [int(c) for c in options["concurrency"].split(",") if c]
+        cache = nullcontext() if options["with_cache"] else catalog_cache_disabled()
+        with cache, throttling_disabled(), temporary_database():
+            seed_payments(options["rows"], users=500, courses=50)
+            course_ids = list(Payment.objects.values_list("course_id", flat=True).distinct())
+            Lesson.objects.bulk_create([
+                Lesson(course_id=course_ids[i % len(course_ids)], title=f"Урок {i}") for i in range(500)
+            ])
+            for path in options["paths"] or DEFAULT_PATHS:
+                async_path = path.replace("/api/", "/api/async/", 1)
+                self.stdout.write(path)
+                for concurrency in levels:
+                    wsgi = self.run_wsgi(path, options["requests"], concurrency)
+                    asgi = self.run_asgi(async_path, options["requests"], concurrency)
+                    self.stdout.write(f"  c={concurrency:<3} WSGI {self.format(wsgi)}")
+                    self.stdout.write(f"  {'':<5} ASGI {self.format(asgi)}")
+
+    def format(self, result):
+        return (
+            f"{result['rps']:8.1f} req/s  p50 {result['p50']:7.1f} мс  p99 {result['p99']:7.1f} мс"
+            + (f"  ошибок: {result['errors']}" if result["errors"] else "")
+        )
+
+    def summarize(self, timings, errors, elapsed):
+        return {
+            "rps": len(timings) / elapsed,
+            "p50": percentile(timings, 50),
+            "p99": percentile(timings, 99),
+            "errors": errors,
+        }
+
+    # --- WSGI: поток на одновременный запрос, как у gunicorn --threads ---
+
+    def run_wsgi(self, path, total, concurrency):
+        def worker(count):
+            client, timings, errors = Client(), [], 0
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = client.get(path, HTTP_ACCEPT="application/json")
+                    timings.append((time.perf_counter() - started) * 1000)
+                    errors += response.status_code != 200
+            finally:
+                connections.close_all()
+            return timings, errors
+
+        shares = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(worker, shares))
+        elapsed = time.perf_counter() - started
+        return self.summarize([t for r in results for t in r[0]], sum(r[1] for r in results), elapsed)
+
+    # --- ASGI: одновременные запросы — задачи одного event loop ---
+
+    def run_asgi(self, path, total, concurrency):
+        async def main():
+            client, timings, errors = AsyncClient(), [], 0
+            queue = iter(range(total))
+
+            async def worker():
+                nonlocal errors
+                for _ in queue:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    errors += response.status_code != 200
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return timings, errors, time.perf_counter() - started
+
+        timings, errors, elapsed = asyncio.run(main())
+        return self.summarize(timings, errors, elapsed)
@@ -0,0 +1,55 @@
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from edusite.benchmark import seed_payments, temporary_database, throttling_disabled
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет потоковую выгрузку /api/payments/export/: строк в секунду и пиковую память "
+        "(во временной БД)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--formats", default="csv,ndjson")
+
+    def handle(self, *args, **options):
+        # сотни запросов от одного клиента — без лимитов edusite.throttling
+        with throttling_disabled(), temporary_database():
+            self.stdout.write(f"Наполняем {options['rows']} платежей...")
+            seed_payments(options["rows"])
+            for export_format in options["formats"].split(","):
+                self.run(export_format, options["rows"])
+
+    def consume(self, export_format):
+        response = APIClient().get(f"/api/payments/export/?as={export_format}")
+        assert response.status_code == 200, response.status_code
+        size = lines = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+        return size, lines
+
+    def run(self, export_format, rows):
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        size, lines = self.consume(export_format)
+        elapsed = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # отдельный прогон под tracemalloc: пик Python-аллокаций во время выгрузки
+        tracemalloc.start()
+        self.consume(export_format)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f"{export_format}: {rows} строк за {elapsed:.1f} с ({rows / elapsed:,.0f} строк/с), "
+            f"{size / 2**20:.1f} МБ, строк в выгрузке {lines}; "
+            f"пик Python-памяти {peak / 2**20:.1f} МБ, рост peak RSS {(rss_after - rss_before) / 1024:.1f} МБ"
+        )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from edusite.benchmark import measure, seed_payments, temporary_database, throttling_disabled
+from edusite.pagination import KeysetPagination
+from users.views import PaymentViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает PageNumberPagination и keyset-пагинацию /api/payments/ "
+        "на глубоких страницах (во временной БД)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--pages", default="1,100,1000,10000,50000")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--ordering", default="", help="например -amount")
+
+    def handle(self, *args, **options):
+        pages = [int(p) for p in options["pages"].split(",")]
+        # сотни запросов от одного клиента — без лимитов edusite.throttling
+        with throttling_disabled(), temporary_database():
+            self.stdout.write(f"Наполняем {options['rows']} платежей...")
+            seed_payments(options["rows"])
+            self.run(pages, options)
+
+    def run(self, pages, options):
+        client = APIClient()
+        ordering = options["ordering"]
+        query = f"&ordering={ordering}" if ordering else ""
+
+        # курсор на начало страницы N строим заранее (вне замера) — в жизни клиент получает его из next
+        # порядок — как у вьюхи: у Payment нет Meta.ordering, без ?ordering= — (-paid_at, -id)
+        paginator = KeysetPagination()
+        queryset = PaymentViewSet.queryset.all()
+        if ordering:
+            queryset = queryset.order_by(ordering)
+        paginator.ordering = paginator.get_ordering(queryset)
+        ordered = queryset.order_by(*paginator.ordering)
+
+        self.stdout.write(f"{'page':>8} {'page-number, ms':>18} {'keyset, ms':>12}")
+        for page in pages:
+            offset = (page - 1) * paginator.page_size
+            if offset >= options["rows"]:
+                continue
+            page_url = f"/api/payments/?page={page}{query}"
+            if page == 1:
+                keyset_url = f"/api/payments/?paginate=keyset{query}"
+            else:
+                cursor = paginator.encode_cursor(ordered[offset - 1])
+                keyset_url = f"/api/payments/?cursor={cursor}{query}"
+
+            for url in (page_url, keyset_url):
+                assert client.get(url).status_code == 200, url
+            by_page = measure(lambda: client.get(page_url), options["repeat"])
+            by_keyset = measure(lambda: client.get(keyset_url), options["repeat"])
+            self.stdout.write(f"{page:>8} {by_page['median']:>18.1f} {by_keyset['median']:>12.1f}")
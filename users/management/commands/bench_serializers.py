@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from edusite import fastpath
+from edusite.benchmark import measure, seed_payments, temporary_database
+from lms.models import Lesson
+from lms.serializers import LessonSerializer
+from users.models import Payment
+from users.serializers import PaymentSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Микробенчмарк сериализации списков: ModelSerializer против edusite.fastpath, "
+        "мс на 1000 строк (данные уже загружены, время БД не входит)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            seed_payments(options["rows"], users=100, courses=10)
+            course_ids = list(Payment.objects.values_list("course_id", flat=True).distinct())
+            Lesson.objects.bulk_create([
+                Lesson(course_id=course_ids[i % len(course_ids)], title=f"Урок {i}", preview=f"lessons/{i}.png")
+                for i in range(options["rows"])
+            ])
+            request = APIRequestFactory().get("/")
+            for serializer_class, queryset in [
+                (PaymentSerializer, Payment.objects.select_related("user", "course", "lesson")),
+                (LessonSerializer, Lesson.objects.all()),
+            ]:
+                self.run(serializer_class, queryset, request, options)
+
+    def run(self, serializer_class, queryset, request, options):
+        instances = list(queryset)
+        rows = list(queryset.values(*fastpath.values_paths(serializer_class)))
+        context = {"request": request}
+        slow = measure(lambda: serializer_class(instances, many=True, context=context).data, options["repeat"])
+        fast = measure(lambda: fastpath.represent(rows, serializer_class, request), options["repeat"])
+        per_1k = 1000 / len(rows)
+        self.stdout.write(
+            f"{serializer_class.__name__}: ModelSerializer {slow['median'] * per_1k:.1f} мс/1k строк, "
+            f"fastpath {fast['median'] * per_1k:.1f} мс/1k строк "
+            f"(x{slow['median'] / fast['median']:.1f})"
+        )
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from edusite import startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Холодный старт воркера: импорт edusite.wsgi.application и первый запрос к /api/ "
+        "в свежем интерпретаторе для каждого профиля (EDUSITE_PROFILE), "
+        "плюс разбивка python -X importtime по пакетам верхнего уровня. "
+        "Профиль api сравнивается с бюджетом STARTUP_BUDGET_SECONDS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile", action="append", dest="profiles", choices=["full", "api"],
+            help="профиль (можно несколько; по умолчанию full и api)",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="запусков на профиль (берётся лучший)")
+        parser.add_argument("--top", type=int, default=15, help="сколько пакетов показать в разбивке")
+
+    def handle(self, *args, **options):
+        for profile in options["profiles"] or ["full", "api"]:
+            result = startup.measure(profile, repeat=options["repeat"])
+            self.stdout.write(
+                f"{profile:<5} импорт {result['import'] * 1000:7.1f} мс  первый запрос "
+                f"{result['first_request'] * 1000:6.1f} мс  всего {result['total'] * 1000:7.1f} мс  "
+                f"модулей {len(result['modules'])}"
+            )
+            if profile == "api":
+                budget = settings.STARTUP_BUDGET_SECONDS
+                verdict = "в пределах" if result["total"] <= budget else "ПРЕВЫШЕН"
+                self.stdout.write(f"      бюджет {budget * 1000:.0f} мс: {verdict}")
+            for package, (own, count) in list(startup.importtime(profile).items())[:options["top"]]:
+                self.stdout.write(f"      {package:<25} {own / 1000:7.1f} мс  {count:4} модулей")
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.partitions import ensure_partitions, is_partitioned, months_between, next_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт помесячные секции платежей на PostgreSQL: текущий месяц и --ahead вперёд "
+        "(запускать по cron; вне PostgreSQL таблица не секционирована — ничего не делает)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=settings.PAYMENT_PARTITIONS_AHEAD, help="месяцев вперёд")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write("Таблица платежей не секционирована (не PostgreSQL) — пропуск")
+            return
+        last = timezone.localdate().replace(day=1)
+        for _ in range(options["ahead"]):
+            last = next_month(last)
+        for name in ensure_partitions(months_between(timezone.localdate(), last)):
+            self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS("Готово"))
@@ -0,0 +1,142 @@
+import json
+import re
+from itertools import product
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from edusite.benchmark import seed_payments, temporary_database
+from lms.models import Course, Lesson
+from users.models import Payment
+from users.views import PaymentViewSet
+
+# PostgreSQL: полный проход таблицы или её секции. На секционированной таблице (users.partitions)
+# план называет секции — «Seq Scan on users_payment_y2024m03 users_payment_1»; это тоже полный скан:
+# отсечение оставило месяц, но индекс не помог и месяц читается целиком
+PG_FULL_SCAN = re.compile(r"Seq Scan on users_payment(_y\d{4}m\d{2}|_default)?\b")
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет формы запросов /api/payments/ (фильтры PaymentFilter + ordering) "
+        "через PaymentViewSet и печатает EXPLAIN по каждой: полный скан, сортировка, сколько строк подходит. "
+        "Фактически прочитанные строки — в плане с --analyze (PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--shapes",
+            help="JSONL с записанными запросами: {\"path\": \"/api/payments/?...\"} или {\"query\": \"...\"}. "
+                 "Без файла — все комбинации одного фильтра и сортировки.",
+        )
+        parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (PostgreSQL)")
+        parser.add_argument("--json", action="store_true", help="вывод в JSON")
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="объяснять на временной БД с N сгенерированными платежами вместо рабочей",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            with temporary_database():
+                seed_payments(options["seed"])
+                connection.cursor().execute("ANALYZE")
+                return self.report(options)
+        return self.report(options)
+
+    def report(self, options):
+        shapes = self.load_shapes(options["shapes"]) if options["shapes"] else self.default_shapes()
+        report = [self.explain(query, options["analyze"]) for query in shapes]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        for row in report:
+            flags = []
+            if row["full_scan"]:
+                flags.append(self.style.WARNING("FULL SCAN"))
+            if row["sort"]:
+                flags.append(self.style.WARNING("SORT"))
+            self.stdout.write(f"?{row['query'] or '(без параметров)'}  rows={row['rows_matched']}  {' '.join(flags)}")
+            for line in row["plan"].splitlines():
+                self.stdout.write(f"    {line}")
+
+    # --- формы запросов ---
+
+    def default_shapes(self):
+        course = Course.objects.values_list("id", flat=True).first() or 1
+        lesson = Lesson.objects.values_list("id", flat=True).first() or 1
+        filters = [
+            {},
+            {"course": course},
+            {"lesson": lesson},
+            {"method": Payment.Method.CASH},
+            {"paid_at__gte": "2025-01-01T00:00:00Z", "paid_at__lte": "2025-02-01T00:00:00Z"},
+        ]
+        orderings = [None] + [
+            f"{sign}{field}" for field, sign in product(PaymentViewSet.ordering_fields, ("", "-"))
+        ]
+        shapes = []
+        for params, ordering in product(filters, orderings):
+            params = dict(params)
+            if ordering:
+                params["ordering"] = ordering
+            shapes.append(urlencode(params))
+        return shapes
+
+    def load_shapes(self, path):
+        shapes = []
+        try:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    if "query" in record:
+                        shapes.append(record["query"].lstrip("?"))
+                    elif "path" in record and urlsplit(record["path"]).path.rstrip("/").endswith("payments"):
+                        shapes.append(urlsplit(record["path"]).query)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать {path}: {exc}")
+        # одинаковые формы (те же параметры, другие значения) объясняем один раз
+        seen, unique = set(), []
+        for query in shapes:
+            key = tuple(sorted(k for k, _ in parse_qsl(query)))
+            if key not in seen:
+                seen.add(key)
+                unique.append(query)
+        return unique
+
+    # --- EXPLAIN ---
+
+    def build_queryset(self, query):
+        request = Request(APIRequestFactory().get("/api/payments/", dict(parse_qsl(query))))
+        view = PaymentViewSet(request=request, action="list", format_kwarg=None, args=(), kwargs={})
+        return view.filter_queryset(view.get_queryset())
+
+    def explain(self, query, analyze):
+        queryset = self.build_queryset(query)
+        page = queryset[:api_settings.PAGE_SIZE]
+        plan = page.explain(analyze=True) if analyze else page.explain()
+
+        if connection.vendor == "postgresql":
+            full_scan = PG_FULL_SCAN.search(plan) is not None
+            sort = "Sort" in plan and "Sort Key" in plan
+        else:
+            # SQLite: «SCAN users_payment» без индекса — полный проход, «TEMP B-TREE» — сортировка
+            full_scan = any(
+                "SCAN users_payment" in line and "INDEX" not in line for line in plan.splitlines()
+            )
+            sort = "USE TEMP B-TREE FOR ORDER BY" in plan
+        return {
+            "query": query,
+            "plan": plan,
+            "full_scan": full_scan,
+            "sort": sort,
+            "rows_matched": queryset.count(),
+        }
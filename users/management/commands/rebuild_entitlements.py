@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.entitlements import rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересобирает Entitlement из платежей (после bulk-загрузок, которые не шлют сигналы)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="строк за один INSERT")
+
+    def handle(self, *args, **options):
+        rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Готово"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересобирает PaymentDailyRollup из платежей (после bulk-загрузок, которые не шлют сигналы)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100_000, help="платежей (по id) за проход")
+
+    def handle(self, *args, **options):
+        rebuild(batch_size=options["batch_size"], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS("Готово"))
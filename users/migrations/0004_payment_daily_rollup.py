@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0001_initial'),
+        ('users', '0003_payment_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день')),
+                ('method', models.CharField(choices=[('cash', 'Наличные'), ('transfer', 'Перевод на счёт')], max_length=20, verbose_name='способ оплаты')),
+                ('payments_count', models.PositiveIntegerField(default=0, verbose_name='число платежей')),
+                ('amount_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='сумма')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to='lms.course', verbose_name='курс')),
+                ('lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to='lms.lesson', verbose_name='урок')),
+            ],
+            options={
+                'verbose_name': 'выручка за день',
+                'verbose_name_plural': 'выручка по дням',
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['course', 'day'], name='payment_rollup_course_idx'), models.Index(fields=['lesson', 'day'], name='payment_rollup_lesson_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('lesson__isnull', True)), fields=('day', 'course', 'method'), name='payment_rollup_course_key'), models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('day', 'lesson', 'method'), name='payment_rollup_lesson_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_entitlements(apps, schema_editor):
+    # строка на пару (пользователь, курс/урок) со всеми её платежами; дальше — сигналы (users.entitlements)
+    Payment = apps.get_model('users', 'Payment')
+    Entitlement = apps.get_model('users', 'Entitlement')
+    groups = Payment.objects.order_by().values('user_id', 'course_id', 'lesson_id').annotate(n=Count('id'))
+    Entitlement.objects.bulk_create(
+        (Entitlement(user_id=g['user_id'], course_id=g['course_id'], lesson_id=g['lesson_id'], payments_count=g['n'])
+         for g in groups.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0003_course_counters'),
+        ('users', '0005_user_avatar_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Entitlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payments_count', models.PositiveIntegerField(default=0, verbose_name='число платежей')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to='lms.course', verbose_name='курс')),
+                ('lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to='lms.lesson', verbose_name='урок')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'доступ',
+                'verbose_name_plural': 'доступы',
+                'indexes': [models.Index(fields=['user', 'course', 'lesson'], name='entitlement_user_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('lesson__isnull', True)), fields=('user', 'course'), name='entitlement_course_key'), models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('user', 'lesson'), name='entitlement_lesson_key')],
+            },
+        ),
+        migrations.RunPython(backfill_entitlements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_entitlement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True, verbose_name='месяц')),
+                ('path', models.CharField(max_length=255, verbose_name='файл в хранилище')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='платежей')),
+                ('amount_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='сумма')),
+                ('course_totals', models.JSONField(blank=True, default=dict, verbose_name='итоги по курсам')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='перенесён')),
+            ],
+            options={
+                'verbose_name': 'архив платежей за месяц',
+                'verbose_name_plural': 'архив платежей',
+                'ordering': ['month'],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='payment',
+            options={'verbose_name': 'платёж', 'verbose_name_plural': 'платежи'},
+        ),
+    ]
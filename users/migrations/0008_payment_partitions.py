@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from users.partitions import months_between, next_month, partition_table_sql
+
+
+def partition_payments(apps, schema_editor):
+    """
+    PostgreSQL: users_payment -> секционированная по месяцам paid_at (users.partitions).
+    Данные копируются в новую таблицу целиком — на большой таблице это окно обслуживания.
+    Другие СУБД — без изменений.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Payment = apps.get_model('users', 'Payment')
+    bounds = Payment.objects.aggregate(first=Min('paid_at'), last=Max('paid_at'))
+    today = timezone.localdate()
+    first = timezone.localdate(bounds['first']) if bounds['first'] else today
+    last = max(timezone.localdate(bounds['last']) if bounds['last'] else today, today).replace(day=1)
+    for _ in range(settings.PAYMENT_PARTITIONS_AHEAD):
+        last = next_month(last)
+    for sql in partition_table_sql(Payment, months_between(first, last), schema_editor.quote_name):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # DDL и перенос строк — одной транзакцией (PostgreSQL)
+    atomic = True
+
+    dependencies = [
+        ('users', '0007_payment_archive'),
+    ]
+
+    operations = [
+        # обратно — без изменений: секционированная таблица модели не мешает
+        migrations.RunPython(partition_payments, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 
@@ -11,6 +11,8 @@ class User(AbstractUser):
     phone = models.CharField(max_length=30, blank=True)
     city = models.CharField(max_length=100, blank=True)
     avatar = models.ImageField(upload_to="avatars/", blank=True, null=True)
+    # уменьшенные копии avatar (делает воркер thumbnails)
+    avatar_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
@@ -59,10 +61,159 @@ class Payment(models.Model):
     )
 
     class Meta:
-        ordering = ["-paid_at"]
+        # без Meta.ordering: COUNT, агрегаты и выборки по id не сортируют таблицу;
+        # порядок задают вьюхи (-paid_at, -id — индекс payment_paid_at_idx).
+        # На PostgreSQL таблица секционирована по месяцам paid_at (users.partitions)
         verbose_name = "платёж"
         verbose_name_plural = "платежи"
+        # под фильтры PaymentFilter + ordering_fields PaymentViewSet (и keyset с тай-брейкером id);
+        # проверка планов: python manage.py explain_payment_queries
+        indexes = [
+            models.Index(fields=["-paid_at", "-id"], name="payment_paid_at_idx"),
+            models.Index(fields=["amount", "id"], name="payment_amount_idx"),
+            models.Index(fields=["user", "-paid_at"], name="payment_user_paid_at_idx"),
+            models.Index(fields=["course", "-paid_at"], name="payment_course_paid_at_idx"),
+            models.Index(fields=["lesson", "-paid_at"], name="payment_lesson_paid_at_idx"),
+            models.Index(fields=["method", "-paid_at"], name="payment_method_paid_at_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # платёж, свёртка и счётчики курса (сигналы users.signals) — одной транзакцией
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         target = self.course or self.lesson
-        return f"Платёж {self.id} от {self.user} за {target} на {self.amount} ({self.get_method_display()})"
\ No newline at end of file
+        return f"Платёж {self.id} от {self.user} за {target} на {self.amount} ({self.get_method_display()})"
+
+class PaymentDailyRollup(models.Model):
+    """
+    Предагрегированная выручка: сумма и число платежей за день
+    в разрезе курса/урока и способа оплаты. Ведётся сигналами Payment,
+    пересобирается командой rebuild_payment_rollups.
+    """
+    day = models.DateField(verbose_name="день")
+    course = models.ForeignKey(
+        "lms.Course",
+        on_delete=models.CASCADE,
+        related_name="payment_rollups",
+        null=True,
+        blank=True,
+        verbose_name="курс",
+    )
+    lesson = models.ForeignKey(
+        "lms.Lesson",
+        on_delete=models.CASCADE,
+        related_name="payment_rollups",
+        null=True,
+        blank=True,
+        verbose_name="урок",
+    )
+    method = models.CharField(max_length=20, choices=Payment.Method.choices, verbose_name="способ оплаты")
+    payments_count = models.PositiveIntegerField(default=0, verbose_name="число платежей")
+    amount_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="сумма")
+
+    class Meta:
+        ordering = ["day"]
+        verbose_name = "выручка за день"
+        verbose_name_plural = "выручка по дням"
+        # у платежа заполнено ровно одно из course/lesson — ключ уникален в каждом из двух случаев
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "course", "method"],
+                condition=models.Q(lesson__isnull=True),
+                name="payment_rollup_course_key",
+            ),
+            models.UniqueConstraint(
+                fields=["day", "lesson", "method"],
+                condition=models.Q(course__isnull=True),
+                name="payment_rollup_lesson_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["course", "day"], name="payment_rollup_course_idx"),
+            models.Index(fields=["lesson", "day"], name="payment_rollup_lesson_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.course or self.lesson} {self.method}: {self.amount_total} ({self.payments_count})"
+
+
+class Entitlement(models.Model):
+    """
+    Доступ пользователя к курсу или уроку: строка на каждую оплаченную пару
+    (user, course) или (user, lesson); payments_count — сколько платежей её дают
+    (удаление одного из двух платежей доступ не отнимает).
+    Ведётся сигналами Payment (users.entitlements), пересобирается командой rebuild_entitlements.
+    """
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.CASCADE,
+        related_name="entitlements",
+        verbose_name="пользователь",
+    )
+    course = models.ForeignKey(
+        "lms.Course",
+        on_delete=models.CASCADE,
+        related_name="entitlements",
+        null=True,
+        blank=True,
+        verbose_name="курс",
+    )
+    lesson = models.ForeignKey(
+        "lms.Lesson",
+        on_delete=models.CASCADE,
+        related_name="entitlements",
+        null=True,
+        blank=True,
+        verbose_name="урок",
+    )
+    payments_count = models.PositiveIntegerField(default=0, verbose_name="число платежей")
+
+    class Meta:
+        verbose_name = "доступ"
+        verbose_name_plural = "доступы"
+        # как у PaymentDailyRollup: ключ уникален отдельно для курсов и для уроков;
+        # индексы начинаются с user — все доступы пользователя читаются одним запросом
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "course"],
+                condition=models.Q(lesson__isnull=True),
+                name="entitlement_course_key",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "lesson"],
+                condition=models.Q(course__isnull=True),
+                name="entitlement_lesson_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "course", "lesson"], name="entitlement_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.course or self.lesson} ({self.payments_count})"
+
+
+class PaymentArchive(models.Model):
+    """
+    Закрытый месяц платежей, перенесённый из горячей таблицы в холодное хранилище
+    (STORAGES["payment_archive"], gzip NDJSON в колонках выгрузки). Свёртка, счётчики курсов
+    и доступы архивные платежи учитывают как раньше; course_totals — для сверки счётчиков.
+    Читается выгрузкой /api/payments/export/ (users.archive).
+    """
+    month = models.DateField(unique=True, verbose_name="месяц")
+    path = models.CharField(max_length=255, verbose_name="файл в хранилище")
+    rows = models.PositiveIntegerField(default=0, verbose_name="платежей")
+    amount_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="сумма")
+    # {course_id: [платежей, "сумма"]} — только платежи за курс, как в счётчиках Course
+    course_totals = models.JSONField(default=dict, blank=True, verbose_name="итоги по курсам")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="перенесён")
+
+    class Meta:
+        ordering = ["month"]
+        verbose_name = "архив платежей за месяц"
+        verbose_name_plural = "архив платежей"
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.rows} платежей на {self.amount_total}"
@@ -0,0 +1,177 @@
+"""
+Помесячное секционирование платежей по paid_at.
+
+- PostgreSQL: users_payment — секционированная таблица (PARTITION BY RANGE (paid_at),
+  миграция 0008), секции users_payment_yYYYYmMM плюс DEFAULT для строк вне созданных месяцев.
+  Первичный ключ — (id, paid_at): так требует PostgreSQL, id по-прежнему из одной последовательности.
+  Отсечение секций делает сам планировщик по условиям на paid_at — фильтры PaymentFilter
+  (paid_at__gte/__lte) и курсор keyset-пагинации дают их напрямую, без выражений над колонкой.
+  Секции на месяцы вперёд: python manage.py ensure_payment_partitions (по cron).
+- Другие СУБД (SQLite в разработке и тестах): одна таблица; рост ограничивает архив
+  закрытых месяцев (users.archive), отсечение — на уровне месяцев архива.
+"""
+from datetime import date, datetime, time
+
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+from .models import Payment
+
+
+def month_start(value):
+    """
+    Первый день месяца для date/datetime (datetime — в TIME_ZONE проекта).
+    """
+    if isinstance(value, datetime):
+        value = timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def previous_month(month):
+    return date(month.year - (month.month == 1), (month.month - 2) % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """
+    [начало, начало следующего) месяца как aware datetime.
+    """
+    tz = timezone.get_current_timezone()
+    return (
+        datetime.combine(month, time.min, tzinfo=tz),
+        datetime.combine(next_month(month), time.min, tzinfo=tz),
+    )
+
+
+def months_between(first, last):
+    """
+    Месяцы от first до last включительно (date первого числа).
+    """
+    month, last = month_start(first), month_start(last)
+    result = []
+    while month <= last:
+        result.append(month)
+        month = next_month(month)
+    return result
+
+
+def touched_months(months, gte=None, lte=None):
+    """
+    Из months — те, что пересекаются с [gte, lte] (границы — datetime или None).
+    """
+    low = month_start(gte) if gte is not None else None
+    high = month_start(lte) if lte is not None else None
+    return [m for m in months if (low is None or m >= low) and (high is None or m <= high)]
+
+
+def partition_name(month, table=None):
+    return f"{table or Payment._meta.db_table}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(connection=default_connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [Payment._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition_sql(month, quote_name, table=None):
+    table = table or Payment._meta.db_table
+    start, end = month_bounds(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {quote_name(partition_name(month, table))} "
+        f"PARTITION OF {quote_name(table)} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def partition_table_sql(model, months, quote_name):
+    """
+    SQL перевода таблицы model в секционированную (миграция 0008), по порядку:
+    старая таблица -> _legacy, новая с PARTITION BY RANGE (paid_at) и ключом (id, paid_at),
+    секции DEFAULT и months, перенос строк и последовательности id, индексы Meta.indexes
+    и индексы/внешние ключи ForeignKey — на родительской таблице (секции их наследуют).
+    Только публичный _meta: без приватных помощников schema_editor.
+    """
+    table = model._meta.db_table
+    legacy = f"{table}_legacy"
+    q = quote_name
+    statements = [
+        f"ALTER TABLE {q(table)} RENAME TO {q(legacy)}",
+        f"CREATE TABLE {q(table)} (LIKE {q(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS) "
+        f"PARTITION BY RANGE (paid_at)",
+        # ключ секционированной таблицы обязан включать колонку секционирования
+        f"ALTER TABLE {q(table)} ADD PRIMARY KEY (id, paid_at)",
+        f"CREATE TABLE {q(table + '_default')} PARTITION OF {q(table)} DEFAULT",
+        *(create_partition_sql(month, q, table) for month in months),
+        f"INSERT INTO {q(table)} SELECT * FROM {q(legacy)}",
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"COALESCE((SELECT MAX(id) FROM {q(table)}), 0) + 1, false)",
+        # вместе со старой таблицей уходят и её индексы — имена освобождаются
+        f"DROP TABLE {q(legacy)}",
+    ]
+    for index in model._meta.indexes:
+        columns = ", ".join(
+            q(model._meta.get_field(name.lstrip("-")).column) + (" DESC" if name.startswith("-") else "")
+            for name in index.fields
+        )
+        statements.append(f"CREATE INDEX {q(index.name)} ON {q(table)} ({columns})")
+    for field in model._meta.local_fields:
+        if not field.remote_field:
+            continue
+        if field.db_index:
+            statements.append(f"CREATE INDEX {q(f'{table}_{field.column}_idx')} ON {q(table)} ({q(field.column)})")
+        if field.db_constraint:
+            target = field.target_field
+            statements.append(
+                f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(f'{table}_{field.column}_fk')} "
+                f"FOREIGN KEY ({q(field.column)}) REFERENCES {q(target.model._meta.db_table)} ({q(target.column)}) "
+                f"DEFERRABLE INITIALLY DEFERRED"
+            )
+    return statements
+
+
+def move_into_partition_sql(month, quote_name):
+    """
+    SQL создания секции month, когда строки месяца уже лежат в DEFAULT
+    (иначе PostgreSQL секцию не создаст): вынуть их во временную таблицу, создать секцию, вернуть.
+    """
+    table = Payment._meta.db_table
+    start, end = month_bounds(month)
+    return [
+        (f"CREATE TEMP TABLE payment_move (LIKE {quote_name(table)}) ON COMMIT DROP", []),
+        (
+            f"WITH moved AS (DELETE FROM {quote_name(table + '_default')} "
+            f"WHERE paid_at >= %s AND paid_at < %s RETURNING *) "
+            f"INSERT INTO payment_move SELECT * FROM moved",
+            [start, end],
+        ),
+        (create_partition_sql(month, quote_name), []),
+        (f"INSERT INTO {quote_name(table)} SELECT * FROM payment_move", []),
+        ("DROP TABLE payment_move", []),
+    ]
+
+
+def ensure_partitions(months, connection=default_connection):
+    """
+    Создаёт недостающие секции; вне PostgreSQL — ничего не делает. Возвращает имена секций.
+    Строки месяца, успевшие попасть в DEFAULT, переносятся в новую секцию
+    (иначе PostgreSQL её не создаст) — в той же транзакции.
+    """
+    if not is_partitioned(connection):
+        return []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for month in months:
+            cursor.execute("SELECT to_regclass(%s)", [partition_name(month)])
+            if cursor.fetchone()[0] is not None:
+                continue
+            for sql, params in move_into_partition_sql(month, connection.ops.quote_name):
+                cursor.execute(sql, params)
+    return [partition_name(month) for month in months]
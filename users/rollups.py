@@ -0,0 +1,89 @@
+"""
+Поддержка PaymentDailyRollup: инкрементальные изменения и пересборка пачками.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Payment, PaymentDailyRollup
+
+
+def rollup_key(day, course_id, lesson_id, method):
+    return {"day": day, "course_id": course_id, "lesson_id": lesson_id, "method": method}
+
+
+def key_for(payment):
+    return rollup_key(timezone.localdate(payment.paid_at), payment.course_id, payment.lesson_id, payment.method)
+
+
+def apply(key, count, amount):
+    """
+    Прибавляет count/amount к строке свёртки (F()-выражением, без гонок между воркерами).
+    """
+    rows = PaymentDailyRollup.objects.filter(**key)
+    updated = rows.update(payments_count=F("payments_count") + count, amount_total=F("amount_total") + amount)
+    if not updated and count <= 0:
+        # строки уже нет (удалена каскадом вместе с курсом/уроком) — вычитать не из чего
+        return
+    if not updated:
+        try:
+            with transaction.atomic():
+                PaymentDailyRollup.objects.create(**key, payments_count=count, amount_total=amount)
+        except IntegrityError:
+            # параллельный запрос успел создать строку — прибавляем к ней
+            rows.update(payments_count=F("payments_count") + count, amount_total=F("amount_total") + amount)
+    if count < 0:
+        rows.filter(payments_count__lte=0).delete()
+
+
+def apply_many(changes):
+    """
+    changes — [(ключ, count, amount)]; дельты по одному ключу сначала суммируются.
+    """
+    totals = {}
+    for key, count, amount in changes:
+        frozen = tuple(sorted(key.items()))
+        total_count, total_amount = totals.get(frozen, (0, 0))
+        totals[frozen] = (total_count + count, total_amount + amount)
+    for frozen, (count, amount) in totals.items():
+        if count or amount:
+            apply(dict(frozen), count, amount)
+
+
+def rebuild(batch_size=100_000, stdout=None):
+    """
+    Пересобирает свёртку с нуля: агрегирует платежи диапазонами id по batch_size.
+    Дни архивных месяцев (users.archive) не трогаются: их платежей в таблице уже нет,
+    а строки свёртки ведут и задним числом добавленные туда платежи.
+    """
+    from . import archive, partitions
+
+    payments = Payment.objects.all()
+    rollups = PaymentDailyRollup.objects.all()
+    horizon = archive.horizon()
+    if horizon is not None:
+        payments = payments.filter(paid_at__gte=partitions.month_bounds(horizon)[0])
+        rollups = rollups.filter(day__gte=horizon)
+    with transaction.atomic():
+        rollups.delete()
+        bounds = payments.aggregate(low=Min("id"), high=Max("id"))
+        if bounds["low"] is None:
+            return
+        for start in range(bounds["low"], bounds["high"] + 1, batch_size):
+            groups = (
+                payments
+                .filter(id__gte=start, id__lt=start + batch_size)
+                .order_by()
+                .annotate(day=TruncDate("paid_at"))
+                .values("day", "course_id", "lesson_id", "method")
+                .annotate(count=Count("id"), amount=Sum("amount"))
+            )
+            for group in groups:
+                apply(
+                    rollup_key(group["day"], group["course_id"], group["lesson_id"], group["method"]),
+                    group["count"],
+                    group["amount"],
+                )
+            if stdout:
+                stdout.write(f"id < {start + batch_size}")
@@ -1,16 +1,24 @@
+from django.conf import settings
+from django.db.models import Sum
 from rest_framework import serializers
+from edusite.bulk import BulkListSerializer, BulkPrimaryKeyRelatedField
+from edusite.sparse import SparseFieldsSerializerMixin
+from thumbnails.fields import ThumbnailsField
 from .models import User, Payment
 from lms.serializers import LessonSerializer, CourseSerializer  # для вложенных ссылок (read-only отображение)
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     # Для удобства можно показать краткую информацию по связанным объектам (read-only)
     course_title = serializers.CharField(source="course.title", read_only=True)
     lesson_title = serializers.CharField(source="lesson.title", read_only=True)
     user_email = serializers.EmailField(source="user.email", read_only=True)
+    # user/course/lesson при массовой загрузке проверяются одним запросом на поле
+    serializer_related_field = BulkPrimaryKeyRelatedField
 
     class Meta:
         model = Payment
+        list_serializer_class = BulkListSerializer
         fields = [
             "id",
             "user",
@@ -23,13 +31,20 @@ class PaymentSerializer(serializers.ModelSerializer):
             "amount",
             "method",
         ]
+        # ?expand=user,course,lesson — объекты вместо id (edusite.sparse)
+        expandable = {
+            "user": "users.serializers.UserSerializer",
+            "course": CourseSerializer,
+            "lesson": LessonSerializer,
+        }
 
     def validate(self, attrs):
         """
         Ровно одно из полей course/lesson должно быть заполнено.
+        При частичном обновлении недостающее берётся из сохранённого платежа.
         """
-        course = attrs.get("course")
-        lesson = attrs.get("lesson")
+        course = attrs["course"] if "course" in attrs else getattr(self.instance, "course_id", None)
+        lesson = attrs["lesson"] if "lesson" in attrs else getattr(self.instance, "lesson_id", None)
         if (course and lesson) or (not course and not lesson):
             raise serializers.ValidationError(
                 "Нужно указать либо оплаченный курс, либо оплаченный урок (ровно одно из полей)."
@@ -37,9 +52,14 @@ class PaymentSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class UserSerializer(serializers.ModelSerializer):
-    # Доп. задание: история платежей пользователя (read-only)
-    payments = PaymentSerializer(many=True, read_only=True)
+class UserSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    # Доп. задание: история платежей пользователя (read-only).
+    # Встраиваются только последние USER_RECENT_PAYMENTS платежей + итоги,
+    # полная история — /api/users/<id>/payments/ с пагинацией.
+    payments = serializers.SerializerMethodField()
+    payments_count = serializers.SerializerMethodField()
+    payments_total = serializers.SerializerMethodField()
+    avatar_thumbnails = ThumbnailsField("avatar")
 
     class Meta:
         model = User
@@ -50,7 +70,39 @@ class UserSerializer(serializers.ModelSerializer):
             "phone",
             "city",
             "avatar",
+            "avatar_thumbnails",
             "first_name",
             "last_name",
             "payments",  # ← доп. задание (*)
-        ]
\ No newline at end of file
+            "payments_count",
+            "payments_total",
+        ]
+        # пользователь, развёрнутый в платеже (?expand=user), — без платежей и итогов
+        expanded_fields = [
+            "id", "email", "username", "phone", "city", "avatar", "avatar_thumbnails", "first_name", "last_name",
+        ]
+
+    # в списке/детальном всё приходит из UserViewSet.queryset (annotate + Prefetch);
+    # после create/update аннотаций нет — досчитываем отдельными запросами
+
+    def get_payments(self, obj) -> list:
+        payments = getattr(obj, "recent_payments", None)
+        if payments is None:
+            payments = (
+                obj.payments
+                .select_related("user", "course", "lesson")
+                .order_by("-paid_at", "-id")[:settings.USER_RECENT_PAYMENTS]
+            )
+        return PaymentSerializer(payments, many=True, context=self.context).data
+
+    def get_payments_count(self, obj) -> int:
+        count = getattr(obj, "payments_count", None)
+        if count is None:
+            count = obj.payments.count()
+        return count
+
+    def get_payments_total(self, obj) -> str:
+        total = getattr(obj, "payments_total", None)
+        if total is None:
+            total = obj.payments.aggregate(total=Sum("amount"))["total"] or 0
+        return serializers.DecimalField(max_digits=12, decimal_places=2).to_representation(total)
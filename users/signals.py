@@ -0,0 +1,109 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from edusite.signals import post_bulk_create, post_bulk_update
+from lms import counters
+from . import entitlements, rollups
+from .models import Payment
+
+
+@receiver(pre_save, sender=Payment, dispatch_uid="payment-rollup-pre-save")
+def remember_payment(sender, instance, **kwargs):
+    # при изменении платежа нужно вычесть старые значения из свёртки, счётчиков курса и доступов
+    instance._previous = None
+    if instance.pk and not instance._state.adding:
+        instance._previous = (
+            Payment.objects.filter(pk=instance.pk)
+            .only("user_id", "paid_at", "course_id", "lesson_id", "method", "amount")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Payment, dispatch_uid="payment-rollup-save")
+def add_to_rollup(sender, instance, **kwargs):
+    old = getattr(instance, "_previous", None)
+    if old is not None:
+        rollups.apply(rollups.key_for(old), -1, -old.amount)
+    rollups.apply(rollups.key_for(instance), 1, instance.amount)
+
+
+@receiver(post_delete, sender=Payment, dispatch_uid="payment-rollup-delete")
+def remove_from_rollup(sender, instance, **kwargs):
+    rollups.apply(rollups.key_for(instance), -1, -instance.amount)
+
+
+@receiver(post_bulk_create, sender=Payment, dispatch_uid="payment-rollup-bulk-create")
+def add_bulk_to_rollup(sender, instances, **kwargs):
+    rollups.apply_many([(rollups.key_for(p), 1, p.amount) for p in instances])
+
+
+@receiver(post_bulk_update, sender=Payment, dispatch_uid="payment-rollup-bulk-update")
+def move_bulk_in_rollup(sender, instances, previous, **kwargs):
+    rollups.apply_many(
+        [(rollups.key_for(old), -1, -old.amount) for old in previous.values()]
+        + [(rollups.key_for(p), 1, p.amount) for p in instances]
+    )
+
+
+# --- счётчики курса (lms.counters): только платежи за сам курс ---
+
+def course_change(payment, sign):
+    return (payment.course_id, 0, sign, sign * payment.amount)
+
+
+@receiver(post_save, sender=Payment, dispatch_uid="course-counters-payment-save")
+def count_saved_payment(sender, instance, **kwargs):
+    old = getattr(instance, "_previous", None)
+    changes = [course_change(instance, 1)]
+    if old is not None:
+        changes.append(course_change(old, -1))
+    counters.adjust_many(changes)
+
+
+@receiver(post_delete, sender=Payment, dispatch_uid="course-counters-payment-delete")
+def count_deleted_payment(sender, instance, origin=None, **kwargs):
+    # каскад от удаления курса: курса уже нет
+    if not counters.deleting_course(origin):
+        counters.adjust_many([course_change(instance, -1)])
+
+
+@receiver(post_bulk_create, sender=Payment, dispatch_uid="course-counters-payment-bulk-create")
+def count_payments_bulk(sender, instances, **kwargs):
+    counters.adjust_many([course_change(p, 1) for p in instances])
+
+
+@receiver(post_bulk_update, sender=Payment, dispatch_uid="course-counters-payment-bulk-update")
+def move_payments_bulk(sender, instances, previous, **kwargs):
+    counters.adjust_many(
+        [course_change(old, -1) for old in previous.values()] + [course_change(p, 1) for p in instances]
+    )
+
+
+
+# --- доступы (users.entitlements) ---
+
+@receiver(post_save, sender=Payment, dispatch_uid="entitlements-payment-save")
+def grant_saved_payment(sender, instance, **kwargs):
+    old = getattr(instance, "_previous", None)
+    changes = [(entitlements.key_for(instance), 1)]
+    if old is not None:
+        changes.append((entitlements.key_for(old), -1))
+    entitlements.apply_many(changes)
+
+
+@receiver(post_delete, sender=Payment, dispatch_uid="entitlements-payment-delete")
+def revoke_deleted_payment(sender, instance, **kwargs):
+    entitlements.apply_many([(entitlements.key_for(instance), -1)])
+
+
+@receiver(post_bulk_create, sender=Payment, dispatch_uid="entitlements-payment-bulk-create")
+def grant_payments_bulk(sender, instances, **kwargs):
+    entitlements.apply_many([(entitlements.key_for(p), 1) for p in instances])
+
+
+@receiver(post_bulk_update, sender=Payment, dispatch_uid="entitlements-payment-bulk-update")
+def move_entitlements_bulk(sender, instances, previous, **kwargs):
+    entitlements.apply_many(
+        [(entitlements.key_for(old), -1) for old in previous.values()]
+        + [(entitlements.key_for(p), 1) for p in instances]
+    )
@@ -1,3 +1,884 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from edusite import coalesce, startup
+from edusite.benchmark import seed_catalog, seed_payments
+from lms import counters
+from lms.models import Course, Lesson
+from . import archive, entitlements, partitions
+from .models import Entitlement, User, Payment, PaymentArchive, PaymentDailyRollup
+from .views import PaymentViewSet
+
+
+class QueryBudgetTestMixin:
+    def setUp(self):
+        super().setUp()
+        # вёдра троттлинга живут вне транзакции теста
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+
+    def make_users(self, n, payments_per_user=2):
+        course = Course.objects.create(title="Курс")
+        lesson = Lesson.objects.create(course=course, title="Урок")
+        offset = User.objects.count()
+        for i in range(offset, offset + n):
+            user = User.objects.create(email=f"u{i}@example.com", username=f"u{i}")
+            for j in range(payments_per_user):
+                Payment.objects.create(
+                    user=user,
+                    course=course if j % 2 == 0 else None,
+                    lesson=lesson if j % 2 else None,
+                    amount=Decimal("100.00"),
+                )
+
+
+class UserQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    def test_user_list_constant_queries(self):
+        self.make_users(2)
+        # COUNT + пользователи + prefetch платежей
+        with self.assertNumQueries(3):
+            self.client.get("/api/users/")
+        self.make_users(8)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/users/")
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(len(response.data["results"][0]["payments"]), 2)
+
+
+    def test_user_list_embeds_bounded_history_with_totals(self):
+        self.make_users(1, payments_per_user=8)
+        with self.settings(USER_RECENT_PAYMENTS=3):
+            with self.assertNumQueries(3):
+                row = self.client.get("/api/users/").data["results"][0]
+        user = User.objects.get()
+        expected = list(user.payments.order_by("-paid_at", "-id").values_list("id", flat=True)[:3])
+        self.assertEqual([p["id"] for p in row["payments"]], expected)
+        self.assertEqual(row["payments_count"], 8)
+        self.assertEqual(row["payments_total"], "800.00")
+
+    def test_created_user_has_empty_history(self):
+        response = self.client.post("/api/users/", {"email": "new@example.com", "username": "new"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["payments"], [])
+        self.assertEqual(response.data["payments_count"], 0)
+        self.assertEqual(response.data["payments_total"], "0.00")
+
+    def test_full_history_is_paginated(self):
+        self.make_users(1, payments_per_user=15)
+        user = User.objects.get()
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/users/{user.id}/payments/")
+        self.assertEqual(response.data["count"], 15)
+        self.assertEqual(len(response.data["results"]), 10)
+        rest = self.client.get(response.data["next"]).data
+        self.assertEqual(len(rest["results"]), 5)
+
+
+class PaymentQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    def test_payment_list_constant_queries(self):
+        self.make_users(5)
+        # COUNT + платежи с select_related
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/payments/")
+        self.assertEqual(len(response.data["results"]), 10)
+        with self.assertNumQueries(2):
+            self.client.get("/api/payments/?ordering=amount&method=transfer")
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create(email="k@example.com", username="k")
+        course = Course.objects.create(title="Курс")
+        # одинаковые paid_at — проверяем, что тай-брейкер по id не теряет и не дублирует строки
+        paid_at = timezone.now()
+        for i in range(25):
+            Payment.objects.create(
+                user=user, course=course, paid_at=paid_at - timedelta(days=i // 3),
+                amount=Decimal(i % 4), method="cash" if i % 2 else "transfer",
+            )
+
+    def walk(self, url):
+        ids, previous = [], None
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            ids += [row["id"] for row in response.data["results"]]
+            previous, url = response.data["previous"], response.data["next"]
+        return ids, previous
+
+    def test_forward_walk_matches_page_number_order(self):
+        ids, _ = self.walk("/api/payments/?paginate=keyset")
+        expected = list(Payment.objects.order_by("-paid_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get("/api/payments/?paginate=keyset").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual([r["id"] for r in back["results"]], [r["id"] for r in first["results"]])
+        self.assertIsNone(back["previous"])
+
+    def test_works_with_filter_and_ordering(self):
+        ids, _ = self.walk("/api/payments/?paginate=keyset&ordering=-amount&method=cash")
+        expected = list(
+            Payment.objects.filter(method="cash").order_by("-amount", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_cursor_rejected_after_ordering_change(self):
+        first = self.client.get("/api/payments/?paginate=keyset").data
+        cursor = first["next"].split("cursor=")[1].split("&")[0]
+        response = self.client.get(f"/api/payments/?cursor={cursor}&ordering=amount")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get("/api/payments/?cursor=garbage").status_code, 404)
+
+    def test_keyset_page_has_constant_queries(self):
+        first = self.client.get("/api/payments/?paginate=keyset").data
+        # без COUNT: только сама страница
+        with self.assertNumQueries(1):
+            self.client.get(first["next"])
+
+
+class PaymentRollupTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="r@example.com", username="r")
+        self.course = Course.objects.create(title="Курс")
+        self.lesson = Lesson.objects.create(course=self.course, title="Урок")
+        self.day = timezone.now().replace(year=2025, month=3, day=10, hour=12)
+        self.payments = [
+            Payment.objects.create(user=self.user, course=self.course, paid_at=self.day, amount=Decimal("100.00")),
+            Payment.objects.create(user=self.user, course=self.course, paid_at=self.day, amount=Decimal("50.00"),
+                                   method="cash"),
+            Payment.objects.create(user=self.user, lesson=self.lesson, paid_at=self.day + timedelta(days=40),
+                                   amount=Decimal("10.00")),
+        ]
+
+    def assertRollupMatchesPayments(self):
+        expected = Payment.objects.aggregate(count=Count("id"), amount=Sum("amount"))
+        actual = PaymentDailyRollup.objects.aggregate(count=Sum("payments_count"), amount=Sum("amount_total"))
+        self.assertEqual(actual["count"] or 0, expected["count"])
+        self.assertEqual(actual["amount"] or 0, expected["amount"] or 0)
+
+    def test_rollup_follows_create_update_delete(self):
+        self.assertEqual(PaymentDailyRollup.objects.count(), 3)
+        self.assertRollupMatchesPayments()
+
+        payment = self.payments[0]
+        payment.amount = Decimal("70.00")
+        payment.method = "cash"
+        payment.save()
+        self.assertRollupMatchesPayments()
+        self.assertEqual(PaymentDailyRollup.objects.get(course=self.course, method="cash").payments_count, 2)
+        # строка transfer опустела — удаляется
+        self.assertFalse(PaymentDailyRollup.objects.filter(course=self.course, method="transfer").exists())
+
+        self.payments[2].delete()
+        self.assertRollupMatchesPayments()
+
+    def test_course_cascade_delete(self):
+        self.course.delete()
+        self.assertFalse(PaymentDailyRollup.objects.exists())
+
+    def test_rebuild_command(self):
+        Payment.objects.bulk_create([
+            Payment(user=self.user, course=self.course, paid_at=self.day, amount=Decimal("1.00")) for _ in range(5)
+        ])
+        call_command("rebuild_payment_rollups", "--batch-size", "2", stdout=StringIO())
+        self.assertRollupMatchesPayments()
+        self.assertEqual(PaymentDailyRollup.objects.count(), 3)
+
+    def test_stats_endpoint(self):
+        with self.assertNumQueries(2):
+            data = self.client.get("/api/payments/stats/?group_by=course,method").data
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(data["amount"], "160.00")
+        # порядок NULL зависит от СУБД
+        self.assertCountEqual(data["results"], [
+            {"course": self.course.id, "method": "cash", "count": 1, "amount": "50.00"},
+            {"course": self.course.id, "method": "transfer", "count": 1, "amount": "100.00"},
+            {"course": None, "method": "transfer", "count": 1, "amount": "10.00"},
+        ])
+
+    def test_stats_time_series_and_filters(self):
+        data = self.client.get("/api/payments/stats/?group_by=month").data
+        self.assertEqual([r["month"] for r in data["results"]], ["2025-03-01", "2025-04-01"])
+        data = self.client.get("/api/payments/stats/?group_by=day&paid_at__gte=2025-04-01T00:00:00").data
+        self.assertEqual(data["amount"], "10.00")
+        data = self.client.get(f"/api/payments/stats/?lesson={self.lesson.id}").data
+        self.assertEqual((data["count"], data["results"]), (1, []))
+        self.assertEqual(self.client.get("/api/payments/stats/?group_by=user").status_code, 400)
+
+
+class PaymentExportTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        self.make_users(3, payments_per_user=2)
+
+    def read(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_csv_export_with_filters(self):
+        lines = self.read("/api/payments/export/?as=csv&method=transfer&ordering=paid_at").splitlines()
+        self.assertEqual(lines[0], "id,user,user_email,paid_at,course,course_title,lesson,lesson_title,amount,method")
+        expected = list(Payment.objects.filter(method="transfer").order_by("paid_at").values_list("id", flat=True))
+        self.assertEqual([int(line.split(",")[0]) for line in lines[1:]], expected)
+
+    def test_ndjson_matches_api_representation(self):
+        rows = [json.loads(line) for line in self.read("/api/payments/export/?as=ndjson").splitlines()]
+        api = self.client.get("/api/payments/").json()["results"]
+        # API опускает course_title/lesson_title без курса/урока, в выгрузке колонки всегда есть (null)
+        for exported, expected in zip(rows, api):
+            self.assertEqual({k: v for k, v in exported.items() if k in expected}, expected)
+            self.assertTrue(all(exported[k] is None for k in exported.keys() - expected.keys()))
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get("/api/payments/export/?as=xml").status_code, 400)
+
+
+class PaymentBulkTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="b@example.com", username="b")
+        self.course = Course.objects.create(title="Курс")
+        self.lesson = Lesson.objects.create(course=self.course, title="Урок")
+
+    def test_bulk_create_validates_course_or_lesson(self):
+        payload = [
+            {"user": self.user.id, "course": self.course.id, "amount": "10.00"},
+            {"user": self.user.id, "course": self.course.id, "lesson": self.lesson.id, "amount": "1.00"},
+            {"user": self.user.id, "amount": "1.00"},
+        ]
+        response = self.client.post("/api/payments/", payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {1, 2})
+        self.assertFalse(Payment.objects.exists())
+
+    def post_payments(self, n):
+        payload = [
+            {"user": self.user.id, "course": self.course.id, "amount": "10.00"} for _ in range(n)
+        ] + [{"user": self.user.id, "lesson": self.lesson.id, "amount": "5.00", "method": "cash"}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/payments/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response, len(queries)
+
+    def test_bulk_create_queries_do_not_grow_with_payload(self):
+        # user/course/lesson — по запросу на поле, свёртка — по запросу на ключ
+        self.post_payments(1)  # строки свёртки уже есть — дальше только UPDATE
+        _response, small = self.post_payments(5)
+        _response, big = self.post_payments(100)
+        self.assertEqual(small, big)
+
+    def test_bulk_create_and_update_keep_rollups(self):
+        response, _queries = self.post_payments(100)
+        self.assertEqual(response.data[-1]["lesson_title"], "Урок")
+        self.assertEqual(
+            PaymentDailyRollup.objects.aggregate(total=Sum("amount_total"))["total"], Decimal("1005.00")
+        )
+
+        ids = [row["id"] for row in response.data[:2]]
+        response = self.client.patch(
+            "/api/payments/", [{"id": pk, "amount": "20.00"} for pk in ids], format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            PaymentDailyRollup.objects.aggregate(total=Sum("amount_total"))["total"], Decimal("1025.00")
+        )
+
+    def test_bulk_update_rejects_repeated_id(self):
+        payment = Payment.objects.create(user=self.user, course=self.course, amount=Decimal("10.00"))
+        response = self.client.patch(
+            "/api/payments/", [{"id": payment.id, "amount": "20.00"}, {"id": payment.id, "amount": "30.00"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {1})
+        self.assertIn("id", response.data[1])
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.payments_count, self.course.revenue_total), (1, Decimal("10.00")))
+        self.assertEqual(PaymentDailyRollup.objects.get().payments_count, 1)
+        self.assertEqual(Entitlement.objects.get().payments_count, 1)
+
+    def test_single_patch_keeps_existing_target(self):
+        payment = Payment.objects.create(user=self.user, course=self.course, amount=Decimal("1.00"))
+        response = self.client.patch(f"/api/payments/{payment.id}/", {"amount": "2.00"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+
+class PaymentFastListParityTests(QueryBudgetTestMixin, APITestCase):
+    """
+    Быстрый путь (values() + edusite.fastpath) обязан отдавать тот же JSON байт в байт.
+    """
+    urls = [
+        "/api/payments/",
+        "/api/payments/?page=2",
+        "/api/payments/?ordering=amount&method=transfer",
+        "/api/payments/?paginate=keyset&ordering=-paid_at",
+        "/api/payments/?search=u1",
+        "/api/payments/?fields=id,amount,course_title",
+        "/api/payments/?paginate=keyset&fields=id,amount",
+    ]
+
+    def setUp(self):
+        self.make_users(4, payments_per_user=4)
+        Payment.objects.filter(id__in=[1, 2]).update(amount=Decimal("1234.5"))
+        Payment.objects.filter(id=3).update(paid_at=timezone.now().replace(microsecond=0))
+
+    def test_byte_identical_output(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                fast = self.client.get(url)
+                with mock.patch.object(PaymentViewSet, "fast_list", False):
+                    slow = self.client.get(url)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_keyset_links_follow_the_same_rows(self):
+        fast = self.client.get("/api/payments/?paginate=keyset").json()
+        with mock.patch.object(PaymentViewSet, "fast_list", False):
+            slow = self.client.get("/api/payments/?paginate=keyset").json()
+        self.assertEqual(fast["next"], slow["next"])
+
+
+class SparseFieldsTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        self.make_users(3, payments_per_user=2)
+
+    def test_user_fields_skip_payments(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/users/?fields=id,email")
+        self.assertEqual(set(response.data["results"][0]), {"id", "email"})
+        # COUNT + SELECT id, email: ни агрегатов, ни prefetch платежей
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn("payment", queries[1]["sql"])
+        self.assertNotIn("username", queries[1]["sql"])
+
+    def test_user_expand_adds_embedded_field(self):
+        response = self.client.get("/api/users/?fields=id&expand=payments_count")
+        self.assertEqual(response.data["results"][0], {"id": 1, "payments_count": 2})
+
+    def test_payment_expand(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/payments/?fields=id,course,user&expand=course,user&ordering=amount")
+        row = response.data["results"][0]
+        self.assertEqual(set(row), {"id", "course", "user"})
+        self.assertEqual(row["user"]["email"], "u0@example.com")
+        self.assertNotIn("payments", row["user"])
+        self.assertEqual(row["course"]["title"], "Курс")
+        self.assertNotIn("lessons", row["course"])
+
+    def test_unknown_field_and_writes(self):
+        response = self.client.get("/api/payments/?fields=id,secret&expand=nope")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {"fields", "expand"})
+        # запись параметры не сужают
+        response = self.client.post(
+            "/api/payments/?fields=id", {"user": 1, "course": 1, "amount": "5.00"}, format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("amount", response.data)
+
+
+class AsyncPaymentApiTests(QueryBudgetTestMixin, APITestCase):
+    """
+    /api/async/payments/ (async ORM) отдаёт то же, что /api/payments/.
+    """
+    urls = [
+        "",
+        "?page=2",
+        "?page=99",
+        "?ordering=amount&method=transfer",
+        "?paid_at__gte=not-a-date",
+        "?paginate=keyset&ordering=-paid_at",
+        "?cursor=broken",
+        "?search=u1",
+        "?fields=id,amount&paginate=keyset",
+        "?expand=course,user",
+        "?fields=nope",
+    ]
+
+    def setUp(self):
+        self.make_users(4, payments_per_user=4)
+
+    async def test_same_responses_as_sync_api(self):
+        for query in self.urls:
+            with self.subTest(query=query):
+                sync = await self.async_client.get(f"/api/payments/{query}", HTTP_ACCEPT="application/json")
+                response = await self.async_client.get(f"/api/async/payments/{query}")
+                self.assertEqual(response.status_code, sync.status_code)
+                # ссылки next/previous ведут на свой эндпоинт, остальное — байт в байт
+                self.assertEqual(response.content.replace(b"/api/async/", b"/api/"), sync.content)
+
+    async def test_keyset_cursor_is_interchangeable(self):
+        first = (await self.async_client.get("/api/async/payments/?paginate=keyset")).json()
+        second_async = (await self.async_client.get(first["next"])).json()
+        second_sync = (await self.async_client.get(first["next"].replace("/api/async/", "/api/"))).json()
+        self.assertEqual(second_async["results"], second_sync["results"])
+
+    async def test_detail(self):
+        payment = await Payment.objects.afirst()
+        response = await self.async_client.get(f"/api/async/payments/{payment.pk}/")
+        sync = await self.async_client.get(f"/api/payments/{payment.pk}/", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.content, sync.content)
+        self.assertEqual((await self.async_client.get("/api/async/payments/999999/")).status_code, 404)
+
+
+class ThrottleTests(QueryBudgetTestMixin, APITestCase):
+    @override_settings(THROTTLE_BURST={"payments": 2})
+    def test_token_bucket_per_client_and_scope(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get("/api/payments/").status_code, 200)
+        response = self.client.get("/api/payments/")
+        self.assertEqual(response.status_code, 429)
+        # 300/min — токен раз в 0.2 с
+        self.assertEqual(response["Retry-After"], "1")
+        # у другого клиента и у другого scope — свои вёдра
+        self.assertEqual(self.client.get("/api/payments/", REMOTE_ADDR="10.0.0.2").status_code, 200)
+        self.assertEqual(self.client.get("/api/courses/").status_code, 200)
+
+        with mock.patch("edusite.throttling.time.time", return_value=time.time() + 0.5):
+            self.assertEqual(self.client.get("/api/payments/").status_code, 200)
+
+
+class CoalesceTests(QueryBudgetTestMixin, APITestCase):
+    def race(self, run):
+        """
+        Второй вызов с тем же ключом приходит, пока первый ещё считает.
+        """
+        started, release, calls, results = threading.Event(), threading.Event(), [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"calls": len(calls)}
+
+        threads = [threading.Thread(target=lambda: results.append(run("k", compute))) for _ in range(2)]
+        threads[0].start()
+        started.wait(5)
+        threads[1].start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results, key=lambda r: not r[1]), [({"calls": 1}, True), ({"calls": 1}, False)])
+
+    def test_threads_share_one_computation(self):
+        self.race(coalesce.single_flight)
+
+    @override_settings(COALESCE_CACHE_ALIAS="throttle")
+    def test_cache_backend(self):
+        self.race(coalesce.run_via_cache)
+
+    def test_file_backend(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        with override_settings(COALESCE_LOCK_DIR=workdir.name):
+            self.race(coalesce.run_via_file)
+
+    def test_leader_failure_is_not_shared(self):
+        def fail():
+            raise ValueError
+        with self.assertRaises(ValueError):
+            coalesce.single_flight("k", fail)
+        self.assertEqual(coalesce.single_flight("k", lambda: 1), (1, True))
+
+    def test_follower_response(self):
+        self.make_users(1)
+        plain = self.client.get("/api/payments/?ordering=-amount")
+        self.assertNotIn("X-Coalesced", plain)
+        with mock.patch("edusite.coalesce.single_flight", return_value=((200, plain.json()), False)) as flight:
+            response = self.client.get("/api/payments/?ordering=-amount")
+        self.assertEqual(response["X-Coalesced"], "1")
+        self.assertEqual(response.json(), plain.json())
+        # ключ — путь, параметры, формат и клиент
+        key = flight.call_args.args[0]
+        self.assertIn("/api/payments/", key)
+        self.assertIn("-amount", key)
+
+
+class SeedAndBenchmarkTests(APITestCase):
+    def test_seed_catalog(self):
+        counts = seed_catalog(courses=3, lessons=10, users=5, payments=50, batch_size=7)
+        self.assertEqual(counts, {"courses": 3, "lessons": 10, "users": 5, "payments": 50})
+        self.assertEqual(Payment.objects.count(), 50)
+        # каждый платёж — ровно за курс или за урок
+        self.assertEqual(Payment.objects.filter(course__isnull=True, lesson__isnull=True).count(), 0)
+        self.assertEqual(Payment.objects.filter(course__isnull=False, lesson__isnull=False).count(), 0)
+        self.assertEqual(Lesson.objects.values("course").distinct().count(), 3)
+
+    def test_seed_data_command_rebuilds_rollups(self):
+        call_command("seed_data", courses=2, lessons=4, users=3, payments=20, stdout=StringIO())
+        self.assertEqual(PaymentDailyRollup.objects.aggregate(n=Sum("payments_count"))["n"], 20)
+
+    def test_bench_api_saves_and_compares(self):
+        seed_catalog(courses=2, lessons=4, users=3, payments=20)
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        baseline = os.path.join(workdir.name, "baseline.json")
+        courses = Course.objects.count()
+
+        out = StringIO()
+        call_command("bench_api", requests=2, warmup=0, writes=True, save=baseline, stdout=out)
+        results = json.load(open(baseline, encoding="utf-8"))
+        self.assertEqual(results["GET /api/courses/"]["queries"], 3)
+        self.assertEqual(results["POST /api/courses/"]["status"], [201])
+        self.assertIn("GET /api/payments/", results)
+        self.assertIn("GET /api/lessons/", results)
+        self.assertEqual(Course.objects.count(), courses)  # запись откатывается
+
+        # в baseline было меньше SQL — регрессия
+        results["GET /api/courses/"]["queries"] = 1
+        with open(baseline, "w", encoding="utf-8") as fh:
+            json.dump(results, fh)
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("bench_api", requests=2, warmup=0, baseline=baseline, fail_on_regression=True, stdout=out)
+        self.assertIn("SQL 1 -> 3", out.getvalue())
+
+
+    def test_bench_pagination_cursor_matches_view_ordering(self):
+        from .management.commands.bench_pagination import Command
+
+        seed_payments(60, users=3, courses=2)
+        command = Command(stdout=StringIO())
+        for ordering in ("", "-amount"):
+            # AssertionError, если курсор построен не в порядке вьюхи
+            command.run([1, 2, 3], {"ordering": ordering, "rows": 60, "repeat": 1})
+
+
+class EntitlementTests(APITestCase):
+    def setUp(self):
+        # LRU процесса и кэши живут вне транзакции теста, а id пользователей повторяются
+        entitlements.lru.clear()
+        caches["catalog"].clear()
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        self.user = User.objects.create(email="e@example.com", username="e")
+        self.other = User.objects.create(email="o@example.com", username="o")
+        self.course = Course.objects.create(title="Курс")
+        self.lessons = [Lesson.objects.create(course=self.course, title=f"Урок {i}") for i in range(3)]
+        self.free = Lesson.objects.create(course=Course.objects.create(title="Другой"), title="Чужой урок")
+
+    def pay(self, user=None, **target):
+        return Payment.objects.create(user=user or self.user, amount=Decimal("10.00"), **target)
+
+    def test_payments_maintain_entitlements(self):
+        first = self.pay(lesson=self.lessons[0])
+        second = self.pay(lesson=self.lessons[0])
+        self.assertEqual(Entitlement.objects.get(user=self.user, lesson=self.lessons[0]).payments_count, 2)
+        first.delete()
+        self.assertEqual(Entitlement.objects.get(user=self.user, lesson=self.lessons[0]).payments_count, 1)
+        # платёж перенесли на курс: доступ к уроку уходит, к курсу — появляется
+        second.lesson, second.course = None, self.course
+        second.save()
+        self.assertEqual(
+            list(Entitlement.objects.values_list("course_id", "lesson_id", "payments_count")),
+            [(self.course.id, None, 1)],
+        )
+        second.delete()
+        self.assertFalse(Entitlement.objects.exists())
+
+    def test_batch_access_uses_lru_and_invalidates_on_payment(self):
+        self.pay(lesson=self.lessons[0])
+        with self.assertNumQueries(1):
+            self.assertEqual(entitlements.accessible(self.user, [*self.lessons, self.free]), {self.lessons[0].id})
+        with self.assertNumQueries(0):
+            entitlements.accessible(self.user, self.lessons)
+
+        self.pay(course=self.course)
+        with self.assertNumQueries(1):
+            found = entitlements.accessible(self.user, [(lesson.id, lesson.course_id) for lesson in self.lessons])
+        self.assertEqual(found, {lesson.id for lesson in self.lessons})
+        self.assertEqual(entitlements.accessible(self.other, self.lessons), set())
+
+    def test_lesson_list_is_accessible_without_n_plus_one(self):
+        self.pay(course=self.course)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(3):  # COUNT, страница, доступы пользователя
+            rows = self.client.get("/api/lessons/").json()["results"]
+        self.assertEqual({row["id"]: row["is_accessible"] for row in rows}, {
+            **{lesson.id: True for lesson in self.lessons}, self.free.id: False,
+        })
+        # аноним — false, без запроса к доступам
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(2):
+            rows = self.client.get("/api/lessons/").json()["results"]
+        self.assertFalse(any(row["is_accessible"] for row in rows))
+        detail = self.client.get(f"/api/lessons/{self.lessons[0].id}/?fields=id,is_accessible").json()
+        self.assertEqual(detail, {"id": self.lessons[0].id, "is_accessible": False})
+
+    def test_catalog_cache_varies_by_user(self):
+        self.pay(course=self.course)
+        url = f"/api/courses/{self.course.id}/"
+
+        def accessible(user):
+            self.client.force_authenticate(user)
+            return [lesson["is_accessible"] for lesson in self.client.get(url).json()["lessons"]]
+
+        self.assertEqual(accessible(self.user), [True] * 3)
+        self.assertEqual(accessible(self.other), [False] * 3)
+        self.assertEqual(accessible(None), [False] * 3)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+        # платёж другого пользователя сбрасывает только его записи
+        self.pay(user=self.other, lesson=self.lessons[1])
+        self.assertEqual(accessible(self.other), [False, True, False])
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+    def test_bulk_payments_and_rebuild(self):
+        response = self.client.post("/api/payments/", [
+            {"user": self.user.id, "lesson": self.lessons[2].id, "amount": "5.00"},
+            {"user": self.other.id, "course": self.course.id, "amount": "5.00"},
+        ], format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(entitlements.accessible(self.other, self.lessons), {lesson.id for lesson in self.lessons})
+        expected = sorted(Entitlement.objects.values_list("user_id", "course_id", "lesson_id", "payments_count"))
+
+        Entitlement.objects.all().delete()
+        call_command("rebuild_entitlements", stdout=StringIO())
+        self.assertEqual(
+            sorted(Entitlement.objects.values_list("user_id", "course_id", "lesson_id", "payments_count")), expected,
+        )
+        self.assertEqual(entitlements.accessible(self.user, self.lessons), {self.lessons[2].id})
+
+
+class PaymentArchiveTests(QueryBudgetTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        entitlements.lru.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storages = {**settings.STORAGES, "payment_archive": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": directory.name},
+        }}
+        override = override_settings(STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create(email="a@example.com", username="a")
+        self.course = Course.objects.create(title="Курс")
+        self.lesson = Lesson.objects.create(course=self.course, title="Урок")
+        self.old = timezone.now().replace(year=2024, month=1, day=15, hour=12)
+        self.cold = [
+            Payment.objects.create(user=self.user, course=self.course, paid_at=self.old, amount=Decimal("100.00")),
+            Payment.objects.create(user=self.user, lesson=self.lesson, paid_at=self.old + timedelta(days=1),
+                                   amount=Decimal("5.00"), method="cash"),
+        ]
+        self.hot = Payment.objects.create(user=self.user, course=self.course, amount=Decimal("1.00"))
+
+    def snapshot(self):
+        return (
+            set(PaymentDailyRollup.objects.values_list("day", "course_id", "lesson_id", "method", "payments_count")),
+            Course.objects.values_list("payments_count", "revenue_total").get(pk=self.course.pk),
+            set(Entitlement.objects.values_list("user_id", "course_id", "lesson_id", "payments_count")),
+        )
+
+    def export_ids(self, query=""):
+        response = self.client.get(f"/api/payments/export/?as=ndjson{query}")
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line)["id"] for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_month_math(self):
+        self.assertEqual(partitions.next_month(date(2024, 12, 1)), date(2025, 1, 1))
+        self.assertEqual(partitions.previous_month(date(2024, 1, 1)), date(2023, 12, 1))
+        self.assertEqual(len(partitions.months_between(date(2023, 11, 5), date(2024, 2, 1))), 4)
+        months = partitions.months_between(date(2024, 1, 1), date(2024, 12, 1))
+        self.assertEqual(partitions.touched_months(months, self.old, self.old + timedelta(days=40)),
+                         [date(2024, 1, 1), date(2024, 2, 1)])
+        self.assertEqual(partitions.partition_name(date(2024, 3, 1)), "users_payment_y2024m03")
+
+    def test_archived_timestamps_with_utc_suffix(self):
+        # «Z» пишет export.format_datetime; datetime.fromisoformat до Python 3.11 его не читает
+        noon = datetime(2024, 1, 15, 12, tzinfo=dt_timezone.utc)
+        record = {**dict.fromkeys(archive.NAMES), "paid_at": "2024-01-15T12:00:00Z"}
+        self.assertTrue(archive.matches(record, {}, noon, noon))
+        self.assertFalse(archive.matches(record, {}, None, noon - timedelta(seconds=1)))
+        key = archive.sort_key(["-paid_at"])
+        self.assertEqual(key([record[name] for name in archive.NAMES]), (-noon.timestamp(),))
+
+    def test_archive_keeps_aggregates_and_export(self):
+        before, expected = self.snapshot(), self.export_ids()
+        self.assertEqual(archive.closed_months(keep_months=12), [date(2024, 1, 1)])
+
+        call_command("archive_payments", stdout=StringIO())
+        self.assertEqual(list(Payment.objects.values_list("id", flat=True)), [self.hot.id])
+        record = PaymentArchive.objects.get()
+        self.assertEqual((record.month, record.rows, record.amount_total), (date(2024, 1, 1), 2, Decimal("105.00")))
+        self.assertEqual(archive.closed_months(keep_months=12), [])
+        # свёртка, счётчики и доступы — как до переноса, и пересборки дают то же самое
+        self.assertEqual(self.snapshot(), before)
+        call_command("rebuild_payment_rollups", stdout=StringIO())
+        call_command("rebuild_entitlements", stdout=StringIO())
+        self.assertEqual(counters.reconcile(), [])
+        self.assertEqual(self.snapshot(), before)
+
+        # выгрузка читает архив: порядок, фильтры и отсечение месяцев
+        self.assertEqual(self.export_ids(), expected)
+        self.assertEqual(self.export_ids("&ordering=paid_at"), expected[::-1])
+        self.assertEqual(self.export_ids("&method=cash"), [self.cold[1].id])
+        self.assertEqual(self.export_ids(f"&course={self.course.id}"), [self.hot.id, self.cold[0].id])
+        with mock.patch.object(archive, "read") as read:
+            self.assertEqual(self.export_ids("&paid_at__gte=2024-06-01T00:00:00Z"), [self.hot.id])
+        read.assert_not_called()
+        # другая сортировка — слиянием, поиск — построчно по архиву (ранжированный — архив после горячих)
+        by_amount = [self.hot.id, self.cold[1].id, self.cold[0].id]
+        self.assertEqual(self.export_ids("&ordering=amount"), by_amount)
+        self.assertEqual(self.export_ids("&ordering=-amount"), by_amount[::-1])
+        self.assertEqual(self.export_ids("&search=урок"), [self.cold[1].id])
+        self.assertEqual(self.export_ids("&search=курс&ordering=paid_at"), [self.cold[0].id, self.hot.id])
+        self.assertEqual(self.export_ids("&search=example"), [self.hot.id, self.cold[1].id, self.cold[0].id])
+
+
+    def test_export_sorts_archive_in_bounded_runs(self):
+        call_command("archive_payments", stdout=StringIO())
+        by_paid_at = [self.cold[0].id, self.cold[1].id, self.hot.id]
+        by_amount = [self.hot.id, self.cold[1].id, self.cold[0].id]
+        with mock.patch.object(archive.tempfile, "TemporaryFile", wraps=tempfile.TemporaryFile) as spill:
+            # архив уместился в один кусок — сортировка в памяти, без файлов
+            self.assertEqual(self.export_ids("&ordering=amount"), by_amount)
+            spill.assert_not_called()
+            # кусок в одну строку: каждая архивная строка — во временный файл, слияние потоком
+            with override_settings(PAYMENT_ARCHIVE_SORT_ROWS=1):
+                self.assertEqual(self.export_ids("&ordering=amount"), by_amount)
+                self.assertEqual(self.export_ids("&ordering=paid_at"), by_paid_at)
+                self.assertEqual(self.export_ids("&ordering=-amount"), by_amount[::-1])
+        self.assertEqual(spill.call_count, 6)
+
+
+class PaymentPartitionTests(APITestCase):
+    """
+    SQL секционирования проверяется на любой СУБД; на PostgreSQL — ещё и выполняется.
+    """
+    month = date(2024, 3, 1)
+
+    def test_partition_table_sql(self):
+        q = connection.ops.quote_name
+        statements = partitions.partition_table_sql(Payment, [self.month, date(2024, 4, 1)], q)
+        self.assertEqual(statements[0], 'ALTER TABLE "users_payment" RENAME TO "users_payment_legacy"')
+        self.assertIn("PARTITION BY RANGE (paid_at)", statements[1])
+        self.assertEqual(statements[2], 'ALTER TABLE "users_payment" ADD PRIMARY KEY (id, paid_at)')
+        self.assertIn('"users_payment_default" PARTITION OF "users_payment" DEFAULT', statements[3])
+        start, end = partitions.month_bounds(self.month)
+        self.assertEqual(statements[4], (
+            'CREATE TABLE IF NOT EXISTS "users_payment_y2024m03" PARTITION OF "users_payment" '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        self.assertIn('"users_payment_y2024m04"', statements[5])
+        # строки переносятся до удаления старой таблицы, индексы и ключи — после
+        order = [next(i for i, sql in enumerate(statements) if sql.startswith(prefix))
+                 for prefix in ("INSERT INTO", "SELECT setval", "DROP TABLE", "CREATE INDEX", "ALTER TABLE \"users_payment\" ADD CONSTRAINT")]
+        self.assertEqual(order, sorted(order))
+        self.assertIn(
+            'CREATE INDEX "payment_paid_at_idx" ON "users_payment" ("paid_at" DESC, "id" DESC)', statements,
+        )
+        for column, target in (("user_id", "users_user"), ("course_id", "lms_course"), ("lesson_id", "lms_lesson")):
+            self.assertIn(
+                f'ALTER TABLE "users_payment" ADD CONSTRAINT "users_payment_{column}_fk" FOREIGN KEY ("{column}") '
+                f'REFERENCES "{target}" ("id") DEFERRABLE INITIALLY DEFERRED', statements,
+            )
+            self.assertIn(f'CREATE INDEX "users_payment_{column}_idx" ON "users_payment" ("{column}")', statements)
+
+    def test_move_into_partition_sql(self):
+        statements = partitions.move_into_partition_sql(self.month, connection.ops.quote_name)
+        sqls = [sql for sql, _params in statements]
+        self.assertIn('DELETE FROM "users_payment_default"', sqls[1])
+        self.assertEqual(statements[1][1], list(partitions.month_bounds(self.month)))
+        # секция создаётся, пока строки месяца вынуты из DEFAULT
+        self.assertEqual(sqls[2], partitions.create_partition_sql(self.month, connection.ops.quote_name))
+        self.assertTrue(sqls[3].startswith('INSERT INTO "users_payment" SELECT'))
+
+    def test_explain_counts_partition_scans_as_full_scans(self):
+        from .management.commands.explain_payment_queries import PG_FULL_SCAN
+
+        # скан секции — полный проход месяца, индекс не используется: считается полным сканом
+        for line in ("Seq Scan on users_payment  (cost=0.00..1.00)",
+                     "->  Seq Scan on users_payment_y2024m03 users_payment_1  (cost=0.00..1.00)",
+                     "->  Seq Scan on users_payment_default users_payment_2"):
+            self.assertIsNotNone(PG_FULL_SCAN.search(line), line)
+        for line in ("Index Scan using payment_paid_at_idx on users_payment_y2024m03 users_payment_1",
+                     "Seq Scan on users_user"):
+            self.assertIsNone(PG_FULL_SCAN.search(line), line)
+
+    def test_not_partitioned_outside_postgresql(self):
+        if connection.vendor == "postgresql":
+            self.skipTest("PostgreSQL")
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(partitions.ensure_partitions([self.month]), [])
+
+    @skipUnless(connection.vendor == "postgresql", "секционирование — только PostgreSQL")
+    def test_postgresql_partitions_and_pruning(self):
+        self.assertTrue(partitions.is_partitioned())
+        user = User.objects.create(email="pg@example.com", username="pg")
+        far = date(2099, 1, 1)
+        paid_at = partitions.month_bounds(far)[0] + timedelta(days=3)
+        payment = Payment.objects.create(user=user, paid_at=paid_at, amount=Decimal("1.00"))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM "users_payment" WHERE id = %s', [payment.id])
+            self.assertEqual(cursor.fetchone()[0], "users_payment_default")
+            # строка из DEFAULT переезжает в созданную секцию
+            self.assertEqual(partitions.ensure_partitions([far]), ["users_payment_y2099m01"])
+            cursor.execute('SELECT tableoid::regclass::text FROM "users_payment" WHERE id = %s', [payment.id])
+            self.assertEqual(cursor.fetchone()[0], "users_payment_y2099m01")
+            start, end = partitions.month_bounds(far)
+            cursor.execute(
+                'EXPLAIN SELECT * FROM "users_payment" WHERE paid_at >= %s AND paid_at < %s', [start, end],
+            )
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("users_payment_y2099m01", plan)
+        self.assertNotIn("users_payment_default", plan)
+
+
+class StartupBudgetTests(APITestCase):
+    def test_api_profile_cold_start(self):
+        # время зависит от машины — его проверяет bench_startup; здесь — что именно грузится
+        api, full = startup.measure("api", repeat=1), startup.measure("full", repeat=1)
+        self.assertEqual((api["status"], full["status"]), ("200 OK", "200 OK"))
+        # без админки, сессий и Pillow: картинки нужны только воркеру превью
+        skipped = {"PIL", "lms.admin", "users.admin", "django.contrib.sessions.middleware",
+                   "django.contrib.messages.middleware"}
+        self.assertEqual(skipped & api["modules"], set())
+        self.assertIn("lms.admin", full["modules"])
+        self.assertLess(len(api["modules"]), len(full["modules"]))
+
+    def test_api_profile_has_no_metrics_without_token(self):
+        script = (
+            "import django; django.setup(); from django.urls import resolve, Resolver404\n"
+            "try:\n    resolve('/metrics'); print('routed')\nexcept Resolver404:\n    print('absent')"
+        )
+        for token, expected in (("", "absent"), ("secret", "routed")):
+            env = {**os.environ, "DJANGO_SETTINGS_MODULE": "edusite.settings", "EDUSITE_PROFILE": "api",
+                   "EDUSITE_METRICS_TOKEN": token}
+            result = subprocess.run([sys.executable, "-c", script], cwd=settings.BASE_DIR, env=env,
+                                    capture_output=True, text=True, check=True)
+            self.assertEqual(result.stdout.strip(), expected)
+
+    def test_bench_startup_command(self):
+        out = StringIO()
+        call_command("bench_startup", profiles=["full", "api"], repeat=1, top=3, stdout=out)
+        output = out.getvalue()
+        self.assertIn("full ", output)
+        self.assertIn("api ", output)
+        self.assertIn("django", output)
+        self.assertIn(f"бюджет {settings.STARTUP_BUDGET_SECONDS * 1000:.0f} мс", output)
@@ -1,31 +1,180 @@
-from rest_framework import viewsets
-from .models import User, Payment
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, DecimalField, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from rest_framework import serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from edusite.bulk import BulkCreateUpdateMixin
+from edusite.coalesce import CoalescedListMixin
+from edusite.fastpath import FastListMixin
+from edusite.instrumentation import InstrumentedViewMixin, phase
+from edusite.pagination import KeysetOrPageNumberPagination
+from edusite.sparse import SparseFieldsMixin
+from . import archive, export
+from .models import User, Payment, PaymentDailyRollup
 from .serializers import UserSerializer, PaymentSerializer
-from .filters import PaymentFilter
+from .filters import PaymentFilter, PaymentRollupFilter
+
+
+# поля UserSerializer сверх колонок User (SparseFieldsMixin.field_querysets):
+# итоги — агрегатами в том же запросе, последние N платежей — одним prefetch на страницу
+
+def with_recent_payments(queryset):
+    recent = (
+        Payment.objects
+        .select_related("user", "course", "lesson")
+        .order_by("-paid_at", "-id")[:settings.USER_RECENT_PAYMENTS]
+    )
+    return queryset.prefetch_related(Prefetch("payments", queryset=recent, to_attr="recent_payments"))
+
 
+def with_payments_count(queryset):
+    return queryset.annotate(payments_count=Count("payments"))
 
-class UserViewSet(viewsets.ModelViewSet):
+
+def with_payments_total(queryset):
+    return queryset.annotate(
+        payments_total=Coalesce(Sum("payments__amount"), Value(Decimal("0")), output_field=DecimalField())
+    )
+
+
+class UserViewSet(CoalescedListMixin, SparseFieldsMixin, InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     CRUD профилей пользователей (как в доп. задании прошлого ДЗ).
     AllowAny — по условиям курса на этом этапе.
+    Keyset-пагинация: ?paginate=keyset (дальше — ссылки next/previous с ?cursor=).
+    В профиль встраиваются последние платежи и итоги,
+    полная история — /api/users/<id>/payments/ (с пагинацией).
+    ?fields=id,email — без платежей и агрегатов (edusite.sparse).
     """
-    queryset = User.objects.all().order_by("id")
+    queryset = User.objects.order_by("id")
     serializer_class = UserSerializer
+    throttle_scope = "users"
+    pagination_class = KeysetOrPageNumberPagination
+    search_fields = ["email", "username", "phone", "city"]
+    field_querysets = {
+        "payments": with_recent_payments,
+        "payments_count": with_payments_count,
+        "payments_total": with_payments_total,
+    }
+
+    @action(detail=True, methods=["get"])
+    def payments(self, request, pk=None):
+        """
+        Полная история платежей пользователя, новые сверху.
+        """
+        user = self.get_object()
+        payments = (
+            Payment.objects
+            .filter(user=user)
+            .select_related("user", "course", "lesson")
+            .order_by("-paid_at", "-id")
+        )
+        page = self.paginate_queryset(payments)
+        serializer = PaymentSerializer(page, many=True, context=self.get_serializer_context())
+        with phase("serialize"):
+            data = serializer.data
+        return self.get_paginated_response(data)
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(
+    CoalescedListMixin, SparseFieldsMixin, FastListMixin, BulkCreateUpdateMixin, InstrumentedViewMixin,
+    viewsets.ModelViewSet,
+):
     """
     Список/детально платежей с фильтрацией и сортировкой.
     Сортировка: ?ordering=paid_at или ?ordering=-paid_at
     Фильтры: ?course=ID, ?lesson=ID, ?method=cash|transfer
              (дополнительно: ?paid_at__gte=ISO, ?paid_at__lte=ISO)
+    Keyset-пагинация: ?paginate=keyset — порядок (paid_at, id) без COUNT/OFFSET,
+    курсор совместим с фильтрами и ?ordering=.
+    Выручка: /api/payments/stats/?group_by=course,method,day (из дневной свёртки).
+    Выгрузка: /api/payments/export/?as=csv|ndjson — те же фильтры и сортировка, потоком.
+    Массово: POST /api/payments/ списком, PATCH /api/payments/ списком [{"id": ..., ...}].
+    Список собирается из values() (edusite.fastpath), JSON тот же, что у PaymentSerializer.
+    ?fields=id,amount — только эти колонки, ?expand=user,course,lesson — объекты вместо id (edusite.sparse).
+    Лимит — token bucket scope "payments" (edusite.throttling); одновременные одинаковые
+    запросы списка считаются один раз (edusite.coalesce).
     """
+    # без ?ordering= — новые сверху; фильтр paid_at__gte/__lte отсекает лишние месяцы (users.partitions)
     queryset = (
         Payment.objects
         .select_related("user", "course", "lesson")
-        .all()
+        .order_by("-paid_at", "-id")
     )
     serializer_class = PaymentSerializer
+    pagination_class = KeysetOrPageNumberPagination
+    throttle_scope = "payments"
+    fast_list = True
     filterset_class = PaymentFilter
     ordering_fields = ["paid_at", "amount"]
-    search_fields = ["user__email", "course__title", "lesson__title"]
\ No newline at end of file
+    search_fields = ["user__email", "course__title", "lesson__title"]
+
+    # разрезы для stats: имя в ?group_by= -> поле свёртки
+    stats_groups = {"course": "course_id", "lesson": "lesson_id", "method": "method", "day": "day", "month": "month"}
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        """
+        Суммы и количество платежей из PaymentDailyRollup, не трогая сырые платежи.
+        ?group_by= — через запятую из course, lesson, method, day, month (day/month — временной ряд);
+        фильтры — как у списка (даты округляются до дня).
+        """
+        filterset = PaymentRollupFilter(request.query_params, queryset=PaymentDailyRollup.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        group_by = [g for g in request.query_params.get("group_by", "").split(",") if g]
+        unknown = set(group_by) - set(self.stats_groups)
+        if unknown:
+            raise ValidationError({"group_by": f"Неизвестные разрезы: {', '.join(sorted(unknown))}"})
+
+        rollups = filterset.qs.order_by()
+        if "month" in group_by:
+            rollups = rollups.annotate(month=TruncMonth("day"))
+        amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+        totals = rollups.aggregate(count=Sum("payments_count"), amount=Sum("amount_total"))
+
+        columns = [self.stats_groups[g] for g in group_by]
+        results = []
+        if columns:
+            rows = (
+                rollups.values(*columns)
+                .annotate(count=Sum("payments_count"), amount=Sum("amount_total"))
+                .order_by(*columns)
+            )
+            for row in rows:
+                item = {g: row[c] for g, c in zip(group_by, columns)}
+                for g in ("day", "month"):
+                    if item.get(g) is not None:
+                        item[g] = item[g].isoformat()
+                item["count"] = row["count"]
+                item["amount"] = amount.to_representation(row["amount"])
+                results.append(item)
+
+        return Response({
+            "count": totals["count"] or 0,
+            "amount": amount.to_representation(totals["amount"] or Decimal("0")),
+            "results": results,
+        })
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Весь реестр платежей одним потоковым ответом (CSV или NDJSON), без пагинации.
+        Фильтры, поиск и ?ordering= — как у списка; архивные месяцы (users.archive),
+        попавшие в paid_at__gte/__lte, читаются из архива и вливаются в том же порядке
+        (при поиске без ?ordering= — после горячих строк, без ранжирования).
+        """
+        export_format = request.query_params.get("as", "csv")
+        if export_format not in export.FORMATS:
+            raise ValidationError({"as": f"Допустимо: {', '.join(export.FORMATS)}"})
+        queryset = self.filter_queryset(self.get_queryset())
+        filterset = PaymentFilter(request.query_params, queryset=queryset, request=request)
+        filterset.is_valid()  # уже проверено filter_queryset
+        params = {**filterset.form.cleaned_data, "search": request.query_params.get("search")}
+        chunk_size = settings.PAYMENT_EXPORT_CHUNK_SIZE
+        rows = archive.with_archived(export.iter_rows(queryset, chunk_size), params, queryset.query.order_by)
+        return export.export_response(queryset, export_format, chunk_size=chunk_size, rows=rows)